@@ -0,0 +1,73 @@
+"""
+Compares the frame time of the vectorized, sprite-cached background accent renderer against the original
+per-circle drawing loop, at several window sizes. Runs headless. From the project root:
+
+    python -m benchmarks.accents
+"""
+import os
+import time
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from src.accents import AccentRenderer
+from src.states.pong import Pong
+
+WINDOW_SIZES = [(640, 360), (1280, 720), (1920, 1080), (2560, 1440)]
+FRAMES = 200
+
+def draw_accents_loop(screen, phase, ball_x, ball_y, decay):
+    """The original `Pong.draw_background_accents` implementation, kept here as the benchmark reference."""
+    full_margin = 2 * (Pong.BG_MARGIN + Pong.BG_ACCENT_RADIUS)
+    w = screen.get_width() - full_margin
+    h = screen.get_height() - full_margin
+
+    x_count = w // Pong.BG_ACCENT_PITCH
+    y_count = h // int(Pong.BG_ACCENT_PITCH * np.cos(np.pi / 6))
+    if x_count <= 1 or y_count <= 1:
+        return
+
+    dx = w / (x_count - 1)
+    dy = h / (y_count - 1)
+    x0 = Pong.BG_MARGIN + Pong.BG_ACCENT_RADIUS
+    y0 = x0
+
+    for i in range(x_count):
+        for j in range(y_count):
+            x = x0 + i * dx
+            if j % 2 == 0:
+                x -= dx / 2
+                if i == 0:
+                    continue
+            y = y0 + j * dy
+
+            argument = 10 * i + j + phase
+            x += Pong.BG_ACCENT_SWAY * np.cos(argument)
+            y += Pong.BG_ACCENT_SWAY * np.sin(argument)
+
+            ball_distance = np.hypot(x - ball_x, y - ball_y)
+            r = Pong.BG_ACCENT_RADIUS * (0.1 + np.exp(-ball_distance / decay))
+            pygame.draw.circle(screen, "black", (x, y), r)
+
+def time_frames(draw, screen) -> float:
+    """Returns the mean time per frame (in ms) of `draw`, with the ball sweeping across the screen."""
+    width, height = screen.get_size()
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        screen.fill("white")
+        draw(screen, frame * 0.01, width * frame / FRAMES, height / 2, 100)
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+def main():
+    pygame.init()
+    print(f"{'window':>12} {'loop (ms)':>10} {'vectorized (ms)':>16} {'speedup':>8}")
+    for size in WINDOW_SIZES:
+        screen = pygame.display.set_mode(size)
+        renderer = AccentRenderer(Pong.BG_ACCENT_PITCH, Pong.BG_ACCENT_RADIUS, Pong.BG_ACCENT_SWAY, Pong.BG_MARGIN)
+        loop_ms = time_frames(draw_accents_loop, screen)
+        vectorized_ms = time_frames(renderer.draw, screen)
+        print(f"{size[0]:>5}x{size[1]:<6} {loop_ms:>10.2f} {vectorized_ms:>16.2f} {loop_ms / vectorized_ms:>7.1f}x")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares moving and drawing many balls as a `BallSystem` (one set of array operations and one `blits` call for all
+of them) against a list of `Ball` objects (a python update and a `pygame.draw.circle` call per ball), from 1 to
+10,000 balls. The paddle covers the whole right side of the arena, so that no ball escapes and every ball keeps
+bouncing for the whole run. Also checks that both end up with the same balls in the same places, and exits with a
+non-zero status if they don't. Runs headless. From the project root:
+
+    python -m benchmarks.ball_system
+"""
+import math
+import os
+import random
+import sys
+import time
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from src.ball import Ball
+from src.ball_system import BallSystem
+from src.simulation import Box, PongSimulation
+from src.states.pong import Pong
+
+ARENA = Box(0, 0, 1280, 720)
+PADDLE = Box(ARENA.right - PongSimulation.PADDLE_WIDTH, ARENA.top, ARENA.right, ARENA.bottom)
+RADIUS = PongSimulation.BALL_RADIUS
+STEP_MS = 1000 / 240
+
+BALL_COUNTS = [1, 10, 100, 1000, 10_000]
+
+# Each measurement repeats for at least this long (and at least MIN_REPEATS times).
+MIN_DURATION_S = 0.5
+MIN_REPEATS = 3
+
+# The largest difference (in pixels) allowed between a `Ball` and its `BallSystem` counterpart after CHECK_STEPS.
+POSITION_TOLERANCE = 1e-6
+CHECK_STEPS = 240
+
+def random_balls(count: int, rng: random.Random) -> list:
+    return [(rng.uniform(ARENA.left + RADIUS, PADDLE.left - RADIUS), rng.uniform(ARENA.top + RADIUS, ARENA.bottom - RADIUS),
+             rng.uniform(PongSimulation.BALL_MIN_SPEED, PongSimulation.BALL_MAX_SPEED), rng.uniform(-math.pi, math.pi))
+            for _ in range(count)]
+
+def create_system(balls: list) -> BallSystem:
+    system = BallSystem()
+    for x, y, speed, angle in balls:
+        system.add(x, y, RADIUS, speed, angle)
+    return system
+
+def measure(action) -> float:
+    """Returns the mean time (in ms) that `action` takes."""
+    repeats = 0
+    start = time.perf_counter()
+    while repeats < MIN_REPEATS or time.perf_counter() - start < MIN_DURATION_S:
+        action()
+        repeats += 1
+    return (time.perf_counter() - start) * 1000 / repeats
+
+def check(rng: random.Random) -> float:
+    """Runs the same balls as `Ball`s and as a `BallSystem` with a moving paddle, and returns the largest difference."""
+    balls = random_balls(1000, rng)
+    objects = [Ball(x, y, RADIUS, speed, angle) for x, y, speed, angle in balls]
+    system = create_system(balls)
+    for step in range(CHECK_STEPS):
+        top = (ARENA.bottom - 100) * (0.5 + 0.5 * math.sin(step / 20))
+        paddle = Box(PADDLE.left, top, PADDLE.right, top + 100)
+        for ball in objects:
+            ball.update(STEP_MS, ARENA, paddle)
+        system.update(STEP_MS, ARENA, paddle)
+
+    positions = np.array([(ball.x, ball.y) for ball in objects])
+    return float(np.abs(positions - system.positions[:len(system)]).max())
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode((int(ARENA.right), int(ARENA.bottom)))
+    sprite = Pong.create_ball_sprite(RADIUS)
+    rng = random.Random(0)
+
+    print(f"{'balls':>6} {'BallSystem update':>18} {'Ball update':>12} {'speedup':>8} "
+          f"{'blits':>9} {'draw.circle':>12} {'speedup':>8}")
+    for count in BALL_COUNTS:
+        balls = random_balls(count, rng)
+        objects = [Ball(x, y, RADIUS, speed, angle) for x, y, speed, angle in balls]
+        system = create_system(balls)
+
+        def update_objects():
+            for ball in objects:
+                ball.update(STEP_MS, ARENA, PADDLE)
+
+        def draw_objects():
+            for ball in objects:
+                pygame.draw.circle(screen, "white", (ball.x, ball.y), RADIUS)
+
+        def draw_system():
+            positions = (system.interpolated_positions(1.0) - RADIUS).tolist()
+            screen.blits([(sprite, position) for position in positions], doreturn=False)
+
+        system_update_ms = measure(lambda: system.update(STEP_MS, ARENA, PADDLE))
+        object_update_ms = measure(update_objects)
+        system_draw_ms = measure(draw_system)
+        object_draw_ms = measure(draw_objects)
+        print(f"{count:>6} {system_update_ms:>16.3f}ms {object_update_ms:>10.3f}ms {object_update_ms / system_update_ms:>7.1f}x "
+              f"{system_draw_ms:>7.3f}ms {object_draw_ms:>10.3f}ms {object_draw_ms / system_draw_ms:>7.1f}x")
+
+    difference = check(rng)
+    print(f"Largest Ball vs BallSystem position difference after {CHECK_STEPS} steps: {difference:.2e} px")
+    sys.exit(0 if difference <= POSITION_TOLERANCE else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Stress test for the ball's swept collision detection. Fires balls at the paddle with extreme speeds and
+step lengths, and checks that:
+
+- every ball whose path (unfolded through top/bottom wall bounces) crosses the paddle's face reports a paddle
+  hit at exactly the analytically expected time, and
+- no ball ever ends a step overlapping the paddle or outside the walls.
+
+Exits with a non-zero status if anything is missed. From the project root:
+
+    python -m benchmarks.collision_stress
+"""
+import math
+import random
+import sys
+import time
+from pygame import Rect
+from src.ball import Ball, PADDLE
+
+ARENA = Rect(0, 0, 1280, 720)
+PADDLE_WIDTH = 20
+PADDLE_HEIGHT = 100
+RADIUS = 10
+TRIALS = 100_000
+
+# Speeds up to 1000x BALL_MAX_SPEED, and steps from a 1000 Hz tick up to a one second stall.
+SPEED_RANGE = (100, 1_000_000)
+DELTA_RANGE_MS = (1, 1000)
+
+# The analytic and swept impact times are compared with this tolerance.
+TIME_TOLERANCE_MS = 1e-6
+
+def unfolded_y(y0: float, vy: float, t: float) -> float:
+    """The y position at time `t` of a point bouncing between the top and bottom walls (shrunk by the radius)."""
+    low, high = ARENA.top + RADIUS, ARENA.bottom - RADIUS
+    span = high - low
+    u = (y0 - low + vy * t) % (2 * span)
+    return low + (u if u <= span else 2 * span - u)
+
+def overlaps_paddle(ball: Ball, paddle: Rect) -> bool:
+    closest_x = min(max(ball.x, paddle.left), paddle.right)
+    closest_y = min(max(ball.y, paddle.top), paddle.bottom)
+    # A tiny slack absorbs floating point error at the exact contact point.
+    return math.hypot(ball.x - closest_x, ball.y - closest_y) < RADIUS - 1e-6
+
+def run_trial(rng: random.Random) -> list:
+    """Runs one randomized shot at the paddle, and returns a list of failure descriptions (empty on success)."""
+    paddle = Rect(ARENA.width - PADDLE_WIDTH, rng.uniform(0, ARENA.height - PADDLE_HEIGHT), PADDLE_WIDTH, PADDLE_HEIGHT)
+
+    # Always start left of the paddle, heading right (at up to 80º from horizontal).
+    x = rng.uniform(ARENA.left + RADIUS, paddle.left - RADIUS - 1)
+    y = rng.uniform(ARENA.top + RADIUS, ARENA.bottom - RADIUS)
+    angle = rng.uniform(-1.4, 1.4)
+    speed = math.exp(rng.uniform(*map(math.log, SPEED_RANGE)))
+    delta_ms = rng.uniform(*DELTA_RANGE_MS)
+    ball = Ball(x, y, RADIUS, speed, angle)
+
+    vx, vy = math.cos(angle) * speed, math.sin(angle) * speed
+    face_time_ms = (paddle.left - RADIUS - x) / vx * 1000
+    face_y = unfolded_y(y, vy, face_time_ms / 1000)
+
+    impacts = ball.update(delta_ms, ARENA, paddle)
+    failures = []
+
+    # Only count face crossings that are unambiguous - shots that clip the paddle's rounded corner are valid
+    # hits too, but the simple unfolding above doesn't model them.
+    if face_time_ms <= delta_ms and paddle.top < face_y < paddle.bottom:
+        paddle_impacts = [impact for impact in impacts if impact.target == PADDLE]
+        if len(paddle_impacts) == 0:
+            failures.append(f"missed paddle hit: speed={speed:.0f} delta={delta_ms:.1f}ms")
+        elif abs(paddle_impacts[0].time_ms - face_time_ms) > TIME_TOLERANCE_MS * max(1, face_time_ms):
+            failures.append(f"wrong impact time: {paddle_impacts[0].time_ms} != {face_time_ms}")
+
+    if overlaps_paddle(ball, paddle):
+        failures.append(f"ended inside the paddle: speed={speed:.0f} delta={delta_ms:.1f}ms")
+
+    if not (ARENA.top + RADIUS - 1e-6 <= ball.y <= ARENA.bottom - RADIUS + 1e-6) or ball.x < ARENA.left + RADIUS - 1e-6:
+        failures.append(f"escaped the arena: ({ball.x}, {ball.y})")
+
+    return failures
+
+def main():
+    rng = random.Random(0)
+    failures = []
+    start = time.perf_counter()
+    for _ in range(TRIALS):
+        failures.extend(run_trial(rng))
+    elapsed = time.perf_counter() - start
+
+    print(f"{TRIALS} trials in {elapsed:.2f}s ({elapsed / TRIALS * 1e6:.1f}us per update), {len(failures)} failures")
+    for failure in failures[:20]:
+        print("  " + failure)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
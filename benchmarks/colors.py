@@ -0,0 +1,74 @@
+"""
+Compares the HSLuv lookup table used for the animated backgrounds against converting with the `hsluv` package
+(and filling the screen with the hex string it returns), and checks that the table's colors stay close to the
+exact ones. Error is measured as the CIE76 distance (in CIELUV, the space HSLuv is built on) between the
+table's color and the exact one, over uniformly random HSLuv colors. A distance of about 2.3 is commonly given
+as the smallest difference people notice.
+
+Exits with a non-zero status if the error is over its thresholds. Runs headless. From the project root:
+
+    python -m benchmarks.colors
+"""
+import os
+import sys
+import time
+import numpy as np
+import hsluv
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from src.colors import HsluvTable
+
+SAMPLES = 20_000
+TIMED_CALLS = 20_000
+
+# Most colors should be indistinguishable from the exact ones...
+MAX_P99_ERROR = 2.3
+# ...and none should be far off.
+MAX_ERROR = 4.0
+
+def rgb_to_luv(rgb: tuple) -> np.ndarray:
+    return np.array(hsluv.xyz_to_luv(hsluv.rgb_to_xyz(rgb)))
+
+def time_per_call_us(function, colors: np.ndarray) -> float:
+    start = time.perf_counter()
+    for hue, saturation, lightness in colors:
+        function(hue, saturation, lightness)
+    return (time.perf_counter() - start) / len(colors) * 1e6
+
+def main():
+    rng = np.random.default_rng(0)
+    colors = np.column_stack((rng.uniform(0, 360, SAMPLES), rng.uniform(0, 100, SAMPLES), rng.uniform(0, 100, SAMPLES)))
+    # Python floats, like the states pass in.
+    color_list = colors.tolist()
+
+    table = HsluvTable()
+    start = time.perf_counter()
+    table.table
+    print(f"Built a {table.table.nbytes / 2 ** 20:.1f} MB table in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    screen = pygame.display.set_mode((1280, 720))
+    calls = color_list[:TIMED_CALLS]
+    print(f"{'':<28} {'hsluv (us)':>12} {'table (us)':>12} {'speedup':>8}")
+    for label, exact, cached in (
+            ("conversion", lambda *hsl: hsluv.hsluv_to_hex(hsl), table.lookup),
+            ("conversion + screen.fill", lambda *hsl: screen.fill(hsluv.hsluv_to_hex(hsl)),
+             lambda *hsl: screen.fill(table.lookup(*hsl)))):
+        exact_us = time_per_call_us(exact, calls)
+        cached_us = time_per_call_us(cached, calls)
+        print(f"{label:<28} {exact_us:12.2f} {cached_us:12.2f} {exact_us / cached_us:7.1f}x")
+
+    errors = np.array([
+        np.linalg.norm(rgb_to_luv(np.array(table.lookup(*color)) / 255) - rgb_to_luv(hsluv.hsluv_to_rgb(color)))
+        for color in color_list])
+    p50, p99 = np.percentile(errors, (50, 99))
+    worst = color_list[errors.argmax()]
+    print(f"Color error (CIE76): median {p50:.2f}, p99 {p99:.2f} (limit {MAX_P99_ERROR}), "
+          f"max {errors.max():.2f} (limit {MAX_ERROR}) at HSLuv ({worst[0]:.1f}, {worst[1]:.1f}, {worst[2]:.1f})")
+
+    if p99 > MAX_P99_ERROR or errors.max() > MAX_ERROR:
+        print("FAILED: the table's colors are too far from the exact ones")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Offline evaluation of the paddle's filtering and prediction stage (`PositionPredictor`). Replays palm position
+traces through the filter the way the game would - detections arrive some latency after their camera frame was
+captured, and the paddle is updated at the simulation rate - and reports how far the paddle lags the hand and
+how much it jitters. The paddle is compared with the hand at simulation time, so render and display latency isn't
+included.
+
+With no arguments, synthetic traces (smooth hand motion plus landmark noise) are used, and the known true hand
+position is the reference. Recorded traces can be given as CSV files with `timestamp_ms,y` rows (capture time
+and normalized palm y). They have no ground truth, so a zero-phase (centered) smoothing of the trace stands in
+for it. From the project root:
+
+    python -m benchmarks.paddle_predictor [trace.csv ...] [--latency-ms 60]
+"""
+import argparse
+import csv
+import numpy as np
+from src.filters import PositionPredictor
+from src.states.pong import Pong
+
+SIMULATION_HZ = 240
+CAMERA_HZ = 30
+DURATION_S = 30
+
+# The range of time shifts searched when measuring lag.
+LAG_SEARCH_MS = np.arange(-100, 251, 2)
+
+# Jitter is measured as the paddle's deviation from its own moving average over this window (in ms).
+JITTER_WINDOW_MS = 100
+
+def synthetic_trace(seed: int, noise: float = 0.004) -> tuple:
+    """Returns `(capture_timestamps_ms, noisy_y, truth)` for a smoothly wandering hand, where `truth(t_ms)` is exact."""
+    rng = np.random.default_rng(seed)
+    frequencies = rng.uniform(0.1, 1.2, 4)
+    amplitudes = rng.uniform(0.03, 0.12, 4)
+    phases = rng.uniform(0, 2 * np.pi, 4)
+
+    def truth(t_ms):
+        t = np.asarray(t_ms)[..., None] / 1000
+        return 0.5 + np.sum(amplitudes * np.sin(2 * np.pi * frequencies * t + phases), axis=-1)
+
+    timestamps = np.arange(0, DURATION_S * 1000, 1000 / CAMERA_HZ)
+    timestamps += rng.uniform(0, 3, len(timestamps))  # Capture timing isn't perfectly regular
+    return timestamps, truth(timestamps) + rng.normal(0, noise, len(timestamps)), truth
+
+def recorded_trace(file: str) -> tuple:
+    """Loads a `timestamp_ms,y` CSV trace, with a centered moving average (±100ms) standing in for the truth."""
+    with open(file) as trace:
+        rows = [(float(row["timestamp_ms"]), float(row["y"])) for row in csv.DictReader(trace)]
+    timestamps, y = map(np.array, zip(*rows))
+
+    def truth(t_ms):
+        t_ms = np.asarray(t_ms)
+        window = np.abs(timestamps[None, :] - t_ms.reshape(-1, 1)) <= 100
+        return ((window * y).sum(axis=1) / np.maximum(window.sum(axis=1), 1)).reshape(t_ms.shape)
+
+    return timestamps, y, truth
+
+def simulate(timestamps, y, latency_ms: float, predictor: PositionPredictor | None) -> tuple:
+    """
+    Returns `(times_ms, paddle_y)` sampled at the simulation rate. Each detection becomes visible `latency_ms`
+    after its capture timestamp. Without a predictor, the paddle just follows the latest detection (as the game
+    originally did).
+    """
+    times = np.arange(timestamps[0] + latency_ms, timestamps[-1], 1000 / SIMULATION_HZ)
+    arrivals = timestamps + latency_ms
+    output = np.empty(len(times))
+    next_detection = 0
+    latest = y[0]
+
+    for i, now in enumerate(times):
+        while next_detection < len(timestamps) and arrivals[next_detection] <= now:
+            latest = y[next_detection]
+            if predictor is not None:
+                predictor.observe(latest, timestamps[next_detection])
+            next_detection += 1
+        output[i] = latest if predictor is None else predictor.predict(now)
+
+    return times, output
+
+def score(times, output, truth) -> tuple:
+    """
+    Returns `(lag_ms, jitter, rms_error)`. The lag is the time shift that best aligns the output with the truth.
+    The jitter is the RMS of the output's high frequency content (its deviation from its own centered moving
+    average), and the RMS error is measured against the truth at the same instant. Both are in frame heights.
+    """
+    errors = [np.mean((output - truth(times - shift)) ** 2) for shift in LAG_SEARCH_MS]
+    lag = LAG_SEARCH_MS[int(np.argmin(errors))]
+
+    window = int(JITTER_WINDOW_MS * SIMULATION_HZ / 1000) | 1
+    smoothed = np.convolve(output, np.ones(window) / window, mode="valid")
+    jitter = np.sqrt(np.mean((output[window // 2:len(smoothed) + window // 2] - smoothed) ** 2))
+
+    return lag, jitter, np.sqrt(np.mean((output - truth(times)) ** 2))
+
+def configurations():
+    """The filter settings compared, as `(name, factory)` pairs."""
+    min_cutoff, beta = Pong.PADDLE_FILTER_MIN_CUTOFF, Pong.PADDLE_FILTER_BETA
+    derivative_cutoff = Pong.PADDLE_FILTER_DERIVATIVE_CUTOFF
+    yield "raw (latest detection)", lambda: None
+    yield "1€ filter only", lambda: PositionPredictor(min_cutoff, beta, 0, derivative_cutoff, max_extrapolation_ms=0)
+    for horizon in sorted({0, 16, 50, Pong.PADDLE_PREDICTION_HORIZON_MS}):
+        yield f"1€ + prediction ({horizon}ms horizon)", \
+            lambda horizon=horizon: PositionPredictor(min_cutoff, beta, horizon, derivative_cutoff)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="*", help="recorded timestamp_ms,y CSV traces (synthetic if omitted)")
+    parser.add_argument("--latency-ms", type=float, default=60, help="capture-to-result latency to simulate")
+    args = parser.parse_args()
+
+    traces = [(file, recorded_trace(file)) for file in args.traces] or \
+             [(f"synthetic #{seed}", synthetic_trace(seed)) for seed in range(5)]
+
+    print(f"latency {args.latency_ms:.0f}ms, {len(traces)} traces (mean over traces)")
+    print(f"{'configuration':<34} {'lag (ms)':>9} {'jitter':>9} {'rms error':>10}")
+    for name, factory in configurations():
+        results = np.array([score(*simulate(timestamps, y, args.latency_ms, factory())[:2], truth)
+                            for _, (timestamps, y, truth) in traces])
+        lag, jitter, error = results.mean(axis=0)
+        print(f"{name:<34} {lag:>9.1f} {jitter:>9.4f} {error:>10.4f}")
+
+if __name__ == "__main__":
+    main()
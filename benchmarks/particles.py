@@ -0,0 +1,91 @@
+"""
+Compares the frame time of the pooled, vectorized `ParticleSystem` against a list of particle objects updated and
+drawn one at a time, with the system kept full at each particle budget the quality levels use. Runs headless. From
+the project root:
+
+    python -m benchmarks.particles
+"""
+import math
+import os
+import random
+import time
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from src.particles import ParticleSystem
+from src.quality import QualityGovernor
+
+WINDOW_SIZE = (1280, 720)
+FRAMES = 200
+
+# Frames are 60 Hz, and particles live for about half a second - so each frame replaces a 30th of them.
+FRAME_MS = 1000 / 60
+LIFETIME_MS = 500
+SPEED = 600
+RADIUS = 6
+
+class Particle:
+    """The straightforward alternative: one object per particle."""
+
+    def __init__(self, x, y, angle, speed):
+        self.x, self.y = x, y
+        self.vx, self.vy = math.cos(angle) * speed, math.sin(angle) * speed
+        self.age = 0.0
+        self.lifetime = LIFETIME_MS * random.uniform(0.7, 1.0)
+        self.radius = RADIUS * random.uniform(0.7, 1.0)
+
+    def update(self, delta_ms):
+        delta_s = delta_ms / 1000
+        self.x += self.vx * delta_s
+        self.y += self.vy * delta_s
+        drag = ParticleSystem.DRAG ** delta_s
+        self.vx *= drag
+        self.vy *= drag
+        self.age += delta_ms
+        return self.age < self.lifetime
+
+def run_objects(screen, budget: int) -> float:
+    """Returns the mean time per frame (in ms) of updating and drawing a list of `Particle`s."""
+    particles = []
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        particles = [particle for particle in particles if particle.update(FRAME_MS)]
+        for _ in range(min(budget // 30 + 1, budget - len(particles))):
+            particles.append(Particle(640, 360, random.uniform(-math.pi, math.pi), SPEED * random.uniform(0.2, 1.0)))
+
+        screen.fill("black")
+        for particle in particles:
+            radius = int(particle.radius * (1 - particle.age / particle.lifetime))
+            if radius > 0:
+                pygame.draw.circle(screen, "white", (particle.x, particle.y), radius)
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+def run_system(screen, budget: int) -> float:
+    """Returns the mean time per frame (in ms) of updating and drawing a `ParticleSystem`."""
+    particles = ParticleSystem(budget)
+    center = np.array([[640.0, 360.0]])
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        particles.update(FRAME_MS)
+        particles.emit(center, budget // 30 + 1, SPEED, LIFETIME_MS, RADIUS)
+
+        screen.fill("black")
+        particles.draw(screen)
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode(WINDOW_SIZE)
+
+    print(f"{'budget':>7} {'objects':>9} {'ParticleSystem':>15} {'speedup':>8}")
+    for level in QualityGovernor.LEVELS:
+        budget = level.particle_budget
+        if budget == 0:
+            continue
+        objects_ms = run_objects(screen, budget)
+        system_ms = run_system(screen, budget)
+        print(f"{budget:>7} {objects_ms:>7.2f}ms {system_ms:>13.2f}ms {objects_ms / system_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Plays pong games headless, as fast as they can be stepped, with a scripted paddle: a bot that chases the ball
+with a limited paddle speed, so that it eventually misses once the ball has sped up. Reports how many games and
+simulation steps are run per second, and how the bot scored. The simulation runs without pygame (which isn't
+even imported), by default at the game's fixed step rate. Collisions are swept, so longer steps are still exact
+(except that the ball speeds up at the end of the step after a hit, rather than right away) - `--step-hz 30` only
+updates the paddle as often as a camera would. `--batch N` plays N games at a time with `BatchedPongSimulation`,
+where every game in the batch is stepped by the same array operations. From the project root:
+
+    python -m benchmarks.simulation [--games N] [--batch N] [--paddle-speed S] [--step-hz HZ]
+"""
+import random
+import sys
+import time
+from argparse import ArgumentParser
+import numpy as np
+from src.simulation import PongSimulation, BatchedPongSimulation, GAME_OVER
+
+ARENA_SIZE = (1280, 720)
+
+# Games are cut short after this much simulated time.
+MAX_GAME_MS = 5 * 60 * 1000
+
+def play(rng: random.Random, paddle_speed: float, step_ms: float) -> tuple:
+    """
+    Plays one game, with the paddle moving up to `paddle_speed` (arena heights per second) towards the ball. Returns
+    the score and the number of steps simulated.
+    """
+    simulation = PongSimulation(*ARENA_SIZE)
+    # Each bot aims for a slightly different spot on the paddle, so games play out differently.
+    aim = rng.uniform(0.2, 0.8) * simulation.PADDLE_HEIGHT
+    travel = simulation.height - simulation.PADDLE_HEIGHT
+    position = 0.5
+    max_step = paddle_speed * step_ms / 1000
+
+    steps = 0
+    while steps * step_ms < MAX_GAME_MS:
+        events = simulation.step(step_ms)
+        steps += 1
+        if GAME_OVER in events:
+            break
+
+        target = (simulation.ball.y - aim) / travel
+        position += min(max(target - position, -max_step), max_step)
+        simulation.move_paddle(position)
+
+    return simulation.score, steps
+
+def play_batch(rng: random.Random, count: int, paddle_speed: float, step_ms: float) -> list:
+    """Plays `count` games at once, with the same bot as `play`. Returns the score and steps of each game."""
+    simulation = BatchedPongSimulation(count, *ARENA_SIZE)
+    aim = np.array([rng.uniform(0.2, 0.8) for _ in range(count)]) * simulation.PADDLE_HEIGHT
+    travel = simulation.height - simulation.PADDLE_HEIGHT
+    position = np.full(count, 0.5)
+    max_step = paddle_speed * step_ms / 1000
+
+    steps = np.zeros(count, dtype=int)
+    step = 0
+    while step * step_ms < MAX_GAME_MS and not simulation.over.all():
+        # Like `play`, the step a game ends on counts.
+        steps += ~simulation.over
+        simulation.step(step_ms)
+        step += 1
+
+        target = (simulation.balls.positions[:count, 1] - aim) / travel
+        position += np.clip(target - position, -max_step, max_step)
+        simulation.move_paddles(position)
+
+    return list(zip(simulation.scores.tolist(), steps.tolist()))
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=1, help="games stepped together (1 plays them one at a time)")
+    parser.add_argument("--paddle-speed", type=float, default=0.7, help="arena heights per second")
+    parser.add_argument("--step-hz", type=float, default=240, help="simulation steps per simulated second")
+    args = parser.parse_args()
+    step_ms = 1000 / args.step_hz
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    if args.batch > 1:
+        results = []
+        for first in range(0, args.games, args.batch):
+            results.extend(play_batch(rng, min(args.batch, args.games - first), args.paddle_speed, step_ms))
+    else:
+        results = [play(rng, args.paddle_speed, step_ms) for _ in range(args.games)]
+    elapsed = time.perf_counter() - start
+
+    scores = sorted(score for score, _ in results)
+    steps = sum(steps for _, steps in results)
+    print(f"{args.games} games ({steps} steps, {steps * step_ms / 1000 / 3600:.2f} simulated hours) in {elapsed:.2f} s")
+    print(f"{args.games / elapsed:.1f} games/s, {steps / elapsed:.0f} steps/s "
+          f"({steps * step_ms / 1000 / elapsed:.0f}x real time)")
+    print(f"Bot scores: median {scores[len(scores) // 2]}, best {scores[-1]}")
+    print(f"pygame imported: {'pygame' in sys.modules}")
+
+if __name__ == "__main__":
+    main()
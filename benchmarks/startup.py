@@ -0,0 +1,111 @@
+"""
+Measures how quickly the game starts: the time to its first frame (the setup screen being shown) and to its
+first hand detection result (from a synthetic camera). Each run happens in a fresh process, so module imports
+are included. Startup is measured both with the detector loading in the background (as the game does) and
+with the old behaviour of loading it before anything is shown. Runs headless. From the project root:
+
+    python -m benchmarks.startup [--runs N]
+"""
+import time
+
+# Taken before any other imports, so that they count towards startup.
+START_TIME = time.perf_counter()
+
+import json
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# How long to wait for the first detection before giving up (s).
+DETECTION_TIMEOUT_S = 30
+
+class SyntheticCamera:
+    """A stand-in for `cv2.VideoCapture` that delivers a static noise image at roughly 60 fps."""
+
+    def __init__(self):
+        self.image = np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self, buffer=None):
+        time.sleep(1 / 60)
+        if buffer is None:
+            buffer = np.empty_like(self.image)
+        np.copyto(buffer, self.image)
+        return True, buffer
+
+    def release(self) -> None:
+        pass
+
+def measure(eager: bool) -> dict:
+    """Starts the game up to its first detection, and returns the time (ms) each milestone took."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    from src.game import Game
+    from src.states.setup import Setup
+
+    game = Game(ROOT_DIR, vsync=False)
+    screen = game.create_window()
+    if eager:
+        game.tracking.wait_for_detector()
+
+    state = Setup(game.assets, game.font, game.tracking, game.quality, game.cameras)
+    state.draw(screen)
+    pygame.display.flip()
+    results = {"first_frame_ms": (time.perf_counter() - START_TIME) * 1000}
+
+    game.tracking.camera = SyntheticCamera()
+    while time.perf_counter() - START_TIME < DETECTION_TIMEOUT_S:
+        if game.tracking.hands.timestamp_ms is not None:
+            results["first_detection_ms"] = (time.perf_counter() - START_TIME) * 1000
+            break
+        if game.tracking.detector_error is not None:
+            results["error"] = game.tracking.detector_error
+            break
+
+        game.tracking.update(pygame.time.get_ticks())
+        state.draw(screen)
+        pygame.display.flip()
+
+    game.tracking.close()
+    return results
+
+def run_child(mode: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", mode],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def format_ms(values: list) -> str:
+    return f"{np.median(values):8.0f}" if len(values) > 0 else f"{'n/a':>8}"
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="how many fresh processes to time per mode")
+    parser.add_argument("--child", choices=["lazy", "eager"], help="(internal) measure a single startup")
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child == "eager")))
+        return
+
+    print(f"Median of {args.runs} runs (ms since the process started importing modules)")
+    print(f"{'detector loading':<20} {'first frame':>12} {'first detection':>16}")
+    for mode, label in (("eager", "before first frame"), ("lazy", "in background")):
+        runs = [run_child(mode) for _ in range(args.runs)]
+        first_frames = [run["first_frame_ms"] for run in runs]
+        first_detections = [run["first_detection_ms"] for run in runs if "first_detection_ms" in run]
+        print(f"{label:<20} {format_ms(first_frames):>12} {format_ms(first_detections):>16}")
+
+        errors = {run["error"] for run in runs if "error" in run}
+        for error in errors:
+            print(f"  (the detector failed to load: {error})")
+
+if __name__ == "__main__":
+    main()
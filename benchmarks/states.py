@@ -0,0 +1,370 @@
+"""
+Runs the game's states - the setup screen, pong and multi-ball pong - headless, with a synthetic camera and either a
+synthetic hand (a bot that moves the paddle to the ball) or a recorded landmark stream (`--replay`), and reports the
+per-frame `update` and `draw` time percentiles, memory allocated per frame and frame throughput of each state at each
+window size. The states run unchanged, driven like the game loop drives them, except that game time advances a fixed
+60th of a second every frame. The full game loop (`Game.start`) is then run for `--game-frames` frames at each size
+too, replaying a recording. Results are written as JSON to `--output`, and compared against the baseline: anything
+that got more than `--tolerance` (as a fraction) worse is flagged, and the exit status is 1. Timings depend on the
+machine, so the baseline is stored locally, with `--update-baseline`. From the project root:
+
+    python -m benchmarks.states [--frames N] [--sizes 1280x720,1920x1080] [--quality high] [--replay FILE]
+                                [--game-frames N] [--output FILE] [--baseline FILE] [--update-baseline]
+"""
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+from src.assets import AssetManager
+from src.camera import CameraRegistry
+from src.events import START_PONG, GAME_OVER
+from src.game import Game
+from src.instrumentation import RingHistogram
+from src.landmarks import HandLandmarks
+from src.quality import QualityGovernor
+from src.recording import LandmarkRecorder, LandmarkReplay
+from src.states.pong import Pong
+from src.states.setup import Setup
+from src.states.state import State
+from src.tracking_context import TrackingContext
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+
+# Each frame advances game time by FRAME_MS, in fixed simulation steps like `Game.start` takes.
+FRAME_MS = 1000 / 60
+STEP_MS = 1000 / Game.SIMULATION_HZ
+STEPS_PER_FRAME = round(FRAME_MS / STEP_MS)
+
+# The synthetic hand is "detected" at this interval (ms), like a 30 fps camera.
+DETECTION_INTERVAL_MS = 1000 / 30
+
+# Frames run before measuring, so that one-off work (sprite and text renders, the color table) isn't counted.
+WARMUP_FRAMES = 60
+
+# Allocations are measured in a separate pass of (at most) this many frames, since tracing them slows everything down.
+ALLOCATION_FRAMES = 120
+
+PERCENTILES = (50, 95, 99)
+
+# The measurements compared against the baseline: (measurement, statistic, noise). A difference is only flagged
+# if it's also bigger than `noise` (in the measurement's unit), so that timer jitter on tiny numbers isn't.
+COMPARED = (
+    ("update_ms", "p50", 0.05),
+    ("update_ms", "p95", 0.1),
+    ("draw_ms", "p50", 0.05),
+    ("draw_ms", "p95", 0.1),
+    ("frame_ms", "p50", 0.1),
+    ("alloc_kib", "p50", 4),
+)
+
+class SyntheticCamera:
+    """A stand-in for `cv2.VideoCapture` that delivers the same noise image every time it's read, without waiting."""
+
+    def __init__(self, size: Tuple[int, int] = (1280, 720)):
+        self.image = np.random.default_rng(0).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self, buffer=None):
+        if buffer is None:
+            buffer = np.empty_like(self.image)
+        np.copyto(buffer, self.image)
+        return True, buffer
+
+    def release(self) -> None:
+        pass
+
+class SyntheticHand:
+    """
+    Stands in for the player's hand and the hand detector: every DETECTION_INTERVAL_MS, publishes a detection result
+    with one hand, held so that the paddle goes to wherever `aim` says.
+    """
+
+    def __init__(self, tracking: TrackingContext, aim: Callable[[], float]):
+        self.tracking = tracking
+        self.aim = aim
+        self.hands = HandLandmarks()
+        self.next_detection_ms = 0.0
+
+    def update(self, now_ms: float) -> None:
+        if now_ms < self.next_detection_ms:
+            return
+        self.next_detection_ms = now_ms + DETECTION_INTERVAL_MS
+
+        # Pong maps palm heights between 0.2 and 0.8 (of the frame) onto the paddle's range.
+        hands = self.hands
+        hands.hand_count = 1
+        hands.handedness[0] = 1
+        hands.scores[0] = 0.95
+        hands.landmarks[0, :, 0] = 0.5
+        hands.landmarks[0, :, 1] = 0.2 + 0.6 * min(max(self.aim(), 0.0), 1.0)
+        self.tracking.hand_landmarker_callback(hands, int(now_ms))
+
+class StateRunner:
+    """
+    Drives a state like the game loop does, with its own tracking context (fed by a synthetic camera, and either a
+    synthetic hand or a replay). Game time starts at 0 and advances by exactly FRAME_MS each frame.
+    """
+
+    state: State
+    tracking: TrackingContext
+    hand: SyntheticHand | None
+
+    # Game time (ms).
+    time_ms: float
+
+    # How many times the state asked for a transition (the game starting, or a game ending). The state is reset
+    # instead, so that it keeps being measured.
+    transitions: int
+
+    def __init__(self, make_state: Callable[[TrackingContext], State], replay_path: str | None):
+        self.time_ms = 0.0
+        self.transitions = 0
+        self.tracking = TrackingContext(ROOT_DIR, SyntheticCamera(), detector_backend=None, clock=self.now_ms)
+        self.hand = None
+        if replay_path is not None:
+            self.tracking.replay = LandmarkReplay(replay_path, loop=True)
+        else:
+            self.hand = SyntheticHand(self.tracking, self.aim)
+        self.state = make_state(self.tracking)
+
+    def now_ms(self) -> int:
+        return int(self.time_ms)
+
+    def aim(self) -> float:
+        """Where the paddle should be: centered on the (first) ball if the state has one, otherwise in the middle."""
+        simulation = getattr(self.state, "simulation", None)
+        if simulation is None:
+            return 0.5
+        positions = simulation.ball_positions()
+        if len(positions) == 0:
+            return 0.5
+        return (positions[0, 1] - simulation.PADDLE_HEIGHT / 2) / (simulation.height - simulation.PADDLE_HEIGHT)
+
+    def frame(self, screen: pygame.Surface) -> Tuple[float, float]:
+        """Runs one frame, and returns how long (ms) the state's updates (per frame and per step) and draw took."""
+        self.time_ms += FRAME_MS
+        if self.hand is not None:
+            self.hand.update(self.time_ms)
+        self.tracking.update(self.now_ms())
+
+        start = time.perf_counter()
+        self.state.frame_update(FRAME_MS)
+        for _ in range(STEPS_PER_FRAME):
+            self.state.update(STEP_MS)
+        updated = time.perf_counter()
+        self.state.draw(screen)
+        drawn = time.perf_counter()
+
+        for event in pygame.event.get():
+            if event.type in (START_PONG, GAME_OVER):
+                self.state.reset()
+                self.transitions += 1
+            else:
+                self.state.handle_event(event)
+        return (updated - start) * 1000, (drawn - updated) * 1000
+
+def measure_state(runner: StateRunner, screen: pygame.Surface, frames: int) -> dict:
+    for _ in range(WARMUP_FRAMES):
+        runner.frame(screen)
+
+    update_ms = RingHistogram(frames)
+    draw_ms = RingHistogram(frames)
+    frame_ms = RingHistogram(frames)
+    for _ in range(frames):
+        update, draw = runner.frame(screen)
+        update_ms.record(update)
+        draw_ms.record(draw)
+        frame_ms.record(update + draw)
+
+    # The traced pass measures how much memory (Python objects and numpy arrays) each frame allocates at its
+    # peak, and how much of it is still allocated at the end of the frame.
+    allocation_frames = min(frames, ALLOCATION_FRAMES)
+    alloc_kib = RingHistogram(allocation_frames)
+    retained_kib = RingHistogram(allocation_frames)
+    tracemalloc.start()
+    for _ in range(allocation_frames):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        runner.frame(screen)
+        after, peak = tracemalloc.get_traced_memory()
+        alloc_kib.record((peak - before) / 1024)
+        retained_kib.record((after - before) / 1024)
+    tracemalloc.stop()
+
+    return {
+        "update_ms": update_ms.summary(PERCENTILES),
+        "draw_ms": draw_ms.summary(PERCENTILES),
+        "frame_ms": frame_ms.summary(PERCENTILES),
+        "alloc_kib": alloc_kib.summary(PERCENTILES),
+        "retained_kib": retained_kib.summary(PERCENTILES),
+        "fps": frames / (frame_ms.samples().sum() / 1000),
+        "transitions": runner.transitions,
+    }
+
+def run_states(sizes: List[Tuple[int, int]], frames: int, quality_level: int, replay_path: str | None) -> Dict[str, dict]:
+    pygame.init()
+    assets = AssetManager(ROOT_DIR)
+    font = assets.font("assets/MadimiOne-Regular.ttf", 24)
+    cameras = CameraRegistry()
+    quality = QualityGovernor(FRAME_MS)
+    quality.level_index = quality_level
+
+    states = {
+        "setup": lambda tracking: Setup(assets, font, tracking, quality, cameras, "synthetic camera"),
+        "pong": lambda tracking: Pong(assets, font, tracking, quality),
+        "pong-multi-ball": lambda tracking: Pong(assets, font, tracking, quality, multi_ball=True),
+    }
+
+    results = {}
+    for size in sizes:
+        screen = pygame.display.set_mode(size)
+        for name, make_state in states.items():
+            runner = StateRunner(make_state, replay_path)
+            key = f"{name}@{size[0]}x{size[1]}"
+            results[key] = measure_state(runner, screen, frames)
+            runner.tracking.close()
+            print_result(key, results[key])
+    pygame.quit()
+    return results
+
+def write_synthetic_recording(file: str, duration_ms: float) -> None:
+    """Records a hand that's held up and moved slowly up and down, detected at DETECTION_INTERVAL_MS."""
+    recorder = LandmarkRecorder(file)
+    hands = HandLandmarks()
+    hands.hand_count = 1
+    hands.handedness[0] = 1
+    hands.scores[0] = 0.95
+    hands.landmarks[0, :, 0] = 0.5
+    for i in range(int(duration_ms / DETECTION_INTERVAL_MS) + 1):
+        timestamp_ms = i * DETECTION_INTERVAL_MS
+        hands.landmarks[0, :, 1] = 0.5 + 0.3 * math.sin(timestamp_ms / 700)
+        recorder.record(hands, int(timestamp_ms))
+    recorder.close()
+
+def run_game(sizes: List[Tuple[int, int]], frames: int, replay_path: str) -> Dict[str, dict]:
+    """Runs the whole game loop for `frames` frames at each size, replaying `replay_path` (from the setup screen on)."""
+    results = {}
+    for size in sizes:
+        game = Game(ROOT_DIR, vsync=False, replay_path=replay_path)
+        game.WINDOW_SIZE = size
+        start = time.perf_counter()
+        game.start(max_frames=frames)
+        elapsed = time.perf_counter() - start
+
+        histograms = game.profiler.histograms
+        key = f"game@{size[0]}x{size[1]}"
+        results[key] = {
+            "update_ms": histograms["update"].summary(PERCENTILES),
+            "draw_ms": histograms["draw"].summary(PERCENTILES),
+            "frame_ms": histograms["frame"].summary(PERCENTILES),
+            "fps": frames / elapsed,
+        }
+        print_result(key, results[key])
+    return results
+
+def print_result(key: str, result: dict) -> None:
+    def percentiles(summary: dict) -> str:
+        return "/".join(f"{summary[f'p{p}']:.2f}" for p in PERCENTILES)
+
+    alloc = f"{result['alloc_kib']['p50']:8.1f}" if "alloc_kib" in result else f"{'-':>8}"
+    print(f"{key:<28} {percentiles(result['update_ms']):>17} {percentiles(result['draw_ms']):>17} {alloc} "
+          f"{result['fps']:8.0f}")
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    regressions = []
+    for key, result in results["runs"].items():
+        base = baseline["runs"].get(key)
+        if base is None:
+            continue
+        for measurement, statistic, noise in COMPARED:
+            if measurement not in result or measurement not in base:
+                continue
+            value = result[measurement][statistic]
+            base_value = base[measurement][statistic]
+            if value > base_value * (1 + tolerance) and value - base_value > noise:
+                change = f" (+{(value / base_value - 1) * 100:.0f}%)" if base_value > 0 else ""
+                regressions.append(f"{key} {measurement} {statistic}: {base_value:.2f} -> {value:.2f}{change}")
+    return regressions
+
+def main():
+    level_names = [level.name for level in QualityGovernor.LEVELS]
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=600, help="measured frames per state and size")
+    parser.add_argument("--sizes", default="1280x720,1920x1080", help="comma separated window sizes")
+    parser.add_argument("--quality", choices=level_names, default=level_names[0])
+    parser.add_argument("--replay", help="a landmark recording to use instead of the synthetic hand")
+    parser.add_argument("--game-frames", type=int, default=900, help="frames of the full game loop (0 skips it)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    sizes = [tuple(int(n) for n in size.split("x")) for size in args.sizes.split(",")]
+
+    print(f"{'run':<28} {'update p50/95/99':>17} {'draw p50/95/99':>17} {'KiB/frm':>8} {'fps':>8}")
+    runs = run_states(sizes, args.frames, level_names.index(args.quality), args.replay)
+    if args.game_frames > 0:
+        with tempfile.TemporaryDirectory() as directory:
+            replay_path = args.replay
+            if replay_path is None:
+                replay_path = os.path.join(directory, "synthetic.landmarks")
+                write_synthetic_recording(replay_path, args.game_frames * Game.REPLAY_FRAME_MS)
+            runs.update(run_game(sizes, args.game_frames, replay_path))
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "settings": {
+            "frames": args.frames,
+            "game_frames": args.game_frames,
+            "quality": args.quality,
+            "input": args.replay or "synthetic",
+        },
+        "runs": runs,
+    }
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Wrote results to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as output:
+            json.dump(results, output, indent=2)
+        print(f"Stored the results as the baseline in {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} to compare against (store one with --update-baseline)")
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline["settings"] != results["settings"]:
+        print(f"Warning: the baseline was run with different settings: {baseline['settings']}")
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if len(regressions) > 0:
+        print(f"{len(regressions)} regressions (more than {args.tolerance * 100:.0f}% worse than the baseline):")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions against the baseline (tolerance {args.tolerance * 100:.0f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,36 @@
+from argparse import ArgumentParser
 from os import path
 from src.game import Game
+from src.detectors import IN_PROCESS, OUT_OF_PROCESS
 
 ROOT_DIR = path.dirname(path.abspath(__file__))
 
 if __name__ == "__main__":
-    Game(ROOT_DIR).start()
\ No newline at end of file
+    parser = ArgumentParser(description="A relaxing, colorful pong game controlled by your webcam's view of your hand.")
+    parser.add_argument("--detector", choices=[IN_PROCESS, OUT_OF_PROCESS], default=IN_PROCESS,
+                        help="where hand detection runs: in the game process, or in a separate worker process")
+    parser.add_argument("--no-vsync", action="store_true",
+                        help="don't synchronize frames to the display's refresh rate. Pygame can only vsync a scaled "
+                             "window, which is upscaled on large screens - this keeps a plain window instead")
+    parser.add_argument("--max-fps", type=int, default=0, help="cap the render frame rate (0 means uncapped)")
+    parser.add_argument("--no-roi", action="store_true",
+                        help="always run hand detection on the full camera frame, instead of a crop around the hand")
+    parser.add_argument("--no-motion-gate", action="store_true",
+                        help="run hand detection on every camera frame, even when nothing in view has changed")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="on exit, write per-stage frame timings and tracking latencies to FILE (.json or .csv)")
+    parser.add_argument("--profile-overlay", action="store_true",
+                        help="show frame timings on screen from the start (toggle with F3)")
+    parser.add_argument("--multi-ball", action="store_true",
+                        help="play a game mode where the ball splits in two every few hits")
+    parser.add_argument("--input", metavar="PATH",
+                        help="play a video file, or a directory (or glob pattern) of images, instead of using a camera")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="replay hand tracking results recorded with --record, instead of using a camera")
+    parser.add_argument("--record", metavar="FILE", help="record hand tracking results to FILE, for --replay")
+    args = parser.parse_args()
+
+    Game(ROOT_DIR, detector_backend=args.detector, vsync=not args.no_vsync, max_fps=args.max_fps,
+         roi_mode=not args.no_roi, motion_gating=not args.no_motion_gate, profile_path=args.profile,
+         show_profiler_overlay=args.profile_overlay, multi_ball=args.multi_ball, input_path=args.input,
+         replay_path=args.replay, record_path=args.record).start()
\ No newline at end of file
@@ -0,0 +1,116 @@
+from typing import List, Tuple
+import numpy as np
+from pygame import Surface
+from .sprites import render_circle_sprites
+
+class AccentRenderer:
+    """
+    Draws the hexagonal lattice of swaying black circles behind the pong game. The lattice geometry is only
+    recomputed when the screen size changes, the per-frame sway and ball proximity falloff are computed for
+    every circle at once with numpy, and the circles themselves are blitted from a cache of pre-rendered
+    sprites (one per integer radius) in a single `Surface.blits` call.
+    """
+
+    pitch: int
+    radius: int
+    sway: int
+    margin: int
+    color: str
+
+    # The screen size the cached lattice was built for.
+    grid_size: Tuple[int, int] | None
+
+    # Unswayed circle centers and their animation phase offsets, one entry per circle.
+    base_x: np.ndarray
+    base_y: np.ndarray
+    phase_offsets: np.ndarray
+
+    # Pre-rendered circles, indexed by integer radius.
+    sprites: List[Surface]
+
+    def __init__(self, pitch: int, radius: int, sway: int, margin: int, color: str = "black"):
+        self.pitch = pitch
+        self.radius = radius
+        self.sway = sway
+        self.margin = margin
+        self.color = color
+        self.grid_size = None
+        self.base_x = np.empty(0)
+        self.base_y = np.empty(0)
+        self.phase_offsets = np.empty(0)
+        self.sprites = []
+
+    def draw(self, screen: Surface, phase: float, ball_x: float, ball_y: float, decay: float) -> None:
+        """
+        Draws the accents onto `screen`. Each circle's radius grows as the ball approaches it, with the
+        exponential decay length `decay`.
+        """
+        if self.grid_size != screen.get_size():
+            self.build_grid(*screen.get_size())
+        self.render(screen, phase, ball_x, ball_y, decay)
+
+    def render(self, surface: Surface, phase: float, ball_x: float, ball_y: float, decay: float) -> None:
+        """Draws the accents for the current frame onto `surface`, which must match the lattice's screen size."""
+        if len(self.base_x) == 0:
+            return
+
+        if len(self.sprites) == 0:
+            # Radii never exceed 1.1x the accent radius (see below).
+            self.sprites = render_circle_sprites(int(self.radius * 1.1), self.color)
+
+        argument = self.phase_offsets + phase
+        x = self.base_x + self.sway * np.cos(argument)
+        y = self.base_y + self.sway * np.sin(argument)
+
+        # The radius changes with the distance to the ball to make the background "track" it.
+        ball_distance = np.hypot(x - ball_x, y - ball_y)
+        radii = (self.radius * (0.1 + np.exp(-ball_distance / decay))).astype(np.intp)
+
+        # Sprites are positioned by their top left corner, which is one radius up and left of the center.
+        left = (x - radii).astype(np.intp).tolist()
+        top = (y - radii).astype(np.intp).tolist()
+
+        sprites = self.sprites
+        surface.blits([(sprites[r], (l, t)) for r, l, t in zip(radii.tolist(), left, top)], doreturn=False)
+
+    def build_grid(self, width: int, height: int) -> None:
+        """Computes the lattice positions for a screen of the given size."""
+        self.grid_size = (width, height)
+
+        # The pitch is the target spacing between accents - but it rarely exactly divides the background
+        # area. Here, we choose a pitch that is as close as possible to it but that actually exactly divides the grid.
+        full_margin = 2 * (self.margin + self.radius)
+        w = width - full_margin
+        h = height - full_margin
+
+        x_count = w // self.pitch
+        # The spacing between rows is less than the spacing between columns by cos(30º) because
+        # we want to make a regular hexagonal (not a rectangular) grid
+        y_count = h // int(self.pitch * np.cos(np.pi / 6))
+
+        # This hexagonal tiling is only really well defined for grid sizes > 2x2. The default screen
+        # size should never be this small, but we'd rather the game get uglier than have a divide by
+        # zero error so we draw nothing.
+        if x_count <= 1 or y_count <= 1:
+            self.base_x = self.base_y = self.phase_offsets = np.empty(0)
+            return
+
+        # If there are x_count circles spread over a width w (one circle on each boundary),
+        # then there are x_count - 1 *gaps* between the posts.
+        dx = w / (x_count - 1)
+        dy = h / (y_count - 1)
+
+        # The position of the top left circle.
+        x0 = self.margin + self.radius
+        y0 = x0
+
+        i, j = np.meshgrid(np.arange(x_count), np.arange(y_count), indexing="ij")
+        staggered = j % 2 == 0
+
+        # Staggered rows are shifted left by half a column, and fit one fewer dot in the permitted area.
+        keep = ~(staggered & (i == 0))
+        i, j, staggered = i[keep], j[keep], staggered[keep]
+
+        self.base_x = x0 + i * dx - staggered * (dx / 2)
+        self.base_y = y0 + j * dy
+        self.phase_offsets = (10 * i + j).astype(np.float64)
@@ -0,0 +1,51 @@
+import os
+from os import path
+from typing import Dict, Tuple
+import pygame
+from pygame.freetype import Font
+from .text_cache import TextCache
+from .colors import HsluvTable
+
+# Where things worth keeping between launches (but that can be recreated at any time) are stored.
+CACHE_DIR = path.join(os.environ.get("XDG_CACHE_HOME", path.join(path.expanduser("~"), ".cache")), "cz_pong")
+
+class AssetManager:
+    """
+    Loads sounds, fonts and music from the assets folder the first time they're asked for, and hands out the
+    same shared object after that - so restarting the game doesn't decode anything again. Paths are relative
+    to the project root.
+    """
+
+    root_dir: str
+
+    # Rendered HUD text, shared by every state.
+    text_cache: TextCache
+
+    # Converts the HSLuv colors of the animated backgrounds to RGB.
+    colors: HsluvTable
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.text_cache = TextCache()
+        self.colors = HsluvTable(path.join(CACHE_DIR, "hsluv_table.npy"))
+        self._sounds: Dict[str, pygame.mixer.Sound] = {}
+        self._fonts: Dict[Tuple[str, int], Font] = {}
+        self._music_path: str | None = None
+
+    def sound(self, asset_path: str) -> pygame.mixer.Sound:
+        """Returns the sound at `asset_path`. It's shared, so changing its volume changes it everywhere."""
+        if asset_path not in self._sounds:
+            self._sounds[asset_path] = pygame.mixer.Sound(path.join(self.root_dir, asset_path))
+        return self._sounds[asset_path]
+
+    def font(self, asset_path: str, size: int) -> Font:
+        key = (asset_path, size)
+        if key not in self._fonts:
+            self._fonts[key] = Font(path.join(self.root_dir, asset_path), size)
+        return self._fonts[key]
+
+    def load_music(self, asset_path: str) -> None:
+        """Loads `asset_path` into the music player, unless it's already loaded."""
+        if self._music_path != asset_path:
+            pygame.mixer.music.load(path.join(self.root_dir, asset_path))
+            self._music_path = asset_path
@@ -1,57 +1,213 @@
-from typing import Tuple
-import pygame
-import numpy as np
+from typing import List, NamedTuple, Tuple
+import math
+
+# Collision targets reported in `Impact.target`.
+PADDLE = "paddle"
+WALL = "wall"
+
+class Impact(NamedTuple):
+    # How far into the update (in ms) the ball touched the surface.
+    time_ms: float
+
+    # What the ball hit - either PADDLE or WALL.
+    target: str
+
+    # Where the ball's center was when it touched the surface.
+    x: float
+    y: float
 
 class Ball:
-    def __init__(self, x, y, radius, speed, angle, color):
+    """
+    A ball moving through an arena with a paddle in it. Rects (the arena and the paddle) can be anything with
+    `left`, `top`, `right` and `bottom` attributes - like pygame's `Rect` or `simulation.Box`. Drawing is left to
+    the caller, so this has no dependency on pygame.
+    """
+
+    # The most surfaces the ball can bounce off in a single update. This only matters when the ball is wedged
+    # between the paddle and a wall - in that case, the rest of the update is dropped rather than tunnelling.
+    MAX_BOUNCES = 16
+
+    def __init__(self, x, y, radius, speed, angle):
         self.x = x
         self.y = y
+        # The position at the start of the most recent update, used for render interpolation.
+        self.previous_x = x
+        self.previous_y = y
         self.radius = radius
         self.speed = speed
-        self.color = color
-        self.direction = np.array([np.cos(angle), np.sin(angle)])
-
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, (self.x, self.y), self.radius)
-
-    def update(self, delta_ms, screen_rect, paddle_rect) -> Tuple[bool, bool]:
-        # Calculate new position based on speed, direction, and delta time
-        movement = self.direction * self.speed * delta_ms / 1000.0
-        self.x += movement[0]
-        self.y += movement[1]
-        hit_paddle = False
-        hit_wall = False
-
-        # Create a rect for the ball to use for collision detection
-        ball_rect = pygame.Rect(self.x - self.radius, self.y - self.radius, self.radius * 2, self.radius * 2)
-
-        # Check for collision with the paddle
-        if ball_rect.colliderect(paddle_rect):
-            # Reflect the horizontal direction
-            self.direction[0] *= -1
-            # Adjust position to prevent sticking
-            if self.x > screen_rect.width / 2:  # Assuming the paddle is on the right
-                self.x = paddle_rect.left - self.radius - 1
+        # A unit vector. Plain floats are much cheaper than a numpy array for a single ball - see `BallSystem` for
+        # many balls at once.
+        self.direction_x = math.cos(angle)
+        self.direction_y = math.sin(angle)
+
+    def interpolated_position(self, alpha: float) -> Tuple[float, float]:
+        """
+        Returns the ball's position `alpha` of the way between the start and end of the most recent update.
+        """
+        return (self.previous_x + (self.x - self.previous_x) * alpha,
+                self.previous_y + (self.y - self.previous_y) * alpha)
+
+    def update(self, delta_ms, screen_rect, paddle_rect) -> List[Impact]:
+        """
+        Moves the ball forward by `delta_ms`, bouncing off the paddle and the top, bottom and left walls. Collisions
+        are swept - the ball's path is traced continuously rather than checked for overlap at the end of the step -
+        so the ball can't pass through the paddle no matter how fast it moves or how long the step is. Returns every
+        impact in the order it happened.
+        """
+        self.previous_x = self.x
+        self.previous_y = self.y
+
+        x, y = self.x, self.y
+        vx = self.direction_x * self.speed
+        vy = self.direction_y * self.speed
+        remaining = delta_ms / 1000.0
+        impacts = []
+
+        for _ in range(self.MAX_BOUNCES):
+            # Find the first surface the ball touches within the rest of the step.
+            wall_time, wall_normal = self.time_to_walls(x, y, vx, vy, screen_rect)
+            paddle_time, paddle_normal = self.time_to_rect(x, y, vx, vy, paddle_rect, remaining)
+            if paddle_time <= wall_time:
+                time, normal, target = paddle_time, paddle_normal, PADDLE
             else:
-                self.x = paddle_rect.right + self.radius + 1
-            
-            hit_paddle = True
-
-        # Bounce off top and bottom
-        if ball_rect.top <= screen_rect.top:
-            self.direction[1] *= -1
-            self.y = screen_rect.top + self.radius + 1
-            hit_wall = True
-        
-        if ball_rect.bottom >= screen_rect.bottom:
-            self.direction[1] *= -1
-            self.y = screen_rect.bottom - self.radius - 1
-            hit_wall = True
-
-        # Bounce off the left (or right, if you want to change it, invert the logic here)
-        if ball_rect.left <= screen_rect.left:  # Change to `ball_rect.right >= screen_rect.right` for right-side bounce
-            self.direction[0] *= -1
-            self.x = screen_rect.left + self.radius + 1
-            hit_wall = True
-
-        return (hit_paddle, hit_wall)
+                time, normal, target = wall_time, wall_normal, WALL
+
+            if time > remaining:
+                x += vx * remaining
+                y += vy * remaining
+                remaining = 0
+                break
+
+            x += vx * time
+            y += vy * time
+            remaining -= time
+
+            # Reflect the velocity about the surface normal
+            nx, ny = normal
+            dot = vx * nx + vy * ny
+            vx -= 2 * dot * nx
+            vy -= 2 * dot * ny
+
+            if target == WALL:
+                # The ball might have started slightly out of bounds (i.e. after a window resize) - snap it back.
+                x, y = self.clamp_to_walls(x, y, screen_rect)
+            elif time == 0:
+                # The paddle moved into the ball, rather than the other way around. Push the ball back out.
+                x, y = self.push_out_of_rect(x, y, normal, paddle_rect)
+
+            impacts.append(Impact((delta_ms / 1000.0 - remaining) * 1000, target, x, y))
+
+        self.x, self.y = x, y
+        self.direction_x = vx / self.speed
+        self.direction_y = vy / self.speed
+        return impacts
+
+    def time_to_walls(self, x, y, vx, vy, screen_rect) -> Tuple[float, Tuple[float, float]]:
+        """
+        Returns the time (in seconds) until the ball touches the top, bottom or left wall, and that wall's normal.
+        The time is infinite if the ball isn't moving towards any of them, and 0 if it's already past one.
+        """
+        r = self.radius
+        time, normal = math.inf, (0.0, 0.0)
+
+        if vy < 0:
+            time, normal = max((screen_rect.top + r - y) / vy, 0.0), (0.0, 1.0)
+        elif vy > 0:
+            time, normal = max((screen_rect.bottom - r - y) / vy, 0.0), (0.0, -1.0)
+
+        # Bounce off the left (the right side is open - that's where the paddle is)
+        if vx < 0:
+            left_time = max((screen_rect.left + r - x) / vx, 0.0)
+            if left_time < time:
+                time, normal = left_time, (1.0, 0.0)
+
+        return time, normal
+
+    def time_to_rect(self, x, y, vx, vy, rect, max_time: float = math.inf) -> Tuple[float, Tuple[float, float]]:
+        """
+        Returns the time (in seconds) until the ball first touches `rect`, and the surface normal at the point of
+        contact. The ball touches the rect when its center reaches the rect's outline grown by the ball radius - i.e.
+        one of the four faces (pushed out by the radius) or one of the four rounded corners. Contacts later than
+        `max_time` may be reported as never happening.
+        """
+        r = self.radius
+        left, right, top, bottom = rect.left, rect.right, rect.top, rect.bottom
+
+        # Most of the time, the ball is nowhere near the paddle - if the box around its path doesn't reach the grown
+        # rect, there's no need to solve for the exact contact.
+        if max_time < math.inf:
+            end_x, end_y = x + vx * max_time, y + vy * max_time
+            if min(x, end_x) > right + r or max(x, end_x) < left - r or \
+                    min(y, end_y) > bottom + r or max(y, end_y) < top - r:
+                return math.inf, (0.0, 0.0)
+
+        # If the ball already overlaps the rect, it hits immediately (as long as it's moving further in).
+        closest_x = min(max(x, left), right)
+        closest_y = min(max(y, top), bottom)
+        offset_x, offset_y = x - closest_x, y - closest_y
+        distance = math.hypot(offset_x, offset_y)
+        if distance < r:
+            if distance > 0:
+                normal = (offset_x / distance, offset_y / distance)
+            else:
+                # The center is inside the rect - push it out of whichever side is nearest the arena center.
+                normal = (-1.0, 0.0) if x < (left + right) / 2 else (1.0, 0.0)
+
+            if vx * normal[0] + vy * normal[1] < 0:
+                return 0.0, normal
+            return math.inf, normal
+
+        time, normal = math.inf, (0.0, 0.0)
+
+        # Faces
+        if vx > 0:
+            t = (left - r - x) / vx
+            if 0 <= t < time and top <= y + vy * t <= bottom:
+                time, normal = t, (-1.0, 0.0)
+        elif vx < 0:
+            t = (right + r - x) / vx
+            if 0 <= t < time and top <= y + vy * t <= bottom:
+                time, normal = t, (1.0, 0.0)
+
+        if vy > 0:
+            t = (top - r - y) / vy
+            if 0 <= t < time and left <= x + vx * t <= right:
+                time, normal = t, (0.0, -1.0)
+        elif vy < 0:
+            t = (bottom + r - y) / vy
+            if 0 <= t < time and left <= x + vx * t <= right:
+                time, normal = t, (0.0, 1.0)
+
+        # Corners. Solve |p + vt - c| = r for the earliest t.
+        a = vx * vx + vy * vy
+        if a > 0:
+            for corner_x, corner_y in ((left, top), (right, top), (left, bottom), (right, bottom)):
+                px, py = x - corner_x, y - corner_y
+                b = px * vx + py * vy
+                if b >= 0:
+                    continue  # Moving away from this corner
+                discriminant = b * b - a * (px * px + py * py - r * r)
+                if discriminant < 0:
+                    continue
+                t = (-b - math.sqrt(discriminant)) / a
+                if 0 <= t < time:
+                    time = t
+                    normal = ((px + vx * t) / r, (py + vy * t) / r)
+
+        return time, normal
+
+    def clamp_to_walls(self, x, y, screen_rect) -> Tuple[float, float]:
+        r = self.radius
+        return (max(x, screen_rect.left + r),
+                min(max(y, screen_rect.top + r), screen_rect.bottom - r))
+
+    def push_out_of_rect(self, x, y, normal, rect) -> Tuple[float, float]:
+        """Moves the ball along `normal` until it only just touches `rect`."""
+        r = self.radius
+        closest_x = min(max(x, rect.left), rect.right)
+        closest_y = min(max(y, rect.top), rect.bottom)
+        if (closest_x, closest_y) != (x, y):
+            return closest_x + normal[0] * r, closest_y + normal[1] * r
+
+        # The center is inside the rect, so `normal` points straight out of one of its sides.
+        return (rect.left - r if normal[0] < 0 else rect.right + r), y
@@ -0,0 +1,309 @@
+from typing import NamedTuple
+import math
+import numpy as np
+
+class BallImpacts(NamedTuple):
+    # The index of the ball for each paddle hit, and for each wall hit, in a single `BallSystem.update`. A ball that
+    # bounced more than once in the update appears more than once.
+    paddle: np.ndarray
+    wall: np.ndarray
+
+    # Where each ball's center was when it touched the surface (one row per entry of `paddle` and `wall`).
+    paddle_positions: np.ndarray
+    wall_positions: np.ndarray
+
+class _Rect(NamedTuple):
+    left: float | np.ndarray
+    top: float | np.ndarray
+    right: float | np.ndarray
+    bottom: float | np.ndarray
+
+class BallSystem:
+    """
+    Many balls moving through the same arena as `Ball`, with the same swept collisions, stored as a struct of
+    arrays: each property of the balls (position, velocity, radius, speed) is a contiguous numpy array with one
+    entry per ball, and every ball is moved and collided by the same array operations. Like `Ball`, this doesn't
+    depend on pygame - rects are anything with `left`, `top`, `right` and `bottom` attributes. The paddle's edges
+    can also be arrays with one entry per ball in use, to give each ball its own paddle (i.e. when every ball is in
+    a separate game).
+
+    Only the first `count` entries of each array are in use. The rest is spare capacity, so that adding balls
+    doesn't reallocate every time.
+    """
+
+    # The most surfaces a ball can bounce off in a single update (see `Ball.MAX_BOUNCES`).
+    MAX_BOUNCES = 16
+
+    INITIAL_CAPACITY = 16
+
+    count: int
+    positions: np.ndarray
+    # The positions at the start of the most recent update, used for render interpolation.
+    previous_positions: np.ndarray
+    # In pixels per second. The length of each velocity is always the ball's entry in `speeds`.
+    velocities: np.ndarray
+    radii: np.ndarray
+    speeds: np.ndarray
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.count = 0
+        self.positions = np.zeros((capacity, 2))
+        self.previous_positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.radii = np.zeros(capacity)
+        self.speeds = np.zeros(capacity)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, x: float, y: float, radius: float, speed: float, angle: float) -> int:
+        """Adds a ball (with the same parameters as `Ball`), and returns its index."""
+        if self.count == len(self.radii):
+            self._grow(max(2 * self.count, self.INITIAL_CAPACITY))
+
+        index = self.count
+        self.positions[index] = (x, y)
+        self.previous_positions[index] = (x, y)
+        self.velocities[index] = (math.cos(angle) * speed, math.sin(angle) * speed)
+        self.radii[index] = radius
+        self.speeds[index] = speed
+        self.count += 1
+        return index
+
+    def remove(self, mask: np.ndarray) -> int:
+        """
+        Removes the balls where `mask` (one entry per ball in use) is true, and returns how many were removed. The
+        remaining balls keep their order, but not their indices.
+        """
+        keep = ~mask
+        kept = int(np.count_nonzero(keep))
+        if kept == self.count:
+            return 0
+
+        for array in (self.positions, self.previous_positions, self.velocities, self.radii, self.speeds):
+            array[:kept] = array[:self.count][keep]
+        removed = self.count - kept
+        self.count = kept
+        return removed
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def set_speeds(self, speed) -> None:
+        """Changes the speed of every ball (to `speed`, which is either one speed or one per ball) without turning it."""
+        n = self.count
+        self.velocities[:n] *= (speed / self.speeds[:n])[:, np.newaxis]
+        self.speeds[:n] = speed
+
+    def interpolated_positions(self, alpha: float) -> np.ndarray:
+        """Returns each ball's position `alpha` of the way between the start and end of the most recent update."""
+        n = self.count
+        return self.previous_positions[:n] + (self.positions[:n] - self.previous_positions[:n]) * alpha
+
+    def update(self, delta_ms: float, screen_rect, paddle_rect) -> BallImpacts:
+        """
+        Moves every ball forward by `delta_ms`, bouncing off the paddle and the top, bottom and left walls, exactly
+        like `Ball.update` does for one ball. Each round of the loop below finds every ball's next impact at once;
+        balls that don't hit anything in the rest of the step are finished and drop out, so later rounds only
+        touch the few balls that bounced.
+        """
+        n = self.count
+        self.previous_positions[:n] = self.positions[:n]
+
+        # The balls still moving in this round (by index), and their state.
+        indices = np.arange(n)
+        paddle = paddle_rect
+        x, y = self.positions[:n, 0].copy(), self.positions[:n, 1].copy()
+        vx, vy = self.velocities[:n, 0].copy(), self.velocities[:n, 1].copy()
+        r = self.radii[:n]
+        remaining = np.full(n, delta_ms / 1000.0)
+        # The index and position of each ball that hit the paddle or a wall, in each round.
+        paddle_hits, wall_hits = [], []
+
+        for _ in range(self.MAX_BOUNCES):
+            if len(indices) == 0:
+                break
+
+            wall_time, wall_nx, wall_ny = self.time_to_walls(x, y, vx, vy, r, screen_rect)
+            paddle_time, paddle_nx, paddle_ny = self.time_to_rect(x, y, vx, vy, r, paddle, remaining)
+            hit_paddle = paddle_time <= wall_time
+            time = np.where(hit_paddle, paddle_time, wall_time)
+            nx = np.where(hit_paddle, paddle_nx, wall_nx)
+            ny = np.where(hit_paddle, paddle_ny, wall_ny)
+
+            # Balls that don't touch anything in the rest of the step move the whole way, and are done.
+            done = time > remaining
+            if done.all():
+                # Usually, nothing bounces at all - so this is the only round, and every ball is finished at once.
+                self.positions[indices, 0] = x + vx * remaining
+                self.positions[indices, 1] = y + vy * remaining
+                self.velocities[indices, 0] = vx
+                self.velocities[indices, 1] = vy
+                return self._impacts(paddle_hits, wall_hits)
+
+            finished = indices[done]
+            self.positions[finished, 0] = x[done] + vx[done] * remaining[done]
+            self.positions[finished, 1] = y[done] + vy[done] * remaining[done]
+            self.velocities[finished, 0] = vx[done]
+            self.velocities[finished, 1] = vy[done]
+
+            bounced = ~done
+            indices, time, nx, ny, hit_paddle = indices[bounced], time[bounced], nx[bounced], ny[bounced], hit_paddle[bounced]
+            x, y, vx, vy, r, remaining = x[bounced], y[bounced], vx[bounced], vy[bounced], r[bounced], remaining[bounced]
+            paddle = _select(paddle, bounced)
+
+            x += vx * time
+            y += vy * time
+            remaining -= time
+
+            # Reflect the velocity about the surface normal
+            dot = vx * nx + vy * ny
+            vx -= 2 * dot * nx
+            vy -= 2 * dot * ny
+
+            # Like `Ball.update` - snap balls that started out of bounds back in, and push balls that the paddle
+            # moved into back out of it.
+            hit_wall = ~hit_paddle
+            x[hit_wall] = np.maximum(x[hit_wall], screen_rect.left + r[hit_wall])
+            y[hit_wall] = np.clip(y[hit_wall], screen_rect.top + r[hit_wall], screen_rect.bottom - r[hit_wall])
+            pushed = hit_paddle & (time == 0)
+            if pushed.any():
+                x[pushed], y[pushed] = self.push_out_of_rect(x[pushed], y[pushed], nx[pushed], ny[pushed], r[pushed],
+                                                             _select(paddle, pushed))
+
+            paddle_hits.append((indices[hit_paddle], np.column_stack((x[hit_paddle], y[hit_paddle]))))
+            wall_hits.append((indices[hit_wall], np.column_stack((x[hit_wall], y[hit_wall]))))
+
+        # Balls still bouncing after MAX_BOUNCES drop the rest of the update, like `Ball` does.
+        self.positions[indices, 0] = x
+        self.positions[indices, 1] = y
+        self.velocities[indices, 0] = vx
+        self.velocities[indices, 1] = vy
+        return self._impacts(paddle_hits, wall_hits)
+
+    @staticmethod
+    def _impacts(paddle_hits: list, wall_hits: list) -> BallImpacts:
+        if len(paddle_hits) == 0:
+            return _NO_IMPACTS
+
+        paddle, paddle_positions = zip(*paddle_hits)
+        wall, wall_positions = zip(*wall_hits)
+        return BallImpacts(np.concatenate(paddle), np.concatenate(wall),
+                           np.concatenate(paddle_positions), np.concatenate(wall_positions))
+
+    @staticmethod
+    def time_to_walls(x, y, vx, vy, r, screen_rect):
+        """
+        Returns the time (in seconds) until each ball touches the top, bottom or left wall, and that wall's normal
+        (as separate x and y arrays). See `Ball.time_to_walls`.
+        """
+        # Balls moving up can only hit the top wall, and balls moving down the bottom one.
+        moving_up = vy < 0
+        wall_y = np.where(moving_up, screen_rect.top + r, screen_rect.bottom - r)
+        time = np.maximum(_divide(wall_y - y, vy), 0.0)
+        ny = np.where(moving_up, 1.0, np.where(vy > 0, -1.0, 0.0))
+
+        # Bounce off the left (the right side is open - that's where the paddle is)
+        left_time = np.maximum(_divide(screen_rect.left + r - x, np.minimum(vx, 0.0)), 0.0)
+
+        hit_left = left_time < time
+        return np.where(hit_left, left_time, time), hit_left.astype(float), np.where(hit_left, 0.0, ny)
+
+    @classmethod
+    def time_to_rect(cls, x, y, vx, vy, r, rect, max_time):
+        """
+        Returns the time (in seconds) until each ball first touches `rect`, and the surface normal at the point of
+        contact (as separate x and y arrays). Contacts later than `max_time` (one per ball) may be reported as never
+        happening. The rect's edges are either numbers or arrays with one entry per ball. See `Ball.time_to_rect`.
+        """
+        n = len(x)
+        time, nx, ny = np.full(n, math.inf), np.zeros(n), np.zeros(n)
+
+        # Only the balls whose path could reach the rect (grown by their radius) are solved exactly - usually, that's
+        # very few of them.
+        end_x, end_y = x + vx * max_time, y + vy * max_time
+        near = ~((np.minimum(x, end_x) > rect.right + r) | (np.maximum(x, end_x) < rect.left - r) |
+                 (np.minimum(y, end_y) > rect.bottom + r) | (np.maximum(y, end_y) < rect.top - r))
+        if near.any():
+            time[near], nx[near], ny[near] = cls._solve_time_to_rect(x[near], y[near], vx[near], vy[near], r[near],
+                                                                     _select(rect, near))
+        return time, nx, ny
+
+    @staticmethod
+    def _solve_time_to_rect(x, y, vx, vy, r, rect):
+        left, right, top, bottom = rect.left, rect.right, rect.top, rect.bottom
+        time, nx, ny = np.full(len(x), math.inf), np.zeros(len(x)), np.zeros(len(x))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Faces
+            face_time = np.where(vx > 0, (left - r - x) / vx, (right + r - x) / vx)
+            face_y = y + vy * face_time
+            hit = (vx != 0) & (face_time >= 0) & (top <= face_y) & (face_y <= bottom)
+            time[hit], nx[hit] = face_time[hit], np.where(vx[hit] > 0, -1.0, 1.0)
+
+            face_time = np.where(vy > 0, (top - r - y) / vy, (bottom + r - y) / vy)
+            face_x = x + vx * face_time
+            hit = (vy != 0) & (face_time >= 0) & (face_time < time) & (left <= face_x) & (face_x <= right)
+            time[hit], nx[hit], ny[hit] = face_time[hit], 0.0, np.where(vy[hit] > 0, -1.0, 1.0)
+
+            # Corners. Solve |p + vt - c| = r for the earliest t.
+            a = vx * vx + vy * vy
+            for corner_x, corner_y in ((left, top), (right, top), (left, bottom), (right, bottom)):
+                px, py = x - corner_x, y - corner_y
+                b = px * vx + py * vy
+                discriminant = b * b - a * (px * px + py * py - r * r)
+                corner_time = (-b - np.sqrt(np.maximum(discriminant, 0.0))) / a
+                # b < 0 means the ball is moving towards this corner.
+                hit = (a > 0) & (b < 0) & (discriminant >= 0) & (corner_time >= 0) & (corner_time < time)
+                time[hit] = corner_time[hit]
+                nx[hit] = (px[hit] + vx[hit] * corner_time[hit]) / r[hit]
+                ny[hit] = (py[hit] + vy[hit] * corner_time[hit]) / r[hit]
+
+        # If a ball already overlaps the rect, it hits immediately (as long as it's moving further in).
+        offset_x = x - np.clip(x, left, right)
+        offset_y = y - np.clip(y, top, bottom)
+        distance = np.hypot(offset_x, offset_y)
+        overlapping = distance < r
+        if overlapping.any():
+            inside = distance == 0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # Centers inside the rect are pushed out of whichever side is nearest the arena center.
+                overlap_nx = np.where(inside, np.where(x < (left + right) / 2, -1.0, 1.0), offset_x / distance)
+                overlap_ny = np.where(inside, 0.0, offset_y / distance)
+            moving_in = vx * overlap_nx + vy * overlap_ny < 0
+            time[overlapping] = np.where(moving_in, 0.0, math.inf)[overlapping]
+            nx[overlapping] = overlap_nx[overlapping]
+            ny[overlapping] = overlap_ny[overlapping]
+
+        return time, nx, ny
+
+    @staticmethod
+    def push_out_of_rect(x, y, nx, ny, r, rect):
+        """Moves each ball along its normal until it only just touches `rect` (see `Ball.push_out_of_rect`)."""
+        closest_x = np.clip(x, rect.left, rect.right)
+        closest_y = np.clip(y, rect.top, rect.bottom)
+        inside = (closest_x == x) & (closest_y == y)
+        # Balls with their center inside the rect have a normal pointing straight out of one of its sides.
+        inside_x = np.where(nx < 0, rect.left - r, rect.right + r)
+        return (np.where(inside, inside_x, closest_x + nx * r),
+                np.where(inside, y, closest_y + ny * r))
+
+    def _grow(self, capacity: int) -> None:
+        for name in ("positions", "previous_positions", "velocities", "radii", "speeds"):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:])
+            grown[:self.count] = array[:self.count]
+            setattr(self, name, grown)
+
+_NO_IMPACTS = BallImpacts(np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros((0, 2)), np.zeros((0, 2)))
+
+def _select(rect, mask: np.ndarray):
+    """Returns `rect` with any per-ball edges (arrays) narrowed down to the balls picked out by `mask`."""
+    edges = (rect.left, rect.top, rect.right, rect.bottom)
+    if not any(isinstance(edge, np.ndarray) for edge in edges):
+        return rect
+    return _Rect(*(edge[mask] if isinstance(edge, np.ndarray) else edge for edge in edges))
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Divides elementwise, with an infinite result wherever `denominator` is 0 (i.e. a ball isn't moving that way)."""
+    return np.divide(numerator, denominator, out=np.full(len(numerator), math.inf), where=denominator != 0)
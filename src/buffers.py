@@ -0,0 +1,63 @@
+import threading
+from collections import defaultdict
+from typing import Tuple
+import numpy as np
+
+class BufferPool:
+    """
+    A thread-safe pool of reusable image buffers, so that the capture and detection pipeline doesn't allocate
+    new arrays for every camera frame. Buffers are reference counted: `acquire` hands out a buffer with one
+    reference, anyone else who needs it to stay unmodified calls `retain`, and every reference is given back with
+    `release`. Once the last reference is released, the buffer goes back into the pool for the next `acquire` of
+    the same shape.
+    """
+
+    dtype: np.dtype
+
+    # The number of buffers the pool has had to allocate. This stops growing once the pipeline warms up.
+    allocations: int
+
+    def __init__(self, dtype: np.dtype = np.uint8):
+        self.dtype = dtype
+        self.allocations = 0
+        self._free = defaultdict(list)
+        self._references = {}
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Returns a buffer of the given shape, with undefined contents and a single reference."""
+        with self._lock:
+            free = self._free[shape]
+            if len(free) > 0:
+                buffer = free.pop()
+            else:
+                buffer = np.empty(shape, dtype=self.dtype)
+                self._buffers[id(buffer)] = buffer
+                self.allocations += 1
+
+            self._references[id(buffer)] = 1
+            return buffer
+
+    def retain(self, buffer: np.ndarray) -> np.ndarray:
+        """Adds a reference to `buffer` (which must have come from this pool), and returns it."""
+        with self._lock:
+            self._references[id(buffer)] += 1
+            return buffer
+
+    def release(self, buffer: np.ndarray | None) -> None:
+        """
+        Gives back a reference to `buffer`. Passing `None` or an array that didn't come from this pool does
+        nothing, so that callers don't have to track where each frame came from.
+        """
+        if buffer is None:
+            return
+
+        with self._lock:
+            key = id(buffer)
+            if self._buffers.get(key) is not buffer or self._references.get(key, 0) == 0:
+                return
+
+            self._references[key] -= 1
+            if self._references[key] == 0:
+                self._free[buffer.shape].append(buffer)
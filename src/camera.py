@@ -1,35 +1,326 @@
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from os import path
+from typing import Dict, List, NamedTuple, Tuple
 import cv2
-import random
+from cv2 import VideoCapture
+from .assets import CACHE_DIR
 
-# Currently, OpenCV does not have any sensible way to enumerate the available
-# camera devices (https://github.com/opencv/opencv/issues/4269). The best we can do is
-# enumerate over port indexes until we stop finding webcams - this method is adapted
-# this stackoverflow answer: https://stackoverflow.com/a/62639343
-def get_working_ports():
+# Where negotiated capture profiles are remembered between launches.
+DEFAULT_PROFILE_CACHE_PATH = path.join(CACHE_DIR, "camera_profiles.json")
+
+class CameraDevice(NamedTuple):
+    # The index OpenCV opens the camera with.
+    port: int
+
+    # A human readable name, if the platform reports one.
+    name: str | None
+
+    # Identifies the physical device behind the port, so that a different camera plugged into the same port
+    # isn't mistaken for the old one.
+    identity: str
+
+@dataclass(frozen=True)
+class CaptureProfile:
+    """A capture mode: a pixel format (as a FOURCC code), a frame size (px) and a frame rate (fps)."""
+    fourcc: str
+    width: int
+    height: int
+    fps: float
+
+    def __str__(self) -> str:
+        return f"{self.width}x{self.height} {self.fourcc} at {self.fps:g} fps"
+
+class CameraRegistry:
     """
-    Tests camera ports and returns an array of working video capture device ports. This method is slow (~1s)
-    and blocking.
+    Keeps track of the cameras that are plugged in. On Linux, devices are listed from sysfs without opening them,
+    and only a device that hasn't been seen before is opened once (to check that it actually delivers frames).
+    Other platforms have no way to list cameras (https://github.com/opencv/opencv/issues/4269), so ports are
+    probed in order until a couple fail - but ports already known to work are never reopened (so there, a camera
+    is only noticed to be gone if the ports before it stop working). Either way, the camera that's in use is
+    never touched.
+
+    `scan` is slow when there are new devices to probe, so it's meant to be run on a background thread. It
+    returns what changed, so that the UI only needs updating when a camera is plugged in or removed.
+
+    Cameras are opened with `open`, which picks a capture mode suited to hand tracking rather than the driver's
+    default (which is often a large, 30 fps, uncompressed mode). Each camera's modes are only tried once - the
+    chosen profile is cached on disk for later launches.
     """
 
-    print("Scanning for working camera ports. OpenCV will complain, but this is expected and an open issue")
-    print("  (See https://github.com/opencv/opencv/issues/4269)")
+    SYSFS_VIDEO_DEVICES = "/sys/class/video4linux/video*"
+
+    # When probing blindly, scanning stops after this many consecutive ports fail to open.
+    MAX_DEAD_PORTS = 2
+
+    # Capture modes to try, from most to least preferred. Detection downscales full frames to at most 1280px
+    # wide, so larger frames only cost decoding time. High frame rates come first, since each frame period
+    # adds to the paddle's latency - and compressed MJPG is first because USB bandwidth usually limits
+    # uncompressed YUYV to 30 fps or less at these sizes.
+    CANDIDATE_PROFILES = (
+        CaptureProfile("MJPG", 1280, 720, 60),
+        CaptureProfile("MJPG", 960, 540, 60),
+        CaptureProfile("MJPG", 640, 480, 60),
+        CaptureProfile("YUYV", 640, 480, 60),
+        CaptureProfile("MJPG", 1280, 720, 30),
+        CaptureProfile("MJPG", 640, 480, 30),
+        CaptureProfile("YUYV", 640, 480, 30),
+    )
+
+    # A mode is accepted once it delivers at least this fraction of its nominal frame rate.
+    MIN_FPS_RATIO = 0.85
+
+    # How many frames are timed when trying a mode, after discarding a few while the camera settles.
+    PROBE_FRAMES = 12
+    PROBE_WARMUP_FRAMES = 3
+
+    # The number of frames the driver may queue up. Queued frames are stale by the time they're read, so the
+    # minimum is best.
+    DRIVER_BUFFER_SIZE = 1
+
+    # The known working cameras, by port.
+    devices: Dict[int, CameraDevice]
+
+    # The port of the camera the game is using (which is never probed), or `None`.
+    active_port: int | None
+
+    # Where negotiated capture profiles are cached (see `open`).
+    profile_cache_path: str
+
+    def __init__(self, profile_cache_path: str = DEFAULT_PROFILE_CACHE_PATH):
+        self.devices = {}
+        self.active_port = None
+        self.profile_cache_path = profile_cache_path
+
+        # Probe results by device identity, so that each device is only ever opened once.
+        self._probe_results: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ports(self) -> List[int]:
+        with self._lock:
+            return sorted(self.devices)
+
+    def scan(self) -> Tuple[List[CameraDevice], List[CameraDevice]]:
+        """Updates `devices`, and returns the lists of devices that were added and removed since the last scan."""
+        if sys.platform.startswith("linux") and len(glob.glob(self.SYSFS_VIDEO_DEVICES)) > 0:
+            found = self.scan_sysfs()
+        else:
+            found = self.scan_ports()
+
+        with self._lock:
+            added = [device for port, device in found.items() if self.devices.get(port) != device]
+            removed = [device for port, device in self.devices.items() if found.get(port) != device]
+            self.devices = found
+
+        for device in added:
+            print(f"Camera added: {self.describe(device)}")
+        for device in removed:
+            print(f"Camera removed: {self.describe(device)}")
+        return added, removed
+
+    def scan_sysfs(self) -> Dict[int, CameraDevice]:
+        found = {}
+        device_paths = {int(path.basename(device_path)[len("video"):]): device_path
+                        for device_path in glob.glob(self.SYSFS_VIDEO_DEVICES)}
+        for port, device_path in sorted(device_paths.items()):
+            # Cameras also create metadata nodes - only index 0 of each device captures video.
+            if read_sysfs_attribute(device_path, "index") not in (None, "0"):
+                continue
+
+            device = CameraDevice(
+                port,
+                read_sysfs_attribute(device_path, "name"),
+                f"{port}:{path.realpath(path.join(device_path, 'device'))}")
+            if self.is_working(device):
+                found[port] = device
+        return found
 
-    dev_port = 0
-    dead_ports = 0
-    working_ports = []
-    while dead_ports < 2: # if there are more than 3 non working ports stop the testing. 
-        camera = cv2.VideoCapture(dev_port)
+    def scan_ports(self) -> Dict[int, CameraDevice]:
+        found = {}
+        port = 0
+        dead_ports = 0
+        while dead_ports < self.MAX_DEAD_PORTS:
+            device = CameraDevice(port, None, str(port))
+            with self._lock:
+                known = self.devices.get(port) == device
 
+            if known or self.is_working(device, cache=False):
+                found[port] = device
+                dead_ports = 0
+            else:
+                dead_ports += 1
+            port += 1
+        return found
+
+    def is_working(self, device: CameraDevice, cache: bool = True) -> bool:
+        """
+        Whether `device` delivers frames. Devices are only opened the first time they're seen (or every time,
+        without `cache`), and the active camera is assumed to work.
+        """
+        if device.port == self.active_port:
+            return True
+
+        with self._lock:
+            if cache and device.identity in self._probe_results:
+                return self._probe_results[device.identity]
+
+        working = probe_port(device.port)
+        if cache:
+            with self._lock:
+                self._probe_results[device.identity] = working
+        return working
+
+    def open(self, port: int) -> VideoCapture:
+        """
+        Opens the camera at `port` in the best capture mode it supports. The first time a camera is opened, every
+        candidate mode is tried (which takes a few seconds), so call this from a background thread.
+        """
+        with self._lock:
+            device = self.devices.get(port, CameraDevice(port, None, str(port)))
+
+        camera = VideoCapture(port)
         if not camera.isOpened():
-            dead_ports += 1
+            return camera
+        camera.set(cv2.CAP_PROP_BUFFERSIZE, self.DRIVER_BUFFER_SIZE)
+
+        profiles = self.load_profiles()
+        if device.identity in profiles:
+            profile = profiles[device.identity]
+            if profile is not None and not self.apply_profile(camera, profile):
+                print(f"{self.describe(device)} no longer supports {profile}, renegotiating")
+                profile = self.negotiate_profile(camera)
         else:
-            is_reading, img = camera.read()
-            w = camera.get(3)
-            h = camera.get(4)
-            if is_reading:
-                working_ports.append(dev_port)
-        
+            print(f"Negotiating a capture mode for {self.describe(device)}")
+            profile = self.negotiate_profile(camera)
+
+        if profile is None:
+            print(f"Using the default capture mode for {self.describe(device)}")
+        else:
+            print(f"Using {profile} for {self.describe(device)}")
+
+        if profiles.get(device.identity, False) != profile:
+            profiles[device.identity] = profile
+            self.save_profiles(profiles)
+        return camera
+
+    def negotiate_profile(self, camera: VideoCapture) -> CaptureProfile | None:
+        """
+        Tries each of CANDIDATE_PROFILES on `camera` and leaves it in the first one that delivers close to its
+        nominal frame rate (or otherwise, the fastest one that works). Returns `None`, leaving the driver's
+        default mode, if no candidate can be set.
+        """
+        default_profile = self.current_profile(camera)
+        best_profile, best_fps = None, 0.0
+        for profile in self.CANDIDATE_PROFILES:
+            if not self.apply_profile(camera, profile):
+                continue
+
+            fps = self.measure_fps(camera)
+            if fps >= profile.fps * self.MIN_FPS_RATIO:
+                return profile
+            if fps > best_fps:
+                best_profile, best_fps = profile, fps
+
+        if best_profile is not None:
+            self.apply_profile(camera, best_profile)
+        elif default_profile is not None:
+            self.apply_profile(camera, default_profile)
+        return best_profile
+
+    def apply_profile(self, camera: VideoCapture, profile: CaptureProfile) -> bool:
+        """Switches `camera` to `profile`, and returns whether the driver actually accepted it."""
+        camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile.fourcc))
+        camera.set(cv2.CAP_PROP_FRAME_WIDTH, profile.width)
+        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, profile.height)
+        camera.set(cv2.CAP_PROP_FPS, profile.fps)
+
+        # Drivers silently fall back to the nearest mode they support, so read back what we actually got.
+        current = self.current_profile(camera)
+        return current is not None and (current.fourcc, current.width, current.height) == \
+            (profile.fourcc, profile.width, profile.height)
+
+    @staticmethod
+    def current_profile(camera: VideoCapture) -> CaptureProfile | None:
+        fourcc = int(camera.get(cv2.CAP_PROP_FOURCC))
+        if fourcc == 0:
+            return None
+
+        return CaptureProfile(
+            "".join(chr((fourcc >> shift) & 0xFF) for shift in (0, 8, 16, 24)),
+            int(camera.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(camera.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            camera.get(cv2.CAP_PROP_FPS))
+
+    def measure_fps(self, camera: VideoCapture) -> float:
+        """Reads a few frames from `camera`, and returns the rate they arrived at (0 if reading fails)."""
+        for _ in range(self.PROBE_WARMUP_FRAMES):
+            if not camera.grab():
+                return 0.0
+
+        start = time.perf_counter()
+        for _ in range(self.PROBE_FRAMES):
+            if not camera.grab():
+                return 0.0
+        return self.PROBE_FRAMES / (time.perf_counter() - start)
+
+    def load_profiles(self) -> Dict[str, CaptureProfile | None]:
+        """Returns the cached profiles by device identity. `None` means the camera's default mode is best."""
+        try:
+            with open(self.profile_cache_path) as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cached, dict):
+            return {}
+
+        # The cache may be stale (from an older version) or hand-edited. Bad entries are dropped, so that `open`
+        # negotiates a mode for those cameras again.
+        profiles = {}
+        for identity, profile in cached.items():
+            try:
+                profiles[identity] = None if profile is None else self.parse_profile(profile)
+            except (TypeError, KeyError, ValueError):
+                print(f"Ignoring the invalid cached capture profile for {identity}: {profile}")
+        return profiles
+
+    @staticmethod
+    def parse_profile(profile: dict) -> CaptureProfile:
+        """Converts a profile saved by `save_profiles` back into a `CaptureProfile`, checking it along the way."""
+        fourcc = profile["fourcc"]
+        if not isinstance(fourcc, str) or len(fourcc) != 4:
+            raise ValueError(f"Invalid FOURCC code {fourcc!r}")
+        return CaptureProfile(fourcc, int(profile["width"]), int(profile["height"]), float(profile["fps"]))
+
+    def save_profiles(self, profiles: Dict[str, CaptureProfile | None]) -> None:
+        try:
+            os.makedirs(path.dirname(self.profile_cache_path), exist_ok=True)
+            with open(self.profile_cache_path, "w") as file:
+                json.dump({identity: None if profile is None else asdict(profile)
+                           for identity, profile in profiles.items()}, file, indent=2)
+        except OSError as error:
+            print(f"Couldn't save camera profiles to {self.profile_cache_path}: {error}")
+
+    @staticmethod
+    def describe(device: CameraDevice) -> str:
+        return f"Camera {device.port}" if device.name is None else f"Camera {device.port} ({device.name})"
+
+def read_sysfs_attribute(device_path: str, attribute: str) -> str | None:
+    try:
+        with open(path.join(device_path, attribute)) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+def probe_port(port: int) -> bool:
+    """Opens the camera at `port` and checks that it delivers a frame. Slow and blocking."""
+    camera = cv2.VideoCapture(port)
+    try:
+        return camera.isOpened() and camera.read()[0]
+    finally:
         camera.release()
-        dev_port += 1
-    
-    return working_ports
\ No newline at end of file
@@ -0,0 +1,143 @@
+import threading
+from typing import Callable
+import cv2
+from cv2 import VideoCapture
+from pygame import time
+import numpy as np
+from .buffers import BufferPool
+
+class CaptureThread:
+    """
+    Owns a `VideoCapture` and reads it continuously from a background thread, so that the game loop never
+    blocks on the webcam driver. Each frame is converted from OpenCV's BGR to RGB (the order mediapipe and the
+    preview both expect) into a buffer from `pool`, and handed to `on_frame` (i.e. the hand detector) from the
+    capture thread. The game loop only ever asks for the newest frame with `acquire_latest`.
+    """
+
+    # How long to back off after a failed read, so that an unplugged camera doesn't cause a busy loop.
+    READ_RETRY_MS = 10
+
+    camera: VideoCapture
+    on_frame: Callable[[np.ndarray, int], None]
+
+    # Where converted frames are kept. The published frame and the one held by the game loop each hold a
+    # reference, so `on_frame` must `retain` a frame it needs after returning.
+    pool: BufferPool
+
+    # Frames that were captured but replaced by a newer frame before the game loop picked them up.
+    dropped_frames: int
+
+    # Frames that were captured successfully, whether or not the game loop ever saw them.
+    captured_frames: int
+
+    # Returns the current time (ms) that frames are timestamped with.
+    clock: Callable[[], int]
+
+    def __init__(self, camera: VideoCapture, on_frame: Callable[[np.ndarray, int], None], pool: BufferPool,
+                 clock: Callable[[], int] = time.get_ticks):
+        self.camera = camera
+        self.on_frame = on_frame
+        self.pool = pool
+        self.clock = clock
+        self.dropped_frames = 0
+        self.captured_frames = 0
+
+        # The raw BGR frame. Passing it back into `read` lets OpenCV decode into it instead of allocating a new
+        # array every frame.
+        self._capture_buffer: np.ndarray | None = None
+
+        self._lock = threading.Lock()
+        self._latest: np.ndarray | None = None  # The newest published frame
+        self._latest_seen = True  # Whether the game loop has acquired the newest published frame
+        self._held: np.ndarray | None = None  # The frame currently held by the game loop
+        self._failed = False   # Whether the most recent read failed
+        self._last_timestamp_ms = -1
+        self._stop = threading.Event()
+        self._release_camera = False
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout_s: float = 1.0, release_camera: bool = False) -> None:
+        """
+        Asks the capture thread to finish and waits for it. The thread only checks for this before and after each
+        read, so this can take up to one frame period (or `timeout_s`, if the driver is wedged). A read that's
+        still stuck when this returns is thrown away once it finishes. Once the thread has finished, its frames
+        are given back to the pool.
+
+        With `release_camera`, the thread releases the camera itself on its way out - so even if waiting times
+        out while it's stuck in `read`, the camera is never released underneath it.
+        """
+        self._release_camera = release_camera
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout_s)
+
+        if not self._thread.is_alive():
+            with self._lock:
+                self.pool.release(self._latest)
+                self.pool.release(self._held)
+                self._latest = None
+                self._held = None
+        elif release_camera:
+            print("The camera is taking a while to stop - it will be released once its current read finishes")
+
+    def acquire_latest(self) -> np.ndarray | None:
+        """
+        Returns the newest captured frame, or `None` if the last read failed or nothing has been captured yet.
+        The returned array stays valid (and unmodified) until the next call to this method. Never blocks on
+        the camera.
+        """
+        with self._lock:
+            self.pool.release(self._held)
+            self._held = None
+            if self._failed or self._latest is None:
+                return None
+
+            self._held = self.pool.retain(self._latest)
+            self._latest_seen = True
+            return self._held
+
+    def _run(self) -> None:
+        try:
+            self._capture()
+        finally:
+            if self._release_camera:
+                self.camera.release()
+
+    def _capture(self) -> None:
+        while not self._stop.is_set():
+            got_frame, capture_buffer = self.camera.read(self._capture_buffer)
+
+            # If `stop` gave up waiting while this read was stuck, the camera may have been replaced since - so
+            # the frame mustn't be published, or handed to `on_frame` alongside the new camera's frames.
+            if self._stop.is_set():
+                return
+
+            if not got_frame:
+                with self._lock:
+                    self._failed = True
+                self._stop.wait(self.READ_RETRY_MS / 1000)
+                continue
+
+            self._capture_buffer = capture_buffer
+            frame = self.pool.acquire(capture_buffer.shape)
+            cv2.cvtColor(capture_buffer, cv2.COLOR_BGR2RGB, dst=frame)
+
+            timestamp_ms = self.clock()
+            with self._lock:
+                if not self._latest_seen:
+                    self.dropped_frames += 1
+                self.pool.release(self._latest)
+                self._latest = frame
+                self._latest_seen = False
+                self._failed = False
+                self.captured_frames += 1
+
+            # Mediapipe requires strictly increasing timestamps in live stream mode. If the camera delivers
+            # two frames within the same millisecond, the second one just isn't analyzed. The published frame
+            # can only be released by this thread, so it's safe to use here without retaining it.
+            if timestamp_ms > self._last_timestamp_ms:
+                self._last_timestamp_ms = timestamp_ms
+                self.on_frame(frame, timestamp_ms)
@@ -0,0 +1,180 @@
+import math
+import os
+import threading
+from os import path
+from typing import Tuple
+import numpy as np
+import hsluv
+
+# The constants and formulas below are those of the `hsluv` package (https://www.hsluv.org/), rewritten to work on
+# whole arrays of colors at once.
+
+# XYZ to linear sRGB
+XYZ_TO_RGB = np.array([[3.240969941904521, -1.537383177570093, -0.498610760293],
+                       [-0.96924363628087, 1.87596750150772, 0.041555057407175],
+                       [0.055630079696993, -0.20397695888897, 1.056971514242878]])
+REF_U = 0.19783000664283
+REF_V = 0.46831999493879
+KAPPA = 903.2962962
+EPSILON = 0.0088564516
+
+def hsluv_to_rgb(hue: np.ndarray, saturation: np.ndarray, lightness: np.ndarray) -> np.ndarray:
+    """
+    Converts HSLuv colors (hue in degrees, saturation and lightness on [0, 100]) into sRGB colors on [0, 1], with
+    the channels in a new last axis. The arguments are broadcast against each other. Matches `hsluv.hsluv_to_rgb`.
+    """
+    hue, saturation, lightness = (np.asarray(value, dtype=np.float64) for value in (hue, saturation, lightness))
+
+    # HSLuv -> LCh: saturation is a percentage of the most chroma the hue can have at this lightness. Pure black
+    # and white have no chroma at all.
+    in_range = (lightness <= 100 - 1e-7) & (lightness >= 1e-8)
+    chroma = np.where(in_range, max_chroma(np.where(in_range, lightness, 50), hue), 0) / 100 * saturation
+
+    # LCh -> Luv -> XYZ
+    hue_rad = np.radians(hue)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_u = np.cos(hue_rad) * chroma / (13 * lightness) + REF_U
+        var_v = np.sin(hue_rad) * chroma / (13 * lightness) + REF_V
+        y = np.where(lightness <= 8, lightness / KAPPA, ((lightness + 16) / 116) ** 3)
+        x = y * 9 * var_u / (4 * var_v)
+        z = y * (12 - 3 * var_u - 20 * var_v) / (4 * var_v)
+    # (Black comes out as 0/0 above.)
+    xyz = np.where((lightness > 0)[..., np.newaxis], np.stack(np.broadcast_arrays(x, y, z), axis=-1), 0)
+
+    # XYZ -> sRGB
+    linear = xyz @ XYZ_TO_RGB.T
+    return np.where(linear <= 0.0031308, 12.92 * linear, 1.055 * np.abs(linear) ** (5 / 12) - 0.055)
+
+def max_chroma(lightness: np.ndarray, hue: np.ndarray) -> np.ndarray:
+    """The largest chroma that stays inside the sRGB gamut, for each (broadcast) lightness and hue (degrees)."""
+    lightness = np.asarray(lightness, dtype=np.float64)[..., np.newaxis]
+    hue_rad = np.radians(np.asarray(hue, dtype=np.float64))[..., np.newaxis]
+
+    # Each of the 6 gamut bounds (a min and a max for each of R, G and B) is a line in the chroma plane.
+    sub1 = (lightness + 16) ** 3 / 1560896
+    sub2 = np.where(sub1 > EPSILON, sub1, lightness / KAPPA)
+    m1, m2, m3 = np.repeat(XYZ_TO_RGB, 2, axis=0).T
+    t = np.tile((0, 1), 3)
+    top1 = (284517 * m1 - 94839 * m3) * sub2
+    top2 = (838422 * m3 + 769860 * m2 + 731718 * m1) * lightness * sub2 - 769860 * t * lightness
+    bottom = (632260 * m3 - 126452 * m2) * sub2 + 126452 * t
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lengths = (top2 / bottom) / (np.sin(hue_rad) - (top1 / bottom) * np.cos(hue_rad))
+    return np.where(lengths >= 0, lengths, np.inf).min(axis=-1)
+
+class HsluvTable:
+    """
+    Converts HSLuv colors to RGB by interpolating between the colors of a precomputed table, rather than doing the
+    (pure Python) conversion of the `hsluv` package every frame. The result is within a barely noticeable
+    difference of the exact color (see `benchmarks/colors.py`). Plain nearest-step lookups are faster still, but
+    are visibly off for light yellows, where HSLuv's maximum chroma changes quickly with lightness.
+
+    The table is built the first time it's needed, and then cached on disk so that later launches just load it.
+    Building it takes most of a second, so `load_in_background` can be used to get it ready without holding up
+    the first frames - until then, colors are converted exactly (and slowly).
+    """
+
+    # The table's resolution. Hue is in steps of 1 degree, and saturation and lightness in steps of 1 (out of 100).
+    # Steps go from 0 up to and including 360 or 100, so that every color has a step on either side of it.
+    HUE_STEPS = 360
+    SATURATION_STEPS = 100
+    LIGHTNESS_STEPS = 100
+
+    # Where the table is cached between launches, or `None` to always build it.
+    cache_path: str | None
+
+    def __init__(self, cache_path: str | None = None):
+        self.cache_path = cache_path
+        self._table = None
+        self._lock = threading.Lock()
+
+    @property
+    def table(self) -> np.ndarray:
+        """The RGB (uint8) colors, indexed by hue, saturation and lightness step. Blocks until they're ready."""
+        with self._lock:
+            if self._table is None:
+                table = self.load()
+                if table is None:
+                    table = self.build()
+                    self.save(table)
+                self._table = table
+        return self._table
+
+    @property
+    def ready(self) -> bool:
+        return self._table is not None
+
+    def load_in_background(self) -> None:
+        threading.Thread(target=lambda: self.table, name="color-table-loader", daemon=True).start()
+
+    @property
+    def shape(self) -> Tuple[int, int, int, int]:
+        return (self.HUE_STEPS + 1, self.SATURATION_STEPS + 1, self.LIGHTNESS_STEPS + 1, 3)
+
+    def lookup(self, hue: float, saturation: float, lightness: float) -> Tuple[int, int, int]:
+        """
+        Converts an HSLuv color to RGB (on [0, 255]). Hue (degrees) wraps around, and saturation and lightness are
+        clamped to [0, 100].
+        """
+        saturation = min(max(saturation, 0), 100)
+        lightness = min(max(lightness, 0), 100)
+        table = self._table
+        if table is None:
+            return tuple(math.floor(channel * 255 + 0.5) for channel in hsluv.hsluv_to_rgb((hue, saturation, lightness)))
+
+        # The color lies in a cell of the table, between two steps along each axis...
+        hue_position = hue % 360 * self.HUE_STEPS / 360
+        saturation_position = saturation * self.SATURATION_STEPS / 100
+        lightness_position = lightness * self.LIGHTNESS_STEPS / 100
+        hue_index = min(int(hue_position), self.HUE_STEPS - 1)
+        saturation_index = min(int(saturation_position), self.SATURATION_STEPS - 1)
+        lightness_index = min(int(lightness_position), self.LIGHTNESS_STEPS - 1)
+        hue_fraction = hue_position - hue_index
+        saturation_fraction = saturation_position - saturation_index
+        lightness_fraction = lightness_position - lightness_index
+
+        # ...and is interpolated from the cell's 8 corners - first along hue, then saturation, then lightness. This
+        # is written out with Python numbers since numpy's per-call overhead would dominate for a single color.
+        corners = table[hue_index:hue_index + 2, saturation_index:saturation_index + 2,
+                        lightness_index:lightness_index + 2].reshape(8, 3).T.tolist()
+        color = []
+        for c000, c001, c010, c011, c100, c101, c110, c111 in corners:
+            c00 = c000 + (c100 - c000) * hue_fraction
+            c01 = c001 + (c101 - c001) * hue_fraction
+            c10 = c010 + (c110 - c010) * hue_fraction
+            c11 = c011 + (c111 - c011) * hue_fraction
+            c0 = c00 + (c10 - c00) * saturation_fraction
+            c1 = c01 + (c11 - c01) * saturation_fraction
+            color.append(math.floor(c0 + (c1 - c0) * lightness_fraction + 0.5))
+        return tuple(color)
+
+    def build(self) -> np.ndarray:
+        hue, saturation, lightness = np.meshgrid(
+            np.linspace(0, 360, self.HUE_STEPS + 1),
+            np.linspace(0, 100, self.SATURATION_STEPS + 1),
+            np.linspace(0, 100, self.LIGHTNESS_STEPS + 1),
+            indexing="ij", sparse=True)
+        rgb = hsluv_to_rgb(hue, saturation, lightness)
+        return np.clip(np.floor(rgb * 255 + 0.5), 0, 255).astype(np.uint8)
+
+    def load(self) -> np.ndarray | None:
+        if self.cache_path is None:
+            return None
+
+        try:
+            table = np.load(self.cache_path)
+        except (OSError, ValueError):
+            return None
+        # A table built at a different resolution is of no use.
+        return table if table.shape == self.shape and table.dtype == np.uint8 else None
+
+    def save(self, table: np.ndarray) -> None:
+        if self.cache_path is None:
+            return
+
+        try:
+            os.makedirs(path.dirname(self.cache_path), exist_ok=True)
+            np.save(self.cache_path, table)
+        except OSError as error:
+            print(f"Couldn't save the color table to {self.cache_path}: {error}")
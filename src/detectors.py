@@ -0,0 +1,338 @@
+import threading
+import multiprocessing
+from abc import ABC, abstractmethod
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from os import path
+from typing import TYPE_CHECKING, Callable, Dict
+import numpy as np
+from .landmarks import HandLandmarks, MAX_HANDS, LANDMARK_COUNT
+
+# Mediapipe takes around a second to import, so it's only imported once a detector is actually created (which
+# `TrackingContext` does in the background), and this module stays cheap to import.
+if TYPE_CHECKING:
+    from mediapipe.tasks.python.vision import HandLandmarker, RunningMode
+
+# Names accepted by `create_hand_detector`.
+IN_PROCESS = "in_process"
+OUT_OF_PROCESS = "process"
+
+# Receives each result along with the capture timestamp of its frame. The `HandLandmarks` object is reused by the
+# detector, so it's only valid for the duration of the call.
+ResultCallback = Callable[[HandLandmarks, int], None]
+
+class HandDetector(ABC):
+    """
+    An asynchronous hand landmark detector. Frames go in through `detect_async`, and results come back later
+    (on some other thread) through the callback the detector was created with.
+    """
+
+    # How many hands detection looks for (1 or MAX_HANDS). Mediapipe only runs its (expensive) palm detector while
+    # it's tracking fewer hands than this, so looking for a single hand is much cheaper once it's found.
+    max_hands: int
+
+    @abstractmethod
+    def detect_async(self, frame: np.ndarray, timestamp_ms: int) -> bool:
+        """
+        Starts detection on an RGB `frame`. `frame` must stay unmodified until its result (or a later one) arrives.
+        Returns whether the frame was accepted - a frame that's dropped (i.e. because the detector is busy) never
+        gets a result.
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+def create_hand_detector(root_dir: str, backend: str, callback: ResultCallback) -> HandDetector:
+    """Creates a hand detector using the named backend (either `IN_PROCESS` or `OUT_OF_PROCESS`)."""
+    model_path = path.join(root_dir, "models/hand_landmarker.task")
+    if backend == IN_PROCESS:
+        return InProcessDetector(model_path, callback)
+    elif backend == OUT_OF_PROCESS:
+        return ProcessDetector(model_path, callback)
+    else:
+        raise ValueError(f"Unknown hand detector backend '{backend}'")
+
+def create_hand_landmarker(model_path: str, running_mode: "RunningMode", num_hands: int = MAX_HANDS,
+                           callback=None) -> "HandLandmarker":
+    from mediapipe.tasks.python import BaseOptions
+    from mediapipe.tasks.python.vision import HandLandmarker, HandLandmarkerOptions
+
+    base_options = BaseOptions(model_asset_path=model_path, delegate=BaseOptions.Delegate.CPU)
+    options = HandLandmarkerOptions(base_options=base_options,
+                                        num_hands=num_hands,
+                                        running_mode=running_mode,
+                                        result_callback=callback)
+    return HandLandmarker.create_from_options(options)
+
+class HandLandmarkers:
+    """
+    The number of hands a `HandLandmarker` looks for is fixed when it's created, so detectors change it (see
+    `HandDetector.max_hands`) by switching between a landmarker for each number. Only the MAX_HANDS one is created
+    up front - the single hand one is created the first time it's needed (once a game starts), so that startup
+    only pays for loading the model once.
+    """
+
+    model_path: str
+    running_mode: "RunningMode"
+
+    # Landmarkers created so far, by the number of hands they look for.
+    landmarkers: Dict[int, "HandLandmarker"]
+
+    def __init__(self, model_path: str, running_mode: "RunningMode", callback=None):
+        self.model_path = model_path
+        self.running_mode = running_mode
+        self._callback = callback
+        self.landmarkers = {MAX_HANDS: create_hand_landmarker(model_path, running_mode, MAX_HANDS, callback)}
+
+    def get(self, num_hands: int) -> "HandLandmarker":
+        """Returns the landmarker looking for `num_hands` hands, creating it if this is the first time it's asked for."""
+        landmarker = self.landmarkers.get(num_hands)
+        if landmarker is None:
+            landmarker = create_hand_landmarker(self.model_path, self.running_mode, num_hands, self._callback)
+            self.landmarkers[num_hands] = landmarker
+        return landmarker
+
+    def close(self) -> None:
+        for landmarker in self.landmarkers.values():
+            landmarker.close()
+
+class InProcessDetector(HandDetector):
+    """Runs mediapipe's `HandLandmarker` in live stream mode, inside the game process."""
+
+    hand_landmarkers: HandLandmarkers
+    callback: ResultCallback
+
+    def __init__(self, model_path: str, callback: ResultCallback):
+        import mediapipe as mp
+        from mediapipe.tasks.python.vision import RunningMode
+
+        self.callback = callback
+        self.max_hands = MAX_HANDS
+        self._hands = HandLandmarks()
+        self._mp = mp
+        # Right after `max_hands` changes, both landmarkers may still be delivering results.
+        self._callback_lock = threading.Lock()
+        self.hand_landmarkers = HandLandmarkers(model_path, RunningMode.LIVE_STREAM, self._on_result)
+
+    def _on_result(self, result, _image, timestamp_ms: int) -> None:
+        with self._callback_lock:
+            self._hands.load_result(result)
+            self.callback(self._hands, timestamp_ms)
+
+    def detect_async(self, frame: np.ndarray, timestamp_ms: int) -> bool:
+        image = self._mp.Image(data=frame, image_format=self._mp.ImageFormat.SRGB)
+        # The first single hand detection creates its landmarker, which blocks whoever submits frames (normally the
+        # capture thread, not the game loop) for a moment, once.
+        self.hand_landmarkers.get(self.max_hands).detect_async(image, timestamp_ms)
+        # Mediapipe takes every frame, but may skip some while it's busy. Their results never arrive, and
+        # `TrackingContext` finishes them up when a later result does.
+        return True
+
+    def close(self) -> None:
+        self.hand_landmarkers.close()
+
+class ProcessDetector(HandDetector):
+    """
+    Runs the `HandLandmarker` in a worker process, so that inference and result conversion never compete
+    with the render loop for the GIL.
+
+    Frames are copied into one of `FRAME_SLOTS` slots in a shared memory block, and only the slot index, frame
+    shape and timestamp are sent to the worker. Slots are sized for the largest frame seen so far, so frames of
+    different sizes (i.e. full frames and region of interest crops) can share them. The worker writes its results
+    into a fixed-size float32 array (also in shared memory) for the same slot, and a background thread in this
+    process copies them into `HandLandmarks` for the callback. Like mediapipe's own live stream mode, frames that
+    arrive while every slot is busy are dropped.
+    """
+
+    FRAME_SLOTS = 2
+
+    # Each hand's result row holds its landmarks, then its handedness index and score.
+    RESULT_ROW_SIZE = LANDMARK_COUNT * 3 + 2
+
+    # How long to wait for the worker to exit cleanly before killing it.
+    SHUTDOWN_TIMEOUT_S = 2
+
+    callback: ResultCallback
+
+    # The number of frames dropped because the worker was still busy with every slot.
+    dropped_frames: int
+
+    def __init__(self, model_path: str, callback: ResultCallback):
+        self.callback = callback
+        self.max_hands = MAX_HANDS
+        self.dropped_frames = 0
+        self._hands = HandLandmarks()
+
+        self._frame_memory: shared_memory.SharedMemory | None = None
+        self._frame_slots: np.ndarray | None = None
+        self._result_memory = shared_memory.SharedMemory(
+            create=True,
+            size=self.FRAME_SLOTS * MAX_HANDS * self.RESULT_ROW_SIZE * np.dtype(np.float32).itemsize)
+        self._results = np.ndarray(
+            (self.FRAME_SLOTS, MAX_HANDS, self.RESULT_ROW_SIZE), dtype=np.float32, buffer=self._result_memory.buf)
+
+        self._busy = [False] * self.FRAME_SLOTS
+        self._lock = threading.Lock()
+
+        # Spawning (rather than forking) avoids inheriting the game's threads and SDL state.
+        context = multiprocessing.get_context("spawn")
+        worker_requests, self._requests = context.Pipe(duplex=False)
+        results, worker_results = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_detector_worker,
+            args=(model_path, self._result_memory.name, worker_requests, worker_results),
+            name="hand-detector",
+            daemon=True)
+        self._process.start()
+
+        # Only the worker should hold these ends, so that the listener sees EOF if the worker dies.
+        worker_requests.close()
+        worker_results.close()
+
+        self._listener = threading.Thread(target=self._listen, args=(results,), name="hand-detector-results", daemon=True)
+        self._listener.start()
+
+    def detect_async(self, frame: np.ndarray, timestamp_ms: int) -> bool:
+        with self._lock:
+            if not self._process.is_alive():
+                return False
+
+            slot = next((i for i in range(self.FRAME_SLOTS) if not self._busy[i]), None)
+            resize_needed = self._frame_slots is None or self._frame_slots.shape[1] < frame.nbytes
+
+            # The shared block can only be swapped out once the worker is done with every frame in it.
+            if slot is None or (resize_needed and any(self._busy)):
+                self.dropped_frames += 1
+                return False
+
+            if resize_needed:
+                self._resize_frame_memory(frame.nbytes)
+
+            self._frame_slots[slot, :frame.nbytes] = frame.reshape(-1)
+            self._busy[slot] = True
+            self._requests.send((self._frame_memory.name, self._frame_slots.shape[1], frame.shape, slot, timestamp_ms,
+                                 self.max_hands))
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._requests.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+
+        self._process.join(self.SHUTDOWN_TIMEOUT_S)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._listener.join(self.SHUTDOWN_TIMEOUT_S)
+
+        self._results = None
+        self._result_memory.close()
+        self._result_memory.unlink()
+        self._release_frame_memory()
+
+    def _resize_frame_memory(self, slot_size: int) -> None:
+        """
+        (Re)allocates the shared frame slots to hold `slot_size` bytes each. Must be called with the lock held and
+        with no frames in flight, since the worker may still be reading the old block otherwise.
+        """
+        self._release_frame_memory()
+        self._frame_memory = shared_memory.SharedMemory(create=True, size=self.FRAME_SLOTS * slot_size)
+        self._frame_slots = np.ndarray((self.FRAME_SLOTS, slot_size), dtype=np.uint8, buffer=self._frame_memory.buf)
+
+    def _release_frame_memory(self) -> None:
+        if self._frame_memory is not None:
+            self._frame_slots = None
+            self._frame_memory.close()
+            self._frame_memory.unlink()
+            self._frame_memory = None
+
+    def _listen(self, results: Connection) -> None:
+        """Receives completion messages from the worker and dispatches results to the callback."""
+        while True:
+            try:
+                message = results.recv()
+            except (EOFError, OSError):
+                return
+
+            if message is None:
+                return
+
+            if isinstance(message, str):
+                print(f"Hand detector process failed: {message}")
+                return
+
+            slot, timestamp_ms, hand_count = message
+            self._unpack_result(slot, hand_count)
+
+            with self._lock:
+                self._busy[slot] = False
+
+            self.callback(self._hands, timestamp_ms)
+
+    def _unpack_result(self, slot: int, hand_count: int) -> None:
+        rows = self._results[slot, :hand_count]
+        hands = self._hands
+        hands.landmarks[:hand_count] = rows[:, :LANDMARK_COUNT * 3].reshape(hand_count, LANDMARK_COUNT, 3)
+        hands.handedness[:hand_count] = rows[:, -2]
+        hands.scores[:hand_count] = rows[:, -1]
+        hands.hand_count = hand_count
+
+def _detector_worker(model_path: str, result_memory_name: str, requests: Connection, responses: Connection) -> None:
+    """Entry point of the `ProcessDetector` worker process."""
+    import mediapipe as mp
+    from mediapipe.tasks.python.vision import RunningMode
+
+    try:
+        hand_landmarkers = HandLandmarkers(model_path, RunningMode.VIDEO)
+    except Exception as error:
+        responses.send(str(error))
+        return
+
+    result_memory = shared_memory.SharedMemory(name=result_memory_name)
+    results = np.ndarray(
+        (ProcessDetector.FRAME_SLOTS, MAX_HANDS, ProcessDetector.RESULT_ROW_SIZE),
+        dtype=np.float32,
+        buffer=result_memory.buf)
+    frame_memory: shared_memory.SharedMemory | None = None
+    frame: np.ndarray | None = None
+    hands = HandLandmarks()
+
+    while True:
+        try:
+            request = requests.recv()
+        except EOFError:
+            break
+
+        if request is None:
+            break
+
+        frame_memory_name, slot_size, shape, slot, timestamp_ms, max_hands = request
+        if frame_memory is None or frame_memory.name != frame_memory_name:
+            if frame_memory is not None:
+                frame_memory.close()
+            frame_memory = shared_memory.SharedMemory(name=frame_memory_name)
+
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=frame_memory.buf, offset=slot * slot_size)
+        image = mp.Image(data=frame, image_format=mp.ImageFormat.SRGB)
+        result = hand_landmarkers.get(max_hands).detect_for_video(image, timestamp_ms)
+        frame = None
+
+        hands.load_result(result)
+        hand_count = hands.hand_count
+        rows = results[slot, :hand_count]
+        rows[:, :LANDMARK_COUNT * 3] = hands.landmarks[:hand_count].reshape(hand_count, -1)
+        rows[:, -2] = hands.handedness[:hand_count]
+        rows[:, -1] = hands.scores[:hand_count]
+
+        responses.send((slot, timestamp_ms, hand_count))
+
+    hand_landmarkers.close()
+    results = None
+    result_memory.close()
+    if frame_memory is not None:
+        frame_memory.close()
+    responses.send(None)
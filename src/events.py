@@ -1,6 +1,7 @@
 from pygame.event import custom_type
 
-# Dispatched from the Setup state when the game should start.
+# Dispatched from the Setup state when the game should start. Its `handedness` attribute is the handedness (an index
+# into `landmarks.HANDEDNESS_NAMES`) of the hand the player chose, or `None`.
 START_PONG = custom_type()
 
 # Dispatched from teh Pong state when the user first hits the ball. This is used for aesthetics only (the music starts).
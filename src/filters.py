@@ -0,0 +1,95 @@
+import math
+
+class OneEuroFilter:
+    """
+    A "1€ filter" (Casiez et al., 2012) - an adaptive low pass filter for noisy, irregularly sampled signals.
+    While the signal is slow, it filters heavily (removing jitter). As the signal speeds up, the cutoff
+    frequency rises so that fast movements aren't lagged.
+    """
+
+    # The cutoff frequency (Hz) when the signal is stationary. Lower values remove more jitter.
+    min_cutoff: float
+
+    # How quickly the cutoff rises with speed. Higher values reduce lag during fast movements.
+    beta: float
+
+    # The cutoff frequency (Hz) used to smooth the derivative estimate.
+    derivative_cutoff: float
+
+    value: float | None
+    derivative: float
+    timestamp_ms: float | None
+
+    def __init__(self, min_cutoff: float, beta: float, derivative_cutoff: float = 1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.reset()
+
+    def reset(self) -> None:
+        self.value = None
+        self.derivative = 0.0
+        self.timestamp_ms = None
+
+    def __call__(self, value: float, timestamp_ms: float) -> float:
+        """Adds a sample, and returns the filtered value."""
+        if self.value is None:
+            self.value = value
+            self.timestamp_ms = timestamp_ms
+            return self.value
+
+        # Repeated or out of order samples carry no new information.
+        if timestamp_ms <= self.timestamp_ms:
+            return self.value
+
+        dt = (timestamp_ms - self.timestamp_ms) / 1000
+        self.timestamp_ms = timestamp_ms
+
+        derivative = (value - self.value) / dt
+        self.derivative += self.smoothing_factor(self.derivative_cutoff, dt) * (derivative - self.derivative)
+
+        cutoff = self.min_cutoff + self.beta * abs(self.derivative)
+        self.value += self.smoothing_factor(cutoff, dt) * (value - self.value)
+        return self.value
+
+    @staticmethod
+    def smoothing_factor(cutoff: float, dt: float) -> float:
+        tau = 1 / (2 * math.pi * cutoff)
+        return 1 / (1 + tau / dt)
+
+class PositionPredictor:
+    """
+    Smooths a tracked position with a `OneEuroFilter` and extrapolates it forward in time using the filter's
+    velocity estimate. This compensates for the capture and inference latency between when a camera frame was
+    taken (the timestamp passed to `observe`) and when the result is shown on screen.
+    """
+
+    filter: OneEuroFilter
+
+    # How far past the requested time to extrapolate (ms) - i.e. the expected render/display latency.
+    horizon_ms: float
+
+    # Extrapolation is never carried further than this past the latest observation (ms). This keeps the
+    # prediction from running away when tracking drops out.
+    max_extrapolation_ms: float
+
+    def __init__(self, min_cutoff: float, beta: float, horizon_ms: float, derivative_cutoff: float = 1.0,
+                 max_extrapolation_ms: float = 100):
+        self.filter = OneEuroFilter(min_cutoff, beta, derivative_cutoff)
+        self.horizon_ms = horizon_ms
+        self.max_extrapolation_ms = max_extrapolation_ms
+
+    def reset(self) -> None:
+        self.filter.reset()
+
+    def observe(self, value: float, timestamp_ms: float) -> None:
+        """Adds a measurement taken at `timestamp_ms`."""
+        self.filter(value, timestamp_ms)
+
+    def predict(self, now_ms: float) -> float | None:
+        """Returns the predicted position at `now_ms` (plus the horizon), or `None` before any observations."""
+        if self.filter.value is None:
+            return None
+
+        lead_ms = min(now_ms + self.horizon_ms - self.filter.timestamp_ms, self.max_extrapolation_ms)
+        return self.filter.value + self.filter.derivative * max(lead_ms, 0) / 1000
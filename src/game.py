@@ -1,10 +1,17 @@
+import time
 from os import path
 import pygame
 from pygame.freetype import Font
-import mediapipe as mp
 from .states import state as abstract_state, setup, pong
 from .events import *
 from .tracking_context import TrackingContext
+from .detectors import IN_PROCESS
+from .quality import QualityGovernor
+from .instrumentation import FrameProfiler
+from .camera import CameraRegistry
+from .assets import AssetManager
+from .input_sources import open_input_source
+from .recording import LandmarkReplay
 
 class Game:
     tracking: TrackingContext
@@ -15,27 +22,127 @@ class Game:
     SONG_REPEAT_START_S = 6 # Where the song should restart after it reaches the end (in seconds)
     SONG_FADE_MS = 1500
 
+    # The game rules are simulated in fixed steps at this rate, independently of how fast frames are rendered.
+    SIMULATION_HZ = 240
+
+    # Real time elapsed in one frame is capped at this, so that a long stall (i.e. dragging the window) doesn't
+    # cause a burst of catch-up simulation steps.
+    MAX_FRAME_MS = 250
+
+    # The frame rate cap used when vsync was requested but isn't available.
+    FALLBACK_FPS = 60
+
+    WINDOW_SIZE = (1280, 720)
+
+    # The frame budget used by the quality governor when the frame rate isn't capped.
+    DEFAULT_FRAME_BUDGET_MS = 1000 / 60
+
+    # How much game time (ms) passes each frame while replaying a landmark recording.
+    REPLAY_FRAME_MS = 1000 / 60
+
     root_dir: str
+    assets: AssetManager
     state: abstract_state.State
+
+    # Both states are created once when the game starts, then reset and reused each time they're entered.
+    setup_state: setup.Setup
+    pong_state: pong.Pong
     tracking: TrackingContext
+    cameras: CameraRegistry
     song_playing: bool
     font: Font
 
-    def __init__(self, root_dir: str) -> None:
+    # Whether to synchronize frames to the display's refresh rate.
+    vsync: bool
+
+    # The maximum render frame rate. 0 leaves rendering uncapped.
+    max_fps: int
+
+    # Lowers rendering and tracking quality when frames take longer than the frame budget.
+    quality: QualityGovernor
+
+    # Times each stage of the game loop. The overlay is toggled with PROFILER_OVERLAY_KEY, and a summary is
+    # written to `profile_path` (if given) when the game exits.
+    profiler: FrameProfiler
+    show_profiler_overlay: bool
+    profile_path: str | None
+    PROFILER_OVERLAY_KEY = pygame.K_F3
+
+    # Whether to play the multi-ball game mode, where the ball splits every few hits.
+    multi_ball: bool
+
+    # A video file or image sequence to play instead of a camera, a landmark recording to replay instead of
+    # running hand detection, and where to record this session's hand tracking results. Each is optional.
+    input_path: str | None
+    replay_path: str | None
+    record_path: str | None
+
+    # If set, game time advances by exactly this much (ms) each frame, rather than by however long the frame
+    # really took. Replays use this, so that they play out the same way every time no matter how fast frames
+    # are produced.
+    fixed_frame_ms: float | None
+
+    # The game time (ms) while `fixed_frame_ms` is in use.
+    game_time_ms: float
+
+    def __init__(self, root_dir: str, detector_backend: str = IN_PROCESS, vsync: bool = True, max_fps: int = 0,
+                 roi_mode: bool = True, motion_gating: bool = True, profile_path: str | None = None,
+                 show_profiler_overlay: bool = False, multi_ball: bool = False, input_path: str | None = None,
+                 replay_path: str | None = None, record_path: str | None = None) -> None:
         pygame.init()
         pygame.display.set_caption("seth hinz 4 instrumentation engineer")
         self.root_dir = root_dir
         self.state = None
-        self.tracking = TrackingContext(self.root_dir, None)
+        self.input_path = input_path
+        self.replay_path = replay_path
+        self.record_path = record_path
+        self.fixed_frame_ms = self.REPLAY_FRAME_MS if replay_path is not None else None
+        self.game_time_ms = 0.0
+
+        # A replay stands in for the detector, so there's no need to load it.
+        self.tracking = TrackingContext(
+            self.root_dir,
+            None,
+            threaded_capture=True,
+            detector_backend=detector_backend if replay_path is None else None,
+            roi_mode=roi_mode,
+            motion_gating=motion_gating,
+            clock=self.now_ms)
+        if replay_path is not None:
+            self.tracking.replay = LandmarkReplay(replay_path)
+        if record_path is not None:
+            self.tracking.start_recording(record_path)
+        self.cameras = CameraRegistry()
+        self.assets = AssetManager(self.root_dir)
+        # Like the hand detector, the background color table is prepared on a background thread.
+        self.assets.colors.load_in_background()
         self.song_playing = False  # Track if the song is already playing
-        self.font = Font(path.join(self.root_dir, "assets/MadimiOne-Regular.ttf"), 24)
+        self.font = self.assets.font("assets/MadimiOne-Regular.ttf", 24)
+        self.vsync = vsync
+        self.max_fps = max_fps
+        self.quality = QualityGovernor(self.DEFAULT_FRAME_BUDGET_MS)
+        self.apply_quality()
+
+        # Detection latency is measured by the tracking context as results arrive, so the profiler reports
+        # its histogram rather than keeping its own.
+        self.profiler = FrameProfiler()
+        self.profiler.histograms["capture_to_result"] = self.tracking.result_latency
+        self.show_profiler_overlay = show_profiler_overlay
+        self.profile_path = profile_path
+        self.multi_ball = multi_ball
+
+    def now_ms(self) -> int:
+        """The game time (ms) - real time, unless `fixed_frame_ms` is set."""
+        if self.fixed_frame_ms is not None:
+            return int(self.game_time_ms)
+        return pygame.time.get_ticks()
 
     def play_music(self):
         """
         Begins the game music, if it is not already playing. Idempotent.
         """
         if not self.song_playing:
-            pygame.mixer.music.load(f'{self.root_dir}/{self.SONG_PATH}')
+            self.assets.load_music(self.SONG_PATH)
             pygame.mixer.music.play(0)  # Loop indefinitely
             pygame.mixer.music.set_volume(0.3)
             self.song_playing = True
@@ -53,44 +160,146 @@ class Game:
             pygame.mixer.music.set_volume(0.3)
             pygame.mixer.music.set_volume(1)  # Ensure volume is reset after fade
 
-    def start(self):
-        """Starts the gameloop. This method blocks until the user quits the game."""
+    def apply_quality(self) -> None:
+        """Passes the governor's current quality level on to hand tracking. States read it themselves."""
+        level = self.quality.level
+        self.tracking.set_detection_quality(level.detection_size, level.search_width, level.detection_interval_ms)
 
-        screen = pygame.display.set_mode((1280, 720))
+    def create_window(self) -> pygame.Surface:
+        """
+        Opens the game window. Pygame can only vsync scaled or OpenGL windows, and not every platform supports
+        it - in that case, the frame rate is capped at FALLBACK_FPS instead (unless a cap was already given).
+
+        Note that vsync therefore changes how the window behaves: a `SCALED` window is upscaled by a whole multiple
+        when the desktop has room for it (so it can open larger than WINDOW_SIZE, while the game still draws at
+        WINDOW_SIZE), and is letterboxed when resized. Without vsync, the window is a plain one of exactly
+        WINDOW_SIZE.
+        """
+        if self.vsync:
+            try:
+                return pygame.display.set_mode(self.WINDOW_SIZE, pygame.SCALED, vsync=1)
+            except pygame.error:
+                print(f"Vsync is not available, capping the frame rate at {self.FALLBACK_FPS} fps instead")
+                self.max_fps = self.max_fps or self.FALLBACK_FPS
+
+        return pygame.display.set_mode(self.WINDOW_SIZE)
+
+    def start(self, max_frames: int | None = None):
+        """
+        Starts the gameloop. This method blocks until the user quits the game, or until `max_frames` frames have
+        been shown (if given).
+        """
+
+        screen = self.create_window()
         clock = pygame.time.Clock()
         running = True
 
-        self.state = setup.Setup(self.font, self.tracking)
+        if self.max_fps > 0:
+            self.quality.frame_budget_ms = 1000 / self.max_fps
+
+        # A fixed input replaces the camera list on the setup screen.
+        fixed_input = self.replay_path or self.input_path
+        input_name = path.basename(fixed_input) if fixed_input is not None else None
+        if self.input_path is not None:
+            self.tracking.camera = open_input_source(self.input_path)
+
+        self.setup_state = setup.Setup(self.assets, self.font, self.tracking, self.quality, self.cameras, input_name)
+        self.pong_state = pong.Pong(self.assets, self.font, self.tracking, self.quality, self.multi_ball)
+        self.state = self.setup_state
+
+        # The simulation is advanced in fixed steps, and `accumulator` holds the real time (in ms) that has
+        # passed but hasn't been simulated yet. Rendering then interpolates between the last two steps.
+        step_ms = 1000 / self.SIMULATION_HZ
+        accumulator = 0.0
+        last_frame_time = time.perf_counter()
+        frames = 0
 
         while running:
+            self.profiler.begin_frame()
+
             # poll for events
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.KEYDOWN and event.key == self.PROFILER_OVERLAY_KEY:
+                    self.show_profiler_overlay = not self.show_profiler_overlay
                 elif event.type == START_PONG:
-                    self.state = pong.Pong(self.root_dir, self.font, self.tracking)
+                    # Only the hand the player started with moves the paddle.
+                    self.tracking.lock_hand(event.handedness)
+                    self.pong_state.reset()
+                    self.state = self.pong_state
                 elif event.type == FIRST_HIT:
                     self.play_music() # For dramatic effect, there is no music until the player hits the ball
                 elif event.type == GAME_OVER:
-                    self.state = setup.Setup(self.font, self.tracking)
+                    self.tracking.lock_hand(None)
+                    self.setup_state.reset()
+                    self.state = self.setup_state
                 else:
                     self.state.handle_event(event)
 
+            self.profiler.mark("events")
             self.update_music()
+            self.profiler.mark("music")
+
+            now = time.perf_counter()
+            if self.fixed_frame_ms is not None:
+                self.game_time_ms += self.fixed_frame_ms
+                frame_ms = self.fixed_frame_ms
+            else:
+                frame_ms = min((now - last_frame_time) * 1000, self.MAX_FRAME_MS)
+            accumulator += frame_ms
+            last_frame_time = now
+            frame_start_time = now
+
+            self.state.frame_update(frame_ms)
+            while accumulator >= step_ms:
+                self.state.update(step_ms)
+                accumulator -= step_ms
 
-            self.state.draw(screen)
+                # Once a state has asked for a transition, it shouldn't keep simulating - the new state
+                # starts fresh on the next frame.
+                if pygame.event.peek([START_PONG, GAME_OVER]):
+                    accumulator = 0.0
+                    break
 
-            delta = clock.tick(60)
-            self.state.update(delta)
+            self.profiler.mark("update")
+            self.state.draw(screen, accumulator / step_ms)
+            self.profiler.mark("draw")
 
             # Tracking is async and has some latency in a different thread. Double buffering
             # is also a BIT slow, so there is likely less total motion-to-photon latency by
             # doing tracking at the end of the gameloop with the buffer flip than by tracking
             # before the draw & update (although the latter is more intuitive).
-            self.tracking.update(pygame.time.get_ticks())
+            self.tracking.update(self.now_ms())
+            self.profiler.mark("tracking")
+
+            # The frame's cost is measured before the flip, since flipping may block on vsync.
+            if self.quality.record_frame((time.perf_counter() - frame_start_time) * 1000):
+                self.apply_quality()
+
+            if self.show_profiler_overlay:
+                self.profiler.draw_overlay(screen, self.font, [self.assets.text_cache.describe()])
+            self.profiler.mark("overlay")
 
             pygame.display.flip()
+            self.profiler.mark("flip")
+            self.profiler.end_frame()
+
+            # How old the newest detection is when it reaches the screen - the motion-to-photon latency.
+            detection_timestamp_ms = self.tracking.hands.timestamp_ms
+            if detection_timestamp_ms is not None:
+                self.profiler.record("capture_to_flip", self.now_ms() - detection_timestamp_ms)
+
+            clock.tick(self.max_fps)
+            frames += 1
+            if max_frames is not None and frames >= max_frames:
+                running = False
 
+        if self.profile_path is not None:
+            self.profiler.dump(self.profile_path)
+            print(f"Wrote frame timings to {self.profile_path}")
+            print(self.assets.text_cache.describe())
+        self.tracking.close()
         pygame.quit()
 
 
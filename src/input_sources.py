@@ -0,0 +1,111 @@
+import glob
+import time
+from os import path
+from typing import List
+import cv2
+import numpy as np
+
+# Files picked up from a directory by `open_input_source`.
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+class PacedSource:
+    """
+    A recorded video input that stands in for a camera. Sources have the same `read`, `isOpened` and `release`
+    methods as OpenCV's `VideoCapture`, so `TrackingContext` and `CaptureThread` use them exactly like a camera.
+    Like a camera, `read` delivers frames at the source's frame rate - it waits until each frame is due, rather
+    than returning frames as fast as they can be decoded. If reading falls behind, frames are delivered late
+    rather than skipped.
+    """
+
+    # How many frames per second are delivered.
+    fps: float
+
+    # Whether the source starts over once it runs out of frames, rather than failing every read after that.
+    loop: bool
+
+    def __init__(self, fps: float, loop: bool):
+        self.fps = fps
+        self.loop = loop
+        self._next_frame_s = None
+
+    def wait_for_next_frame(self) -> None:
+        interval_s = 1 / self.fps
+        now = time.perf_counter()
+        if self._next_frame_s is None or now - self._next_frame_s > interval_s:
+            self._next_frame_s = now
+        elif self._next_frame_s > now:
+            time.sleep(self._next_frame_s - now)
+        self._next_frame_s += interval_s
+
+class VideoFileSource(PacedSource):
+    """Plays a video file (anything OpenCV can decode) as if it were a camera."""
+
+    # Used when the file doesn't say what its frame rate is.
+    DEFAULT_FPS = 30
+
+    def __init__(self, video_path: str, loop: bool = True):
+        self.capture = cv2.VideoCapture(video_path)
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        super().__init__(fps if fps > 0 else self.DEFAULT_FPS, loop)
+
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+
+    def read(self, image: np.ndarray | None = None):
+        got_frame, image = self.capture.read(image)
+        if not got_frame and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            got_frame, image = self.capture.read(image)
+
+        if got_frame:
+            self.wait_for_next_frame()
+        return got_frame, image
+
+    def release(self) -> None:
+        self.capture.release()
+
+class ImageSequenceSource(PacedSource):
+    """Plays a sequence of image files, in order, as if they were frames from a camera."""
+
+    image_paths: List[str]
+
+    # The index of the next image to read.
+    position: int
+
+    def __init__(self, image_paths: List[str], fps: float = 30, loop: bool = True):
+        super().__init__(fps, loop)
+        self.image_paths = image_paths
+        self.position = 0
+
+    def isOpened(self) -> bool:
+        return len(self.image_paths) > 0
+
+    def read(self, image: np.ndarray | None = None):
+        if self.position >= len(self.image_paths):
+            if not self.loop or len(self.image_paths) == 0:
+                return False, image
+            self.position = 0
+
+        # Unlike `VideoCapture`, `imread` can't decode into an existing array.
+        frame = cv2.imread(self.image_paths[self.position])
+        self.position += 1
+        if frame is None:
+            return False, image
+
+        self.wait_for_next_frame()
+        return True, frame
+
+    def release(self) -> None:
+        pass
+
+def open_input_source(source_path: str) -> PacedSource:
+    """
+    Opens a recorded video input: a directory of images (played in name order), a glob pattern matching images
+    (i.e. `frames/*.png`), or otherwise a video file.
+    """
+    if path.isdir(source_path):
+        image_paths = sorted(p for p in glob.glob(path.join(source_path, "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+        return ImageSequenceSource(image_paths)
+    if glob.has_magic(source_path):
+        return ImageSequenceSource(sorted(glob.glob(source_path)))
+    return VideoFileSource(source_path)
@@ -0,0 +1,127 @@
+import csv
+import json
+import threading
+import time
+from typing import Dict, Iterable
+import numpy as np
+from pygame import Surface
+from pygame.freetype import Font
+
+class RingHistogram:
+    """
+    Keeps the most recent `capacity` samples of some measurement in a preallocated ring buffer, so recording is
+    cheap enough to do every frame. Statistics are only computed when they're asked for.
+
+    Recording and reading are guarded by a lock, since some measurements (i.e. detection latency) are recorded
+    from another thread while the game loop reads them.
+    """
+
+    capacity: int
+    count: int
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.count = 0
+        self._samples = np.zeros(capacity)
+        self._lock = threading.Lock()
+
+    def record(self, value: float) -> None:
+        with self._lock:
+            self._samples[self.count % self.capacity] = value
+            self.count += 1
+
+    def samples(self) -> np.ndarray:
+        """Returns a copy of the retained samples (oldest first)."""
+        return self._copy()[1]
+
+    def _copy(self) -> tuple:
+        """Returns the sample count and a copy of the retained samples, taken together under the lock."""
+        with self._lock:
+            if self.count <= self.capacity:
+                return self.count, self._samples[:self.count].copy()
+            start = self.count % self.capacity
+            return self.count, np.concatenate((self._samples[start:], self._samples[:start]))
+
+    def summary(self, percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, float]:
+        """Returns the sample count, mean, max and the given percentiles of the retained samples."""
+        count, samples = self._copy()
+        if len(samples) == 0:
+            return {"count": 0}
+
+        summary = {"count": count, "mean": float(samples.mean()), "max": float(samples.max())}
+        for percentile, value in zip(percentiles, np.percentile(samples, list(percentiles))):
+            summary[f"p{percentile:g}"] = float(value)
+        return summary
+
+class FrameProfiler:
+    """
+    Times each stage of the game loop and records latency measurements, all in milliseconds. Stages are timed
+    by calling `begin_frame` at the top of the loop and `mark` after each stage - each mark records the time
+    since the previous one.
+    """
+
+    # Game loop stages, in the order they run.
+    STAGES = ("events", "music", "update", "draw", "tracking", "overlay", "flip")
+
+    # Latency measurements, recorded with `record`:
+    # - capture_to_result: from camera frame capture to its detection result arriving.
+    # - capture_to_flip: the age of the displayed detection (since its frame was captured) at buffer flip.
+    LATENCIES = ("capture_to_result", "capture_to_flip")
+
+    histograms: Dict[str, RingHistogram]
+
+    def __init__(self, capacity: int = 4096):
+        self.histograms = {name: RingHistogram(capacity) for name in (*self.STAGES, "frame", *self.LATENCIES)}
+        self._frame_start = time.perf_counter()
+        self._last_mark = self._frame_start
+
+    def begin_frame(self) -> None:
+        self._frame_start = self._last_mark = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        """Records the time since the previous mark (or the start of the frame) as the duration of `stage`."""
+        now = time.perf_counter()
+        self.histograms[stage].record((now - self._last_mark) * 1000)
+        self._last_mark = now
+
+    def end_frame(self) -> None:
+        self.histograms["frame"].record((self._last_mark - self._frame_start) * 1000)
+
+    def record(self, name: str, value_ms: float) -> None:
+        self.histograms[name].record(value_ms)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def dump(self, file: str) -> None:
+        """Writes a summary of every measurement to `file`, as CSV if it ends in `.csv` and JSON otherwise."""
+        summary = self.summary()
+        if file.endswith(".csv"):
+            columns = ["count", "mean", "p50", "p90", "p99", "max"]
+            with open(file, "w", newline="") as output:
+                writer = csv.writer(output)
+                writer.writerow(["measurement", *columns])
+                for name, stats in summary.items():
+                    writer.writerow([name, *(stats.get(column, "") for column in columns)])
+        else:
+            with open(file, "w") as output:
+                json.dump(summary, output, indent=2)
+
+    def draw_overlay(self, screen: Surface, font: Font, extra_lines: Iterable[str] = ()) -> None:
+        """
+        Draws the median and 99th percentile of every measurement in the top right corner of `screen`, followed
+        by `extra_lines` (for other stats worth keeping an eye on).
+        """
+        lines = []
+        for name, histogram in self.histograms.items():
+            # Only the last few seconds are summarized, to keep the overlay responsive and cheap.
+            samples = histogram.samples()[-240:]
+            if len(samples) > 0:
+                p50, p99 = np.percentile(samples, (50, 99))
+                lines.append(f"{name:<18} {p50:6.2f} {p99:6.2f}")
+
+        x = screen.get_width() - 320
+        y = 10
+        for line in [f"{'ms':<18} {'p50':>6} {'p99':>6}", *lines, *extra_lines]:
+            text_rect = font.render_to(screen, (x, y), line, "white", "black", size=14)
+            y += text_rect.height + 4
@@ -0,0 +1,158 @@
+import threading
+from typing import TYPE_CHECKING
+import numpy as np
+
+# Mediapipe is slow to import, so it's only loaded in the background (see `TrackingContext`).
+if TYPE_CHECKING:
+    from mediapipe.tasks.python.vision import HandLandmarkerResult
+
+MAX_HANDS = 2
+LANDMARK_COUNT = 21
+
+# Indices of the landmarks used by the game (these match mediapipe's `HandLandmark` enum).
+WRIST = 0
+INDEX_FINGER_MCP = 5
+PINKY_MCP = 17
+
+# Pairs of landmarks joined by a bone in the hand skeleton (mediapipe's `HAND_CONNECTIONS`).
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),         # thumb
+    (0, 5), (5, 6), (6, 7), (7, 8),         # index finger
+    (9, 10), (10, 11), (11, 12),            # middle finger
+    (13, 14), (14, 15), (15, 16),           # ring finger
+    (0, 17), (17, 18), (18, 19), (19, 20),  # pinky
+    (5, 9), (9, 13), (13, 17),              # palm
+)
+
+# Mediapipe reports handedness as a category name - compactly, it's stored as its index in this tuple.
+HANDEDNESS_NAMES = ("Left", "Right")
+
+class HandLandmarks:
+    """
+    The hands found in one detection pass, stored in preallocated arrays rather than mediapipe's result objects
+    (which are slow to index, and allocate a Python object for every coordinate). Only the first `hand_count`
+    rows of each array are meaningful.
+    """
+
+    # Normalized (x, y, z) coordinates of every landmark, shaped (MAX_HANDS, LANDMARK_COUNT, 3).
+    landmarks: np.ndarray
+
+    # Each hand's index into HANDEDNESS_NAMES, and the confidence of that classification.
+    handedness: np.ndarray
+    scores: np.ndarray
+
+    hand_count: int
+
+    # The capture timestamp of the frame these hands were detected in, or `None` if there was no detection.
+    timestamp_ms: int | None
+
+    # Incremented every time a new result is published (see `LandmarkBuffer`), so readers can cheaply tell
+    # whether they've already seen this one.
+    sequence: int
+
+    def __init__(self):
+        self.landmarks = np.zeros((MAX_HANDS, LANDMARK_COUNT, 3), dtype=np.float32)
+        self.handedness = np.zeros(MAX_HANDS, dtype=np.int8)
+        self.scores = np.zeros(MAX_HANDS, dtype=np.float32)
+        self.hand_count = 0
+        self.timestamp_ms = None
+        self.sequence = 0
+
+    def load_result(self, result: "HandLandmarkerResult") -> None:
+        """Copies the hands in a mediapipe result into this object's arrays."""
+        self.hand_count = min(len(result.hand_landmarks), MAX_HANDS)
+        for hand in range(self.hand_count):
+            self.landmarks[hand] = [(landmark.x, landmark.y, landmark.z) for landmark in result.hand_landmarks[hand]]
+            category = result.handedness[hand][0]
+            self.handedness[hand] = HANDEDNESS_NAMES.index(category.category_name)
+            self.scores[hand] = category.score
+
+    def keep_handedness(self, handedness: int, min_score: float = 0.0) -> None:
+        """
+        Drops every hand except those of the given `handedness` (an index into HANDEDNESS_NAMES) that were
+        classified with at least `min_score` confidence, in place.
+        """
+        count = self.hand_count
+        kept = np.flatnonzero((self.handedness[:count] == handedness) & (self.scores[:count] >= min_score))
+        self.hand_count = len(kept)
+        self.landmarks[:self.hand_count] = self.landmarks[kept]
+        self.handedness[:self.hand_count] = self.handedness[kept]
+        self.scores[:self.hand_count] = self.scores[kept]
+
+    def copy_from(self, other: "HandLandmarks") -> None:
+        count = other.hand_count
+        self.landmarks[:count] = other.landmarks[:count]
+        self.handedness[:count] = other.handedness[:count]
+        self.scores[:count] = other.scores[:count]
+        self.hand_count = count
+        self.timestamp_ms = other.timestamp_ms
+
+class LandmarkBuffer:
+    """
+    Hands results over from the detector's callback thread to the game loop without either side waiting on the
+    other's copying. It's a triple buffer: the newest published result, the result the reader is holding, and a
+    third buffer for the writer to fill. Publishing writes into the free buffer and then makes it the newest, and
+    `latest` hands the reader the newest one - so the writer never touches a buffer the reader holds, and a reader
+    always sees a complete result.
+
+    Results must only be read from one thread (the game loop). A snapshot returned by `latest` stays untouched until
+    that thread asks for `latest` again.
+    """
+
+    def __init__(self):
+        self._buffers = [HandLandmarks(), HandLandmarks(), HandLandmarks()]
+        self._newest = 0
+        self._reading = 0
+        self._sequence = 0
+
+        # Only held to move the indices above around, never while copying.
+        self._index_lock = threading.Lock()
+
+        # Writers (the detector callback, and the game thread clearing results) are serialized.
+        self._write_lock = threading.Lock()
+
+    @property
+    def latest(self) -> HandLandmarks:
+        """The most recently published result. Only call this from the reading thread."""
+        with self._index_lock:
+            self._reading = self._newest
+            return self._buffers[self._reading]
+
+    @property
+    def newest_hand_count(self) -> int:
+        """The number of hands in the most recently published result. Unlike `latest`, safe from any thread."""
+        return self._buffers[self._newest].hand_count
+
+    def publish(self, hands: HandLandmarks, timestamp_ms: int) -> None:
+        """Publishes a copy of `hands`, detected in the frame captured at `timestamp_ms`."""
+        with self._write_lock:
+            back = self._claim_back()
+            self._buffers[back].copy_from(hands)
+            self._buffers[back].timestamp_ms = timestamp_ms
+            self._swap(back)
+
+    def clear(self) -> None:
+        """Publishes an empty result (i.e. when the camera changes), unless the latest one is already empty."""
+        with self._write_lock:
+            newest = self._buffers[self._newest]
+            if newest.hand_count == 0 and newest.timestamp_ms is None:
+                return
+
+            back = self._claim_back()
+            self._buffers[back].hand_count = 0
+            self._buffers[back].timestamp_ms = None
+            self._swap(back)
+
+    def _claim_back(self) -> int:
+        """
+        Returns the index of the buffer that's neither the newest nor being read. The reader can only move on to the
+        newest buffer in the meantime, so this one stays free until it's published.
+        """
+        with self._index_lock:
+            return 3 - self._newest - self._reading if self._newest != self._reading else (self._newest + 1) % 3
+
+    def _swap(self, back: int) -> None:
+        self._sequence += 1
+        self._buffers[back].sequence = self._sequence
+        with self._index_lock:
+            self._newest = back
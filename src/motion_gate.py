@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    Decides whether a camera frame is worth running hand detection on. Each frame is shrunk to a tiny grayscale
+    thumbnail and compared with the thumbnail of the last frame that was analyzed - if almost nothing changed,
+    the previous detection result still holds and detection can be skipped. This saves a lot of CPU (and
+    battery) while the game sits idle.
+    """
+
+    # The size (w, h) of the thumbnails frames are compared at. Downscaling also averages away sensor noise.
+    THUMBNAIL_SIZE = (64, 36)
+
+    # The mean absolute difference (in 8 bit gray levels) above which a frame counts as changed.
+    THRESHOLD = 2.0
+
+    # Detection always runs at least this often (ms), so a slow drift or a missed change can't go unnoticed
+    # forever.
+    MAX_SKIP_MS = 1000
+
+    skipped_frames: int
+    processed_frames: int
+
+    def __init__(self):
+        self.skipped_frames = 0
+        self.processed_frames = 0
+        self._thumbnail = np.empty(self.THUMBNAIL_SIZE[::-1] + (3,), dtype=np.uint8)
+        self._gray = np.empty(self.THUMBNAIL_SIZE[::-1], dtype=np.uint8)
+        self._reference = np.empty(self.THUMBNAIL_SIZE[::-1], dtype=np.uint8)
+        self._reference_timestamp_ms = None
+
+    def reset(self) -> None:
+        """Forgets the reference frame, so that the next frame is always analyzed."""
+        self._reference_timestamp_ms = None
+
+    def should_detect(self, frame: np.ndarray, timestamp_ms: int) -> bool:
+        """Returns whether `frame` (RGB) differs enough from the last analyzed frame to need a new detection pass."""
+        cv2.resize(frame, self.THUMBNAIL_SIZE, dst=self._thumbnail, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._thumbnail, cv2.COLOR_RGB2GRAY, dst=self._gray)
+
+        if self._reference_timestamp_ms is not None and timestamp_ms - self._reference_timestamp_ms < self.MAX_SKIP_MS:
+            difference = cv2.norm(self._gray, self._reference, cv2.NORM_L1) / self._gray.size
+            if difference <= self.THRESHOLD:
+                self.skipped_frames += 1
+                return False
+
+        # Swap rather than copy - the old reference buffer is overwritten by the next thumbnail.
+        self._gray, self._reference = self._reference, self._gray
+        self._reference_timestamp_ms = timestamp_ms
+        self.processed_frames += 1
+        return True
@@ -0,0 +1,130 @@
+from typing import List
+import math
+import numpy as np
+from pygame import Surface
+from .sprites import render_circle_sprites
+
+class ParticleSystem:
+    """
+    Short-lived particles for effects (bursts when the ball hits something, and the ball's trail). Particles are
+    stored in fixed-capacity numpy arrays allocated up front, with the live particles packed at the start (oldest
+    first), so there's no python object per particle - emitting, moving and expiring particles are each a handful
+    of array operations no matter how many there are. They're drawn like the background accents: from a cache of
+    pre-rendered sprites (one per integer radius) in a single `Surface.blits` call.
+
+    Each particle shrinks from its starting radius to nothing over its lifetime, while slowing down with drag.
+    """
+
+    # The fraction of its velocity a particle keeps after one second.
+    DRAG = 0.05
+
+    # Particles are emitted with at most this radius, so that there's a sprite for every size they can be drawn at.
+    MAX_RADIUS = 12
+
+    capacity: int
+
+    # The most particles allowed to be alive at once - at most `capacity`. Lowering it drops the oldest particles
+    # right away, and emitting more than the budget allows just emits fewer.
+    budget: int
+    count: int
+
+    positions: np.ndarray
+    # In pixels per second.
+    velocities: np.ndarray
+    # Both in ms.
+    ages: np.ndarray
+    lifetimes: np.ndarray
+    radii: np.ndarray
+
+    color: str
+
+    # Pre-rendered circles, indexed by integer radius.
+    sprites: List[Surface]
+
+    def __init__(self, capacity: int, color: str = "white"):
+        self.capacity = capacity
+        self.budget = capacity
+        self.count = 0
+        self.positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.ages = np.zeros(capacity)
+        self.lifetimes = np.ones(capacity)
+        self.radii = np.zeros(capacity)
+        self.color = color
+        self.sprites = []
+        self._rng = np.random.default_rng()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def set_budget(self, budget: int) -> None:
+        self.budget = min(max(budget, 0), self.capacity)
+        if self.count > self.budget:
+            self._keep(np.arange(self.count - self.budget, self.count))
+
+    def emit(self, positions: np.ndarray, per_position: int, speed: float, lifetime_ms: float, radius: float,
+             angle: float = 0.0, spread: float = math.pi, variation: float = 0.3, reserve: int = 0) -> None:
+        """
+        Emits `per_position` particles from each of `positions` (one row per position). Each particle heads off
+        `spread` radians either side of `angle` (so the default spread is every direction), at up to `speed`
+        pixels per second. Their lifetimes and radii are randomly cut short by up to `variation` (as a fraction) of
+        `lifetime_ms` and `radius`. `reserve` particles of the budget are left free (i.e. for more important effects).
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        n = min(len(positions) * per_position, self.budget - reserve - self.count)
+        if n <= 0:
+            return
+
+        rng = self._rng
+        emitted = slice(self.count, self.count + n)
+        directions = angle + rng.uniform(-spread, spread, n)
+        speeds = speed * rng.uniform(0.2, 1.0, n)
+        self.positions[emitted] = np.repeat(positions, per_position, axis=0)[:n]
+        self.velocities[emitted, 0] = np.cos(directions) * speeds
+        self.velocities[emitted, 1] = np.sin(directions) * speeds
+        self.ages[emitted] = 0
+        self.lifetimes[emitted] = lifetime_ms * rng.uniform(1 - variation, 1.0, n)
+        self.radii[emitted] = min(radius, self.MAX_RADIUS) * rng.uniform(1 - variation, 1.0, n)
+        self.count += n
+
+    def update(self, delta_ms: float) -> None:
+        """Moves every particle forward by `delta_ms`, and drops the ones that have reached the end of their life."""
+        n = self.count
+        if n == 0:
+            return
+
+        delta_s = delta_ms / 1000
+        self.positions[:n] += self.velocities[:n] * delta_s
+        self.velocities[:n] *= self.DRAG ** delta_s
+        self.ages[:n] += delta_ms
+
+        alive = self.ages[:n] < self.lifetimes[:n]
+        if not alive.all():
+            self._keep(np.flatnonzero(alive))
+
+    def draw(self, surface: Surface) -> None:
+        n = self.count
+        if n == 0:
+            return
+
+        if len(self.sprites) == 0:
+            self.sprites = render_circle_sprites(self.MAX_RADIUS, self.color)
+
+        radii = (self.radii[:n] * (1 - self.ages[:n] / self.lifetimes[:n])).astype(np.intp)
+        visible = radii > 0
+        radii = radii[visible]
+
+        # Sprites are positioned by their top left corner, which is one radius up and left of the center.
+        corners = (self.positions[:n][visible] - radii[:, np.newaxis]).astype(np.intp).tolist()
+        sprites = self.sprites
+        surface.blits([(sprites[r], corner) for r, corner in zip(radii.tolist(), corners)], doreturn=False)
+
+    def _keep(self, indices: np.ndarray) -> None:
+        """Packs the particles at `indices` (in order) at the start of the arrays, dropping every other particle."""
+        kept = len(indices)
+        for array in (self.positions, self.velocities, self.ages, self.lifetimes, self.radii):
+            array[:kept] = array[indices]
+        self.count = kept
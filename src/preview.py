@@ -0,0 +1,80 @@
+from typing import Tuple
+import cv2
+import numpy as np
+import pygame
+from pygame import Surface
+from .landmarks import HandLandmarks, HAND_CONNECTIONS, MAX_HANDS, LANDMARK_COUNT
+
+HAND_SKELETON = np.array(HAND_CONNECTIONS, dtype=np.intp)
+
+# Colors (RGB) of the skeleton's bones and joints.
+BONE_COLOR = (224, 224, 224)
+JOINT_COLOR = (255, 48, 48)
+
+class SkeletonPainter:
+    """Draws wireframe hands onto RGB images, reusing its scratch buffers between calls."""
+
+    def __init__(self):
+        self._scaled_points = np.empty((MAX_HANDS, LANDMARK_COUNT, 2), dtype=np.float32)
+        self._pixel_points = np.empty((MAX_HANDS, LANDMARK_COUNT, 2), dtype=np.int32)
+        self._lines = np.empty((len(HAND_SKELETON), 2, 2), dtype=np.int32)
+
+    def draw(self, image: np.ndarray, hands: HandLandmarks, mirrored: bool = False,
+             thickness: int = 2, joint_radius: int = 4) -> None:
+        """Draws `hands` onto `image` in place. If `image` was mirrored horizontally, so are the hands."""
+        height, width = image.shape[:2]
+        np.multiply(hands.landmarks[:, :, :2], (width, height), out=self._scaled_points)
+        if mirrored:
+            np.subtract(width, self._scaled_points[:, :, 0], out=self._scaled_points[:, :, 0])
+        np.rint(self._scaled_points, out=self._scaled_points)
+        self._pixel_points[...] = self._scaled_points
+
+        for hand in range(hands.hand_count):
+            points = self._pixel_points[hand]
+            np.take(points, HAND_SKELETON, axis=0, out=self._lines)
+            cv2.polylines(image, self._lines, False, BONE_COLOR, thickness, cv2.LINE_AA)
+            for x, y in points.tolist():
+                cv2.circle(image, (x, y), joint_radius, JOINT_COLOR, -1, cv2.LINE_AA)
+
+class CameraPreview:
+    """
+    Renders the camera frame (with the detected hands on top) at the size it's shown on screen. The frame is
+    resized and mirrored once with OpenCV into a reused buffer, and that buffer is wrapped as a pygame surface
+    without copying. Nothing is redrawn until there's a new camera frame or detection result, or the preview
+    size changes.
+    """
+
+    painter: SkeletonPainter
+
+    def __init__(self):
+        self.painter = SkeletonPainter()
+        self._buffer = None
+        self._surface = None
+        self._key = None
+
+    def render(self, frame: np.ndarray, frame_sequence: int, hands: HandLandmarks, size: Tuple[int, int],
+               smooth: bool) -> Surface:
+        """
+        Returns a `size` (w, h) surface showing `frame` (RGB) mirrored, so it looks like a mirror to the player,
+        with `hands` drawn on top. `frame_sequence` must change whenever the frame's contents do. `smooth` chooses
+        area (rather than nearest neighbour) interpolation. The surface is reused by the next call.
+        """
+        key = (frame_sequence, hands.sequence, size, smooth)
+        if key == self._key:
+            return self._surface
+
+        width, height = size
+        if self._buffer is None or self._buffer.shape[:2] != (height, width):
+            self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+            self._scaled = np.empty_like(self._buffer)
+            # The surface reads straight from `_buffer`, so it has to be recreated along with it.
+            self._surface = pygame.image.frombuffer(self._buffer, size, "RGB")
+
+        interpolation = cv2.INTER_AREA if smooth else cv2.INTER_NEAREST
+        cv2.resize(frame, size, dst=self._scaled, interpolation=interpolation)
+        cv2.flip(self._scaled, 1, dst=self._buffer)
+        if hands.timestamp_ms is not None:
+            self.painter.draw(self._buffer, hands, mirrored=True)
+
+        self._key = key
+        return self._surface
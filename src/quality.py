@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from typing import Tuple
+
+# Accent rendering modes. There's deliberately no in-between mode that reuses an offscreen render of the
+# accents: blitting a full screen, colorkeyed layer costs more than drawing the sprites again.
+ACCENTS_FULL = "full"
+ACCENTS_OFF = "off"
+
+@dataclass(frozen=True)
+class QualityLevel:
+    name: str
+
+    # Whether the Pong background accents are drawn.
+    accent_mode: str
+
+    # The side length (px) region of interest crops are resized to before detection.
+    detection_size: int
+
+    # Full frames (used while searching for a hand) are downscaled to at most this width (px) before detection.
+    search_width: int
+
+    # The minimum time (ms) between detection passes. 0 analyzes every camera frame.
+    detection_interval_ms: int
+
+    # Whether the Setup camera preview is resized with smooth (rather than nearest neighbour) interpolation.
+    smooth_preview: bool
+
+    # The most effect particles (hit bursts and the ball's trail) alive at once. 0 turns effects off.
+    particle_budget: int
+
+class QualityGovernor:
+    """
+    Watches how long each frame takes to produce, and trades visual and tracking quality for speed when the
+    machine can't keep up with the frame budget. Quality is lowered one level at a time while frames run over
+    budget, and raised again once there's plenty of headroom. The two thresholds are far apart, and each change
+    has to be earned over many frames, so that the level doesn't oscillate.
+    """
+
+    LEVELS: Tuple[QualityLevel, ...] = (
+        QualityLevel("high", ACCENTS_FULL, 256, 1280, 0, True, 2048),
+        QualityLevel("medium", ACCENTS_FULL, 224, 960, 0, False, 1024),
+        QualityLevel("low", ACCENTS_OFF, 192, 640, 50, False, 256),
+        QualityLevel("minimum", ACCENTS_OFF, 160, 480, 100, False, 0),
+    )
+
+    # The frame time is smoothed with an exponential moving average with this weight per frame.
+    SMOOTHING = 0.05
+
+    # Quality is lowered when the smoothed frame time is above DOWNGRADE_RATIO of the budget for
+    # DOWNGRADE_AFTER_FRAMES frames in a row, and raised when it's below UPGRADE_RATIO for UPGRADE_AFTER_FRAMES.
+    DOWNGRADE_RATIO = 1.0
+    DOWNGRADE_AFTER_FRAMES = 30
+    UPGRADE_RATIO = 0.5
+    UPGRADE_AFTER_FRAMES = 300
+
+    # The time (ms) available to produce each frame.
+    frame_budget_ms: float
+
+    # Index into LEVELS of the current quality level.
+    level_index: int
+
+    # The smoothed frame time (ms), or `None` before the first frame.
+    average_frame_ms: float | None
+
+    def __init__(self, frame_budget_ms: float):
+        self.frame_budget_ms = frame_budget_ms
+        self.level_index = 0
+        self.average_frame_ms = None
+        self._frames_over = 0
+        self._frames_under = 0
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.LEVELS[self.level_index]
+
+    def record_frame(self, frame_ms: float) -> bool:
+        """
+        Records how long the latest frame took to produce (excluding any time spent waiting for vsync or a frame
+        rate cap), and returns whether the quality level changed as a result.
+        """
+        if self.average_frame_ms is None:
+            self.average_frame_ms = frame_ms
+        else:
+            self.average_frame_ms += self.SMOOTHING * (frame_ms - self.average_frame_ms)
+
+        if self.average_frame_ms > self.frame_budget_ms * self.DOWNGRADE_RATIO:
+            self._frames_over += 1
+            self._frames_under = 0
+        elif self.average_frame_ms < self.frame_budget_ms * self.UPGRADE_RATIO:
+            self._frames_under += 1
+            self._frames_over = 0
+        else:
+            self._frames_over = 0
+            self._frames_under = 0
+
+        if self._frames_over >= self.DOWNGRADE_AFTER_FRAMES and self.level_index < len(self.LEVELS) - 1:
+            return self.set_level(self.level_index + 1)
+        if self._frames_under >= self.UPGRADE_AFTER_FRAMES and self.level_index > 0:
+            return self.set_level(self.level_index - 1)
+        return False
+
+    def set_level(self, level_index: int) -> bool:
+        """Switches to the given quality level, and returns whether it was different from the current one."""
+        if level_index == self.level_index:
+            return False
+
+        average_frame_ms = self.average_frame_ms or 0
+        print(f"Quality: {self.level.name} -> {self.LEVELS[level_index].name} "
+              f"(average frame time {average_frame_ms:.1f}ms, budget {self.frame_budget_ms:.1f}ms)")
+        self.level_index = level_index
+        self._frames_over = 0
+        self._frames_under = 0
+        return True
@@ -0,0 +1,162 @@
+import threading
+from queue import SimpleQueue
+from typing import Callable
+import numpy as np
+from .landmarks import HandLandmarks, MAX_HANDS, LANDMARK_COUNT
+
+# Landmark recordings start with this header (padded with zeros to HEADER_SIZE bytes), followed by one
+# RECORD_DTYPE record per detection result. Records are fixed size, so a recording can be memory-mapped as an
+# array and indexed directly, and a recording that was cut off part way through a record is still readable.
+MAGIC = b"cz_pong landmarks v1\n"
+HEADER_SIZE = 32
+
+RECORD_DTYPE = np.dtype([
+    # When the frame the hands were detected in was captured (ms, on the tracking context's clock).
+    ("timestamp_ms", "<i8"),
+    ("hand_count", "u1"),
+    ("handedness", "i1", (MAX_HANDS,)),
+    ("scores", "<f4", (MAX_HANDS,)),
+    ("landmarks", "<f4", (MAX_HANDS, LANDMARK_COUNT, 3)),
+])
+
+def load_recording(path: str) -> np.ndarray:
+    """
+    Memory-maps the landmark recording at `path` as an array of RECORD_DTYPE records. Records are only read from
+    disk as they're used, so opening a long recording is instant.
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+        file.seek(0, 2)
+        size = file.tell()
+
+    if not header.startswith(MAGIC):
+        raise ValueError(f"{path} is not a landmark recording")
+
+    count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count == 0:
+        # Empty files can't be memory-mapped.
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+class LandmarkRecorder:
+    """
+    Records detection results to a landmark recording. `record` only packs the result into a record and queues it
+    - the file is written by a background thread, so recording doesn't slow down whoever produces the results
+    (normally the detector's callback thread, which the game loop never waits on anyway).
+    """
+
+    path: str
+
+    # The number of results recorded so far.
+    recorded: int
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recorded = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC.ljust(HEADER_SIZE, b"\0"))
+        self._record = np.zeros((), dtype=RECORD_DTYPE)
+        self._queue = SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="landmark-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, hands: HandLandmarks, timestamp_ms: int) -> None:
+        """Queues `hands` to be written. Results must be recorded from one thread at a time."""
+        record = self._record
+        count = hands.hand_count
+        record["timestamp_ms"] = timestamp_ms
+        record["hand_count"] = count
+        record["handedness"][:count] = hands.handedness[:count]
+        record["scores"][:count] = hands.scores[:count]
+        record["landmarks"][:count] = hands.landmarks[:count]
+        self._queue.put(record.tobytes())
+        self.recorded += 1
+
+    def close(self) -> None:
+        """Writes out every queued result and closes the file."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            self._file.write(data)
+        self._file.close()
+
+class LandmarkReplay:
+    """
+    Plays back a landmark recording in place of a camera and hand detector. The recording's timeline starts
+    at the first `play` call, and from then on, every result whose (shifted) timestamp has been reached is handed
+    to the callback, in order - so given the same sequence of `play` times, a replay always produces exactly
+    the same results at exactly the same times. With `loop` set, the recording starts over once it runs out.
+    """
+
+    path: str
+    records: np.ndarray
+    loop: bool
+
+    # The index of the next record to play.
+    position: int
+
+    def __init__(self, path: str, loop: bool = False):
+        self.path = path
+        self.records = load_recording(path)
+        self.loop = loop
+        self._hands = HandLandmarks()
+        self.reset()
+
+    def reset(self) -> None:
+        """Starts the replay over (its timeline restarts at the next `play` call)."""
+        self.position = 0
+        self._offset_ms = None
+
+    @property
+    def finished(self) -> bool:
+        return not self.loop and self.position >= len(self.records)
+
+    @property
+    def duration_ms(self) -> int:
+        """The time from the first result to the last."""
+        if len(self.records) == 0:
+            return 0
+        return int(self.records[-1]["timestamp_ms"] - self.records[0]["timestamp_ms"])
+
+    def play(self, now_ms: int, callback: Callable[[HandLandmarks, int], None]) -> int:
+        """
+        Hands every result that's due by `now_ms` to `callback`, along with its timestamp on the caller's clock
+        (like a detector's result callback). The `HandLandmarks` object is reused, so it's only valid for the
+        duration of the call. Returns the number of results played.
+        """
+        records = self.records
+        if len(records) == 0:
+            return 0
+
+        if self._offset_ms is None:
+            self._offset_ms = now_ms - int(records[0]["timestamp_ms"])
+
+        played = 0
+        hands = self._hands
+        while True:
+            if self.position >= len(records):
+                if not self.loop:
+                    break
+                # The next loop starts one average result interval after this one ends.
+                self._offset_ms += self.duration_ms + self.duration_ms // max(len(records) - 1, 1) + 1
+                self.position = 0
+
+            record = records[self.position]
+            timestamp_ms = int(record["timestamp_ms"]) + self._offset_ms
+            if timestamp_ms > now_ms:
+                break
+
+            count = int(record["hand_count"])
+            hands.hand_count = count
+            hands.handedness[:count] = record["handedness"][:count]
+            hands.scores[:count] = record["scores"][:count]
+            hands.landmarks[:count] = record["landmarks"][:count]
+            self.position += 1
+            played += 1
+            callback(hands, timestamp_ms)
+        return played
@@ -0,0 +1,87 @@
+from typing import NamedTuple
+import cv2
+import numpy as np
+from .landmarks import HandLandmarks
+
+class Crop(NamedTuple):
+    """A square region of a camera frame, in pixels."""
+    x: int
+    y: int
+    size: int
+    frame_width: int
+    frame_height: int
+
+class RegionOfInterest:
+    """
+    Once a hand has been found, it only covers a small part of the camera frame - so there's no need to run
+    detection on the whole thing. This crops frames to a square around the most recently detected landmarks and
+    shrinks the crop to a small fixed size before detection, then maps the results back to full-frame
+    coordinates. When tracking is lost, detection falls back to the full frame.
+    """
+
+    # How much larger than the landmarks' bounding box the crop is, to leave room for the hand to move.
+    EXPANSION = 2.0
+
+    # The smallest crop, as a fraction of the frame's shorter side. Very small crops lose too much context.
+    MIN_SIZE_FRACTION = 0.3
+
+    # The side length (px) crops are resized to before detection.
+    inference_size: int
+
+    # The region of the most recent detection, in full-frame normalized coordinates (left, top, right,
+    # bottom), or `None` if no hand is being tracked.
+    bounds: tuple | None
+
+    def __init__(self, inference_size: int = 256):
+        self.inference_size = inference_size
+        self.bounds = None
+
+    def crop(self, frame: np.ndarray, out: np.ndarray) -> Crop | None:
+        """
+        Resizes the square region of `frame` around the tracked hand into `out` (normally `inference_size` square),
+        and returns the `Crop` it was taken from. If no hand is being tracked, returns `None` and leaves `out`
+        untouched. The crop is always resized to fit `out`, even if `inference_size` has changed since `out` was
+        allocated (it can be changed from another thread).
+        """
+        bounds = self.bounds
+        if bounds is None:
+            return None
+
+        frame_height, frame_width = frame.shape[:2]
+        left, top, right, bottom = bounds
+        center_x = (left + right) / 2 * frame_width
+        center_y = (top + bottom) / 2 * frame_height
+
+        shorter_side = min(frame_width, frame_height)
+        size = max((right - left) * frame_width, (bottom - top) * frame_height) * self.EXPANSION
+        size = int(np.clip(size, self.MIN_SIZE_FRACTION * shorter_side, shorter_side))
+
+        # Shift the square back into the frame rather than shrinking it at the edges.
+        x = int(np.clip(center_x - size / 2, 0, frame_width - size))
+        y = int(np.clip(center_y - size / 2, 0, frame_height - size))
+
+        cv2.resize(frame[y:y + size, x:x + size], (out.shape[1], out.shape[0]), dst=out,
+                   interpolation=cv2.INTER_AREA)
+        return Crop(x, y, size, frame_width, frame_height)
+
+    def to_frame_coordinates(self, hands: HandLandmarks, crop: Crop) -> None:
+        """Converts the landmarks in `hands` (detected in `crop`) to full-frame normalized coordinates, in place."""
+        scale_x = crop.size / crop.frame_width
+        scale_y = crop.size / crop.frame_height
+
+        landmarks = hands.landmarks[:hands.hand_count]
+        # Landmark depth is on roughly the same scale as x.
+        landmarks *= (scale_x, scale_y, scale_x)
+        landmarks[:, :, 0] += crop.x / crop.frame_width
+        landmarks[:, :, 1] += crop.y / crop.frame_height
+
+    def update(self, hands: HandLandmarks) -> None:
+        """Re-centers the region on `hands` (which must be in full-frame coordinates)."""
+        if hands.hand_count == 0:
+            self.bounds = None
+            return
+
+        points = hands.landmarks[:hands.hand_count, :, :2]
+        left, top = points.min(axis=(0, 1))
+        right, bottom = points.max(axis=(0, 1))
+        self.bounds = (float(left), float(top), float(right), float(bottom))
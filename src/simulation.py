@@ -0,0 +1,305 @@
+from typing import List, NamedTuple
+import math
+import numpy as np
+from .ball import Ball, PADDLE
+from .ball_system import BallSystem
+
+# Events returned by `PongSimulation.step`.
+PADDLE_HIT = "paddle_hit"
+WALL_HIT = "wall_hit"
+# The first paddle hit of the game (reported along with its PADDLE_HIT).
+FIRST_HIT = "first_hit"
+# The ball has left the arena. This is only reported once, and the game stops there.
+GAME_OVER = "game_over"
+
+# Hit positions for a step without any hits.
+_NO_POSITIONS = np.zeros((0, 2))
+
+class Box(NamedTuple):
+    """An axis aligned rectangle with float coordinates (unlike pygame's `Rect`, which rounds to whole pixels)."""
+    left: float
+    top: float
+    right: float
+    bottom: float
+
+class PongSimulation:
+    """
+    The rules of the pong game - the ball, the paddle, the score and the ball's speed - without any rendering,
+    input or sound, so that it runs headless and as fast as it can be stepped. Sizes are in pixels (of an arena
+    of any size), and times are in milliseconds. Things the presentation cares about happening (like the ball
+    hitting the paddle) are returned from `step` as a list of events, rather than being acted on here.
+
+    Each step, call `step` and then `move_paddle` with the latest input - the same order as `Pong` does it, so
+    that the ball always collides with the paddle as it was drawn.
+    """
+
+    PADDLE_WIDTH = 20
+    PADDLE_HEIGHT = 100
+
+    BALL_RADIUS = 10
+    BALL_MIN_SPEED = 150
+    BALL_MAX_SPEED = 1000
+
+    # Where the ball starts, and the angle (radians) it sets off at.
+    BALL_START = (300, 200)
+    BALL_START_ANGLE = -math.pi * 0.8
+
+    # The number of hits used as a time constant in the speed vs hits exponential.
+    ACCELERATION_TIMESCALE = 10
+
+    # The game ends once the ball is this far past the right edge of the arena (as a fraction of its width). This
+    # margin is used to make the transition feel less shocking to the user - if the game ended the instant the ball
+    # passed the paddle, the user might not even see it go off screen!
+    GAME_OVER_MARGIN = 0.1
+
+    width: float
+    height: float
+
+    # The ball in play. Game modes with more than one ball keep their own balls instead (see `ball_positions`).
+    ball: Ball
+
+    # The top of the paddle, and where it was at the start of the most recent step (for render interpolation).
+    paddle_y: float
+    previous_paddle_y: float
+
+    score: int
+    over: bool
+
+    # Where the ball's center was at each paddle hit and each wall hit of the most recent step (one row each).
+    paddle_hit_positions: np.ndarray
+    wall_hit_positions: np.ndarray
+
+    def __init__(self, width: float, height: float):
+        self.width = width
+        self.height = height
+        self.reset()
+
+    def reset(self) -> None:
+        """Sets up a fresh game: the ball back at its starting point and speed, a centered paddle and no score."""
+        self.serve()
+        self.paddle_y = self.height / 2
+        self.previous_paddle_y = self.paddle_y
+        self.score = 0
+        self.over = False
+        self.paddle_hit_positions = self.wall_hit_positions = _NO_POSITIONS
+
+    def serve(self) -> None:
+        """Puts the ball at its starting point and speed."""
+        self.ball = Ball(*self.BALL_START, self.BALL_RADIUS, self.BALL_MIN_SPEED, self.BALL_START_ANGLE)
+
+    def resize(self, width: float, height: float) -> None:
+        self.width = width
+        self.height = height
+
+    @property
+    def arena(self) -> Box:
+        """The region the ball is confined to (it can leave through the right side)."""
+        return Box(0, 0, self.width, self.height)
+
+    def paddle(self, paddle_y: float | None = None) -> Box:
+        """The paddle's outline. By default, it is placed at the current `paddle_y`."""
+        top = self.paddle_y if paddle_y is None else paddle_y
+        return Box(self.width - self.PADDLE_WIDTH, top, self.width, top + self.PADDLE_HEIGHT)
+
+    def move_paddle(self, position: float) -> None:
+        """Moves the paddle to `position`, on [0, 1] from the top to the bottom of the arena."""
+        self.paddle_y = min(max(position, 0.0), 1.0) * (self.height - self.PADDLE_HEIGHT)
+
+    def step(self, delta_ms: float) -> List[str]:
+        """Advances the game by `delta_ms`, and returns the events that happened, in order."""
+        self.previous_paddle_y = self.paddle_y
+        self.paddle_hit_positions = self.wall_hit_positions = _NO_POSITIONS
+        if self.over:
+            return []
+
+        events = []
+        impacts = self.ball.update(delta_ms, self.arena, self.paddle())
+        if len(impacts) > 0:
+            self.paddle_hit_positions = np.array([(i.x, i.y) for i in impacts if i.target == PADDLE]).reshape(-1, 2)
+            self.wall_hit_positions = np.array([(i.x, i.y) for i in impacts if i.target != PADDLE]).reshape(-1, 2)
+
+        for impact in impacts:
+            if impact.target == PADDLE:
+                if self.score == 0:
+                    events.append(FIRST_HIT)
+                events.append(PADDLE_HIT)
+
+                self.score += 1
+                self.ball.speed = self.speed_for_score(self.score)
+            else:
+                events.append(WALL_HIT)
+
+        if self.ball.x > self.width * (1 + self.GAME_OVER_MARGIN):
+            self.over = True
+            events.append(GAME_OVER)
+        return events
+
+    def speed_for_score(self, score: int) -> float:
+        """The ball's speed once the player has hit it `score` times."""
+        speed_range = self.BALL_MAX_SPEED - self.BALL_MIN_SPEED
+        # This is an easing function that exponentially interpolates between the min and max speed.
+        # I made it just by tinkering around intuitively in desmos.
+        return self.BALL_MIN_SPEED + speed_range * (1 - math.exp(-score / self.ACCELERATION_TIMESCALE))
+
+    @property
+    def ball_speed(self) -> float:
+        return self.ball.speed
+
+    @property
+    def normalized_speed(self) -> float:
+        """The ball's speed on [0, 1], from its minimum to its maximum."""
+        return (self.ball_speed - self.BALL_MIN_SPEED) / (self.BALL_MAX_SPEED - self.BALL_MIN_SPEED)
+
+    def ball_positions(self, alpha: float = 1.0) -> np.ndarray:
+        """
+        The position of every ball in play (one row each), `alpha` of the way through the most recent step. This is
+        the same for every game mode, so that the presentation doesn't need to know how many balls there are.
+        """
+        return np.array([self.ball.interpolated_position(alpha)])
+
+class MultiBallSimulation(PongSimulation):
+    """
+    A game mode where the ball splits in two every few paddle hits, so the player ends up juggling many balls at
+    once. The game only ends once every ball has left the arena. The balls are a `BallSystem`, so that each step
+    moves all of them together rather than one at a time - and they all share one speed, which goes up with the
+    score like in the normal game.
+
+    Events from different balls in the same step aren't in time order (every paddle hit comes before every wall
+    hit).
+    """
+
+    # Every this many paddle hits, the ball that was just hit splits in two.
+    SPLIT_HITS = 5
+
+    # Balls stop splitting once there are this many in play.
+    MAX_BALLS = 64
+
+    balls: BallSystem
+
+    def serve(self) -> None:
+        self.balls = BallSystem()
+        self.balls.add(*self.BALL_START, self.BALL_RADIUS, self.BALL_MIN_SPEED, self.BALL_START_ANGLE)
+
+    def step(self, delta_ms: float) -> List[str]:
+        self.previous_paddle_y = self.paddle_y
+        self.paddle_hit_positions = self.wall_hit_positions = _NO_POSITIONS
+        if self.over:
+            return []
+
+        balls = self.balls
+        events = []
+        impacts = balls.update(delta_ms, self.arena, self.paddle())
+        self.paddle_hit_positions = impacts.paddle_positions
+        self.wall_hit_positions = impacts.wall_positions
+        for index in impacts.paddle:
+            if self.score == 0:
+                events.append(FIRST_HIT)
+            events.append(PADDLE_HIT)
+            self.score += 1
+
+            if self.score % self.SPLIT_HITS == 0 and len(balls) < self.MAX_BALLS:
+                # The new ball heads off mirrored vertically, so the two spread apart.
+                (x, y), (vx, vy) = balls.positions[index], balls.velocities[index]
+                balls.add(x, y, self.BALL_RADIUS, balls.speeds[index], math.atan2(-vy, vx))
+        events.extend(WALL_HIT for _ in impacts.wall)
+
+        if len(impacts.paddle) > 0:
+            balls.set_speeds(self.speed_for_score(self.score))
+
+        # Balls are only dropped once they're well past the paddle (see GAME_OVER_MARGIN).
+        balls.remove(balls.positions[:len(balls), 0] > self.width * (1 + self.GAME_OVER_MARGIN))
+        if len(balls) == 0:
+            self.over = True
+            events.append(GAME_OVER)
+        return events
+
+    @property
+    def ball_speed(self) -> float:
+        return self.speed_for_score(self.score)
+
+    def ball_positions(self, alpha: float = 1.0) -> np.ndarray:
+        return self.balls.interpolated_positions(alpha)
+
+class BatchedPongSimulation:
+    """
+    Many independent games of `PongSimulation`'s rules, stepped together - for bots, tuning and tests that need
+    far more games than can be played one at a time. Each game has one ball and its own paddle and score. The balls
+    are a `BallSystem` (ball `i` is game `i`'s), with one paddle per ball, so every game is stepped by the same
+    array operations. The arena is the same size for every game.
+
+    Like `PongSimulation`, call `step` and then `move_paddles` each step. Games that have ended stay in the batch,
+    with their ball stopped, so indices never change.
+    """
+
+    PADDLE_WIDTH = PongSimulation.PADDLE_WIDTH
+    PADDLE_HEIGHT = PongSimulation.PADDLE_HEIGHT
+    BALL_RADIUS = PongSimulation.BALL_RADIUS
+    BALL_MIN_SPEED = PongSimulation.BALL_MIN_SPEED
+    BALL_MAX_SPEED = PongSimulation.BALL_MAX_SPEED
+    BALL_START = PongSimulation.BALL_START
+    BALL_START_ANGLE = PongSimulation.BALL_START_ANGLE
+    ACCELERATION_TIMESCALE = PongSimulation.ACCELERATION_TIMESCALE
+    GAME_OVER_MARGIN = PongSimulation.GAME_OVER_MARGIN
+
+    width: float
+    height: float
+    balls: BallSystem
+
+    # One entry per game.
+    paddle_y: np.ndarray
+    scores: np.ndarray
+    over: np.ndarray
+
+    def __init__(self, count: int, width: float, height: float):
+        self.width = width
+        self.height = height
+        self.balls = BallSystem(count)
+        for _ in range(count):
+            self.balls.add(*self.BALL_START, self.BALL_RADIUS, self.BALL_MIN_SPEED, self.BALL_START_ANGLE)
+        self.paddle_y = np.full(count, height / 2)
+        self.scores = np.zeros(count, dtype=int)
+        self.over = np.zeros(count, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.balls)
+
+    @property
+    def arena(self) -> Box:
+        return Box(0, 0, self.width, self.height)
+
+    def paddles(self) -> Box:
+        """Every game's paddle, as a `Box` whose top and bottom are arrays (one entry per game)."""
+        return Box(self.width - self.PADDLE_WIDTH, self.paddle_y, self.width, self.paddle_y + self.PADDLE_HEIGHT)
+
+    def move_paddles(self, positions: np.ndarray) -> None:
+        """Moves each game's paddle to its entry of `positions`, on [0, 1] from the top to the bottom of the arena."""
+        self.paddle_y = np.clip(positions, 0.0, 1.0) * (self.height - self.PADDLE_HEIGHT)
+
+    def step(self, delta_ms: float) -> np.ndarray:
+        """
+        Advances every game that's still going by `delta_ms`. Returns the number of paddle hits in each game during
+        the step (one entry per game) - scores go up by the same amount.
+        """
+        balls = self.balls
+        n = len(balls)
+        impacts = balls.update(delta_ms, self.arena, self.paddles())
+        hits = np.bincount(impacts.paddle, minlength=n)
+        if len(impacts.paddle) > 0:
+            self.scores += hits
+            hit = hits > 0
+            speeds = self.speed_for_scores(self.scores[hit])
+            balls.velocities[:n][hit] *= (speeds / balls.speeds[:n][hit])[:, np.newaxis]
+            balls.speeds[:n][hit] = speeds
+
+        ended = ~self.over & (balls.positions[:n, 0] > self.width * (1 + self.GAME_OVER_MARGIN))
+        if ended.any():
+            self.over |= ended
+            # A stopped ball never hits anything, so ended games cost next to nothing to keep stepping.
+            balls.velocities[:n][ended] = 0.0
+            balls.speeds[:n][ended] = 0.0
+        return hits
+
+    def speed_for_scores(self, scores: np.ndarray) -> np.ndarray:
+        """`PongSimulation.speed_for_score` for every entry of `scores` at once."""
+        speed_range = self.BALL_MAX_SPEED - self.BALL_MIN_SPEED
+        return self.BALL_MIN_SPEED + speed_range * (1 - np.exp(-scores / self.ACCELERATION_TIMESCALE))
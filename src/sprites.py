@@ -0,0 +1,22 @@
+from typing import List
+import pygame
+from pygame import Surface
+
+# Drawn circles are keyed out of their sprites with this color, so it must never be a circle's color.
+COLORKEY = (255, 0, 255)
+
+def render_circle_sprites(max_radius: int, color: str) -> List[Surface]:
+    """
+    Renders a filled circle sprite for every integer radius from 0 to `max_radius`, indexed by radius, for drawing
+    lots of circles in a single `Surface.blits` call. Each sprite is 2r pixels square, so a circle centered at (x, y)
+    is blitted at (x - r, y - r). The background is a run-length encoded colorkey, which blits quickly.
+    """
+    sprites = []
+    for r in range(max_radius + 1):
+        sprite = Surface((max(2 * r, 1), max(2 * r, 1)))
+        sprite.fill(COLORKEY)
+        if r > 0:
+            pygame.draw.circle(sprite, color, (r, r), r)
+        sprite.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        sprites.append(sprite)
+    return sprites
@@ -1,21 +1,27 @@
-import hsluv
 import numpy as np
 import pygame
-from os import path
 from pygame import Surface
 from pygame.freetype import Font
 from pygame.event import Event
-from mediapipe.python.solutions.hands import HandLandmark
 from .state import State
 from ..events import FIRST_HIT, GAME_OVER
 from ..tracking_context import TrackingContext
-from ..ball import Ball
+from ..landmarks import WRIST, INDEX_FINGER_MCP, PINKY_MCP
+from ..simulation import PongSimulation, MultiBallSimulation, PADDLE_HIT, WALL_HIT, FIRST_HIT as SIMULATION_FIRST_HIT, \
+    GAME_OVER as SIMULATION_GAME_OVER
+from ..accents import AccentRenderer
+from ..particles import ParticleSystem
+from ..filters import PositionPredictor
+from ..quality import QualityGovernor, ACCENTS_OFF
+from ..assets import AssetManager
 
 class Pong(State):
-    # Note: All geometric units are listed in pixels.
+    """
+    Presents a `PongSimulation` (which holds the actual game rules): it feeds the player's hand position to the
+    paddle, and turns what happens in the game into graphics, sounds and game events.
+    """
 
-    PADDLE_WIDTH = 20
-    PADDLE_HEIGHT = 100
+    # Note: All geometric units are listed in pixels.
 
     # The spacing of background decoration elements (i.e. the black circles). This is only approximately followed,
     # tweaks are made to fit the screen with a perfect tiling.
@@ -27,20 +33,56 @@ class Pong(State):
     # The amount that the black circles wiggle around over time (this is a radius)
     BG_ACCENT_SWAY = 15
 
-    BALL_MIN_SPEED = 150
-    BALL_MAX_SPEED = 1000
-
-    # The number of hits used as a time constant in the speed vs hits exponential.
-    ACCELERATION_TIMESCALE = 10
-
     # How close text and decorations can come to the window border.
     BG_MARGIN = 30
+
+    # Smoothing and latency compensation for the paddle (see `PositionPredictor`). The cutoffs are in Hz, and
+    # beta is in Hz per (frame height / s) of hand speed. Raising the cutoffs or beta trades jitter for lag.
+    # These were tuned with `benchmarks/paddle_predictor.py`.
+    PADDLE_FILTER_MIN_CUTOFF = 1.0
+    PADDLE_FILTER_BETA = 30.0
+    PADDLE_FILTER_DERIVATIVE_CUTOFF = 2.0
+
+    # How far past the current time the hand position is predicted. The prediction always makes up for detection
+    # latency (up to the current time) - a horizon would also cover render and display latency, but nothing
+    # measures that, and by `benchmarks/paddle_predictor.py` every horizon past 0 adds rms error. With 60ms of
+    # detection latency, this setting has 18.4ms of lag vs. 76.4ms for raw detections, and an rms error of 0.0247
+    # vs. 0.0315. It's slightly jitterier (0.0060 vs. 0.0054) - no setting makes up for latency without that.
+    PADDLE_PREDICTION_HORIZON_MS = 0
+
+    # Paddle hits send a burst of particles back into the arena, and wall hits a smaller one in every direction.
+    # Speeds are in px/s and lifetimes in ms.
+    HIT_PARTICLES = 24
+    HIT_PARTICLE_SPEED = 600
+    HIT_PARTICLE_LIFETIME_MS = 500
+    HIT_PARTICLE_RADIUS = 6
+    BOUNCE_PARTICLES = 8
+    BOUNCE_PARTICLE_SPEED = 300
+    BOUNCE_PARTICLE_LIFETIME_MS = 300
+    BOUNCE_PARTICLE_RADIUS = 4
+
+    # Each step leaves a particle behind the ball, which shrinks away over this long (ms) - so the trail gets longer
+    # as the ball speeds up.
+    TRAIL_LIFETIME_MS = 120
+
+    # The trails may only fill this fraction of the particle budget. With lots of balls (or a small budget), they
+    # would otherwise take up every particle, and hit bursts would silently not appear.
+    TRAIL_BUDGET_FRACTION = 0.5
     
     tracking: TrackingContext
-    ball: Ball
-    paddle_y: float
+
+    # The ball(s), the paddle and the score.
+    simulation: PongSimulation
+
+    # Whether games are played with `MultiBallSimulation` (where the ball keeps splitting) instead.
+    multi_ball: bool
+
+    # Every ball looks the same, so they're all drawn by blitting this one pre-rendered circle.
+    ball_sprite: Surface
+
+    # Hit bursts and ball trails. The quality governor's particle budget caps how many there can be.
+    particles: ParticleSystem
     background_hue: float
-    score: int
 
     # This is a phase accumulator for some background animations. It increases monotonically with a derivative
     # equal to the ball's current speed (i.e. as gameplay quickens, decorations get faster too.)
@@ -52,59 +94,86 @@ class Pong(State):
     hit_sound: pygame.mixer.Sound
     bounce_sound: pygame.mixer.Sound
     font: Font
+    assets: AssetManager
+    accents: AccentRenderer
+
+    # Filters the palm position and extrapolates it from the time the camera frame was captured to now.
+    paddle_predictor: PositionPredictor
 
-    def __init__(self, root_dir: str, font: Font, tracking: TrackingContext):
+    # The sequence number of the last detection result fed to `paddle_predictor`.
+    last_hand_sequence: int
+    quality: QualityGovernor
+
+    def __init__(self, assets: AssetManager, font: Font, tracking: TrackingContext, quality: QualityGovernor,
+                 multi_ball: bool = False):
         self.tracking = tracking
-        self.ball = Ball(300, 200, 10, self.BALL_MIN_SPEED, -np.pi * 0.8, "white")
-        self.paddle_y = pygame.display.get_surface().get_height() / 2
-        self.score = 0
-        self.background_phase = 0
-        self.background_hue = 0
-        self.hit_sound = pygame.mixer.Sound(path.join(root_dir, 'assets/flap.wav'))
-        self.bounce_sound = pygame.mixer.Sound(path.join(root_dir, 'assets/knock.mp3'))
+        self.multi_ball = multi_ball
+        self.quality = quality
+        self.hit_sound = assets.sound('assets/flap.wav')
+        self.bounce_sound = assets.sound('assets/knock.mp3')
         self.bounce_sound.set_volume(0.8)
         self.font = font
+        self.assets = assets
+        self.accents = AccentRenderer(self.BG_ACCENT_PITCH, self.BG_ACCENT_RADIUS, self.BG_ACCENT_SWAY, self.BG_MARGIN)
+        self.paddle_predictor = PositionPredictor(
+            self.PADDLE_FILTER_MIN_CUTOFF,
+            self.PADDLE_FILTER_BETA,
+            self.PADDLE_PREDICTION_HORIZON_MS,
+            self.PADDLE_FILTER_DERIVATIVE_CUTOFF)
+        self.ball_sprite = self.create_ball_sprite(PongSimulation.BALL_RADIUS)
+        self.particles = ParticleSystem(max(level.particle_budget for level in QualityGovernor.LEVELS))
+        self.reset()
+
+    def reset(self):
+        """Sets up a fresh game: the ball back at its starting point and speed, a centered paddle and no score."""
+        simulation_type = MultiBallSimulation if self.multi_ball else PongSimulation
+        self.simulation = simulation_type(*pygame.display.get_surface().get_size())
+        self.background_phase = 0
+        self.background_hue = 0
+        self.paddle_predictor.reset()
+        self.last_hand_sequence = -1
+        self.particles.clear()
 
-    def draw(self, screen: Surface):
-        # The background luminosity starts as 0 and goes to 100 as the ball speed reaches its max:
-        normalized_ball_speed = (self.ball.speed - self.BALL_MIN_SPEED) / (self.BALL_MAX_SPEED - self.BALL_MIN_SPEED)
-        bg_luminosity = normalized_ball_speed * 80
+    def draw(self, screen: Surface, alpha: float = 1.0):
+        simulation = self.simulation
+
+        # The background luminosity starts as 0 and goes to 80 as the ball speed reaches its max:
+        bg_luminosity = simulation.normalized_speed * 80
 
         # And the hue just increases over time.
-        screen.fill(hsluv.hsluv_to_hex((self.background_hue, 100, bg_luminosity)))
+        screen.fill(self.assets.colors.lookup(self.background_hue, 100, bg_luminosity))
         
-        self.draw_background_accents(screen)
+        self.draw_background_accents(screen, alpha)
+        self.particles.draw(screen)
 
         # Render the score counter at the bottom right
-        text_surface, text_rect = self.font.render(f"{self.score} hits", "white")
+        text_surface, text_rect = self.assets.text_cache.render(self.font, f"{simulation.score} hits", "white")
         screen.blit(text_surface, (self.BG_MARGIN, screen.get_height() - self.BG_MARGIN - text_rect.height))
 
-        self.ball.draw(screen)
-        
+        # All the balls go in a single `blits` call, rather than a draw call (and its python overhead) each.
+        ball_positions = (simulation.ball_positions(alpha) - simulation.BALL_RADIUS).tolist()
+        screen.blits([(self.ball_sprite, position) for position in ball_positions], doreturn=False)
+
         # Draw the paddle
-        pygame.draw.rect(
-            screen,
-            "white",
-            self.paddle_rect())
+        paddle_y = simulation.previous_paddle_y + (simulation.paddle_y - simulation.previous_paddle_y) * alpha
+        left, top, right, bottom = simulation.paddle(paddle_y)
+        pygame.draw.rect(screen, "white", pygame.Rect(left, top, right - left, bottom - top))
 
-    def update(self, delta: int):
-        # Move the ball and react to wall hits and paddle hits:
-        hit_paddle, hit_walls = self.ball.update(delta, self.arena_rect(), self.paddle_rect())
+    def update(self, delta: float):
+        simulation = self.simulation
+        simulation.resize(*pygame.display.get_surface().get_size())
 
-        if hit_paddle:
-            # The first hit triggers the music to start playing for dramatic effect. :)
-            if self.score == 0:
-                pygame.event.post(Event(FIRST_HIT))
-            
-            self.score += 1
-            speed_range = self.BALL_MAX_SPEED - self.BALL_MIN_SPEED
-            # This is an easing function that exponentially interpolates between the min and max speed.
-            # I made it just by tinkering around intuitively in desmos.
-            self.ball.speed = self.BALL_MIN_SPEED + speed_range * (1 - np.exp(-self.score / self.ACCELERATION_TIMESCALE))
+        # Move the ball and react to wall hits and paddle hits:
+        events = simulation.step(delta)
+        if PADDLE_HIT in events:
             self.hit_sound.play()
-        
-        if hit_walls:
+        if WALL_HIT in events:
             self.bounce_sound.play()
+        # The first hit triggers the music to start playing for dramatic effect. :)
+        if SIMULATION_FIRST_HIT in events:
+            pygame.event.post(Event(FIRST_HIT))
+
+        self.update_particles(delta)
         
         # Steadily increase the hue:
         self.background_hue += delta / 100
@@ -112,112 +181,93 @@ class Pong(State):
 
         # Increase the background phase factor in proportion to the ball's step size (i.e. the decorations
         # move at a speed related to the ball's speed)
-        self.background_phase += (self.ball.speed / self.BALL_MAX_SPEED) * (delta / 1000)
+        self.background_phase += (simulation.ball_speed / simulation.BALL_MAX_SPEED) * (delta / 1000)
         self.background_phase %= 2 * np.pi
 
         self.track_paddle_to_hand()
-        
-        # If the ball is sufficiently far out of frame, end the game. This margin of 1.1x is used to make
-        # the transition feel less shocking to the user - if we did this the instant the ball passed the paddle,
-        # the user might not even see it go off screen!
-        if self.ball.x > pygame.display.get_surface().get_width() * 1.1:
+
+        if SIMULATION_GAME_OVER in events:
             pygame.event.post(Event(GAME_OVER))
 
     def handle_event(self, event: Event):
         pass
 
-    def draw_background_accents(self, screen: Surface) -> None:
-        # BG_ACCENT_PITCH is the target spacing between accents - but it rarely exactly divides
-        # the background area. Here, we a pitch that is as close as possible to BG_ACCENT_PITCH
-        # but that actually exactly divides the grid.
-        full_margin = 2 * (self.BG_MARGIN + self.BG_ACCENT_RADIUS)
-        w = screen.get_width() - full_margin
-        h = screen.get_height() - full_margin
-
-        x_count = w // self.BG_ACCENT_PITCH
-        # The spacing between rows is less than the spacing between columns by cos(30º) because
-        # we want to make a regular hexagonal (not a rectangular) grid
-        y_count = h // int(self.BG_ACCENT_PITCH * np.cos(np.pi / 6))
-
-        # This hexagonal tiling is only really well defined for grid sizes > 2x2. The default screen
-        # size should never be this small, but we'd rather the game get uglier than have a divide by
-        # zero error so we return early.
-        if x_count <= 1 or y_count <= 1:
+    def draw_background_accents(self, screen: Surface, alpha: float = 1.0) -> None:
+        accent_mode = self.quality.level.accent_mode
+        if accent_mode == ACCENTS_OFF:
             return
 
-        # If there are x_count circles spread over a width w (one circle on each boundary),
-        # then there are x_count - 1 *gaps* between the posts.
-        dx = w / (x_count - 1)
-        dy = h / (y_count - 1)
-
-        # The position of the top left circle.
-        x0 = self.BG_MARGIN + self.BG_ACCENT_RADIUS
-        y0 = x0
-
         # The decay constant used in the exponential falloff of the circle size modulation.
         # This was heuristally chosen to look good, there's no real reason this value is exactly
         # as it is.
-        decay = 10 * self.ball.radius
-
-        for i in range(x_count):
-            for j in range(y_count):
-                x = x0 + i * dx
-
-                # Stagger the odd rows:
-                if j % 2 == 0:
-                    x -= dx / 2
-
-                    # Staggered rows will fit one fewer dot in the permitted area.
-                    if i == 0:
-                        continue
-                
-                y = y0 + j * dy
-
-                argument = 10 * i + j + self.background_phase
-                x += self.BG_ACCENT_SWAY * np.cos(argument)
-                y += self.BG_ACCENT_SWAY * np.sin(argument)
-
-                # The radius changes with the distance to the ball to make the background "track"
-                # it.
-                ball_distance = np.hypot(x - self.ball.x, y - self.ball.y)
-                r = self.BG_ACCENT_RADIUS * (0.1 + np.exp(-ball_distance / decay))
-                pygame.draw.circle(screen, "black", (x, y), r)
+        decay = 10 * self.simulation.BALL_RADIUS
+
+        # With several balls in play, the decorations just follow the oldest one.
+        ball_positions = self.simulation.ball_positions(alpha)
+        if len(ball_positions) == 0:
+            return
+        ball_x, ball_y = ball_positions[0]
+        self.accents.draw(screen, self.background_phase, ball_x, ball_y, decay)
     
+    def update_particles(self, delta: float) -> None:
+        """Moves the effect particles along, and emits new ones for the latest step's hits and the ball's trail."""
+        particles = self.particles
+        particles.set_budget(self.quality.level.particle_budget)
+        particles.update(delta)
+
+        simulation = self.simulation
+        # The paddle is on the right, so its bursts head left.
+        particles.emit(simulation.paddle_hit_positions, self.HIT_PARTICLES, self.HIT_PARTICLE_SPEED,
+                       self.HIT_PARTICLE_LIFETIME_MS, self.HIT_PARTICLE_RADIUS, angle=np.pi, spread=np.pi / 3)
+        particles.emit(simulation.wall_hit_positions, self.BOUNCE_PARTICLES, self.BOUNCE_PARTICLE_SPEED,
+                       self.BOUNCE_PARTICLE_LIFETIME_MS, self.BOUNCE_PARTICLE_RADIUS)
+
+        # Trail particles are left where the ball was at the start of the step, so that they never poke out in
+        # front of the (interpolated) ball.
+        reserve = int(particles.budget * (1 - self.TRAIL_BUDGET_FRACTION))
+        particles.emit(simulation.ball_positions(0.0), 1, 0, self.TRAIL_LIFETIME_MS, simulation.BALL_RADIUS,
+                       variation=0, reserve=reserve)
+
+    @staticmethod
+    def create_ball_sprite(radius: int) -> Surface:
+        """
+        Renders a ball centered `radius` pixels from the sprite's top left corner. Blitting it there gives exactly the
+        same pixels as `pygame.draw.circle` would.
+        """
+        sprite = Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, "white", (radius, radius), radius)
+        return sprite.convert_alpha()
+
     def track_paddle_to_hand(self) -> None:
         """
-        Attempts to pin the paddle y position on the player's hand. If there is no hand tracking data, this has
-        no effect.
+        Attempts to pin the paddle y position on the player's hand. New detections are fed through
+        `paddle_predictor`, which smooths out landmark noise and predicts where the hand is now (rather than
+        where it was when the camera frame was captured). If there has never been any hand tracking data, this
+        has no effect.
         """
-        if self.tracking.detection_result and len(self.tracking.detection_result.handedness) > 0:
+        hands = self.tracking.hands
+        if hands.sequence != self.last_hand_sequence and hands.hand_count > 0:
             # Compute the y position of the center of the palm - roughly approximated by the
             # mean of the y position of the metacarpophalangeal joints of the pinky, index finger,
             # and the y position of the wrist:
             
-            landmarks = self.tracking.detection_result.hand_landmarks[0]
+            landmarks = hands.landmarks[0]
             y = 0
-            y += landmarks[HandLandmark.WRIST].y
-            y += landmarks[HandLandmark.PINKY_MCP].y
-            y += landmarks[HandLandmark.INDEX_FINGER_MCP].y
+            y += landmarks[WRIST, 1]
+            y += landmarks[PINKY_MCP, 1]
+            y += landmarks[INDEX_FINGER_MCP, 1]
             y /= 3
-            
-            # y is normalized on [0, 1] - but detection is poor in the margins of the screen.
-            # we clamp this to [0.2, 0.8] and then renormalize to ensure that the full control range
-            # is reachable in the reliably detectable region of the view.
-            y = np.clip(y, 0.2, 0.8)
-            y = (y - 0.2) / 0.6
-            self.paddle_y = y * (pygame.display.get_surface().get_height() - self.PADDLE_HEIGHT)
-
-    def paddle_rect(self) -> pygame.rect.Rect:
-        """Returns a rect representing the paddle on screen."""
-        return pygame.rect.Rect(
-            pygame.display.get_surface().get_width() - self.PADDLE_WIDTH,
-            self.paddle_y,
-            self.PADDLE_WIDTH,
-            self.PADDLE_HEIGHT)
-
-    def arena_rect(self) -> pygame.rect.Rect:
-        """
-        Returns the region of the screen where the ball is confined. Currently, this is the whole screen,
-        but I had considered using a smaller region.
-        """
-        return pygame.display.get_surface().get_rect()
+
+            self.paddle_predictor.observe(float(y), hands.timestamp_ms)
+        self.last_hand_sequence = hands.sequence
+
+        y = self.paddle_predictor.predict(self.tracking.now_ms())
+        if y is None:
+            return
+
+        # y is normalized on [0, 1] - but detection is poor in the margins of the screen.
+        # we clamp this to [0.2, 0.8] and then renormalize to ensure that the full control range
+        # is reachable in the reliably detectable region of the view.
+        y = np.clip(y, 0.2, 0.8)
+        y = (y - 0.2) / 0.6
+        self.simulation.move_paddle(float(y))
@@ -6,13 +6,14 @@ from pygame.surface import Surface
 from pygame.event import Event
 from pygame.font import Font
 import pygame_gui
-from cv2 import VideoCapture
 import numpy as np
-import hsluv
 from .state import State
-from ..camera import get_working_ports
+from ..camera import CameraRegistry
 from ..tracking_context import TrackingContext
 from ..events import START_PONG
+from ..quality import QualityGovernor
+from ..preview import CameraPreview
+from ..assets import AssetManager
 
 class Setup(State):
     CAMERA_LIST_REFRESH_PERIOD_MS = 10000
@@ -27,34 +28,70 @@ class Setup(State):
     GAP = 10
 
     # How long since the available cameras were polled. Note: this can exceed CAMERA_LIST_REFRESH_PERIOD_MS!
-    ms_since_cameras_scanned: int
+    ms_since_cameras_scanned: float
+
+    # Lists the working cameras. This outlives the setup screen, so that devices aren't re-probed every time
+    # the player gets back to it.
+    cameras: CameraRegistry
 
     # A list containing working camera ports that opencv can make a VideoCapture object from.
     camera_ports: List[int]
 
-    # A thread-safe queue used to send `camera_ports` from the polling thread to the ui thread.
+    # A thread-safe queue used to tell the ui thread that the camera list changed (it carries the new list of
+    # ports).
     camera_ports_queue: Queue
+
+    # Cameras are opened in the background (see `CameraRegistry.open`) and handed back through this queue, as
+    # (request number, VideoCapture) pairs. Only the most recent request is used.
+    opened_camera_queue: Queue
+    camera_request: int
     ui_manager: pygame_gui.UIManager
     camera_dropdown: pygame_gui.elements.UIDropDownMenu
     tracking: TrackingContext
 
     # If a hand is in view, how long it's been uninterruptedly shown. Otherwise 0.
-    hand_visibility_duration_ms: int
+    hand_visibility_duration_ms: float
 
     font: Font
+    assets: AssetManager
+    quality: QualityGovernor
+
+    # Renders the mirrored, annotated camera feed at the size it's shown.
+    preview: CameraPreview
 
-    def __init__(self, font: Font, tracking: TrackingContext):
+    # The name of the input chosen up front (i.e. a video file or a recording), or `None` to let the player pick a
+    # camera. With a fixed input, cameras aren't scanned for, and the dropdown only lists the input.
+    input_name: str | None
+
+    def __init__(self, assets: AssetManager, font: Font, tracking: TrackingContext, quality: QualityGovernor,
+                 cameras: CameraRegistry, input_name: str | None = None):
         # Set to cause a refresh in the first frame for less code duplication
         self.ms_since_cameras_scanned = self.CAMERA_LIST_REFRESH_PERIOD_MS - 1
-        self.camera_ports = []
+        self.cameras = cameras
+        self.camera_ports = cameras.ports
         self.camera_ports_queue = Queue()
+        self.opened_camera_queue = Queue()
+        self.camera_request = 0
         self.ui_manager = pygame_gui.UIManager(pygame.display.get_window_size())
-        self.camera_dropdown = Setup.make_camera_dropdown([], None, self.ui_manager)
+        self.input_name = input_name
+        if input_name is None:
+            self.camera_dropdown = Setup.make_camera_dropdown(self.camera_ports, cameras.active_port, self.ui_manager)
+        else:
+            self.camera_dropdown = pygame_gui.elements.UIDropDownMenu(
+                [input_name], input_name, pygame.Rect((50, 50), (250, 50)), self.ui_manager)
+            self.camera_dropdown.disable()
         self.tracking = tracking
         self.hand_visibility_duration_ms = 0
         self.font = font
+        self.assets = assets
+        self.quality = quality
+        self.preview = CameraPreview()
 
-    def draw(self, screen: Surface):
+    def reset(self):
+        """Gets ready for the player to start another game. The camera list and selection carry over."""
+        self.hand_visibility_duration_ms = 0
+
+    def draw(self, screen: Surface, alpha: float = 1.0):
         # The brightness of the setup screen "breathes" over time. It also becomes more saturated
         # and brighter while the user's hands are in frame, eventually turning white before the game
         # starts.
@@ -65,7 +102,7 @@ class Setup(State):
         saturation = 10 + 150 * start_proximity
         luminosity = 10 + 10 * np.sin(time_s / 2) ** 8 + start_proximity * 80
 
-        screen.fill(hsluv.hsluv_to_hex((hue, np.clip(saturation, 0, 100), luminosity)))
+        screen.fill(self.assets.colors.lookup(hue, saturation, luminosity))
 
         # Renders the text and dropdown menu to the screen.
         # This layout code is a bit messy, but our UI needs are so simple that this is an easier approach
@@ -73,24 +110,29 @@ class Setup(State):
         # used to automate relative positioning.
         x = self.MARGIN
         y = self.MARGIN
-        text_surface, text_rect = self.font.render("Select a Camera", "white")
+        text_cache = self.assets.text_cache
+        text_surface, text_rect = text_cache.render(self.font, "Select a Camera", "white")
         screen.blit(text_surface, (x, y))
 
         y += self.GAP + text_rect.height
-        text_surface, text_rect = self.font.render("(this list refreshes automatically)", "white")
-        text_surface = pygame.transform.smoothscale_by(text_surface, 0.75)
+        text_surface, text_rect = text_cache.render(self.font, "(this list refreshes automatically)", "white", 0.75)
         screen.blit(text_surface, (x, y))
 
         y += 4 * self.GAP
         self.camera_dropdown.set_position((x, y))
 
-        if self.hand_visibility_duration_ms > 0:
+        if self.tracking.detector_loading:
+            # The hand detector loads in the background - a little animated ellipsis shows that it's working.
+            start_message = "Loading hand tracking" + "." * (int(time_s * 3) % 4)
+        elif self.tracking.detector_error is not None:
+            start_message = "Hand tracking failed to load - see the console for details."
+        elif self.hand_visibility_duration_ms > 0:
             time_left = (self.START_WAIT_PERIOD_MS - self.hand_visibility_duration_ms) / 1000
             start_message = f"Hold for {time_left:.1f} seconds!"
         else:
             start_message = "Hold your hand in frame to start the game."
         
-        text_surface, text_rect = self.font.render(start_message, "white")
+        text_surface, text_rect = text_cache.render(self.font, start_message, "white")
         screen.blit(text_surface, (x, screen.get_height() - self.MARGIN - text_rect.height))
 
         # Draw the camera preview in the remaining unused space on the screen.
@@ -100,10 +142,9 @@ class Setup(State):
         self.ui_manager.draw_ui(screen)
 
     def draw_camera_preview(self, screen, min_x: int) -> None:
-        frame = self.tracking.get_annotated_frame()
+        frame = self.tracking.frame
         if frame is not None:
-            frame = pygame.image.frombuffer(frame.tobytes(), frame.shape[1::-1], "BGR")
-            frame_width, frame_height = frame.get_size()
+            frame_height, frame_width = frame.shape[:2]
             aspect_ratio = frame_width / frame_height
 
             # Calculate available space considering minimum x and margin
@@ -118,23 +159,31 @@ class Setup(State):
                 new_width = available_height * aspect_ratio
                 new_height = available_height
 
-            # Scale the frame to the new dimensions
-            frame = pygame.transform.scale(frame, (int(new_width), int(new_height)))
-
-            # The frame by default looks like how a viewer would see you - not how you would look
-            # in a mirror. We flip the image so that your right hand is on the right side of the
-            # preview.
-            frame = pygame.transform.flip(frame, True, False)
+            # Scale the frame to the new dimensions. The frame by default looks like how a viewer would see
+            # you - not how you would look in a mirror - so the preview also flips the image so that your right
+            # hand is on the right side.
+            preview = self.preview.render(
+                frame,
+                self.tracking.frame_sequence,
+                self.tracking.hands,
+                (int(new_width), int(new_height)),
+                self.quality.level.smooth_preview)
 
             # Calculate y position to vertically center the image
             y_position = (screen.get_height() - new_height) // 2
 
-            screen.blit(frame, (min_x + self.MARGIN, int(y_position)))
+            screen.blit(preview, (min_x + self.MARGIN, int(y_position)))
 
     
-    def update(self, delta: int):
-        self.update_camera_list(delta)
-        self.sync_ui_to_camera_list()
+    def update(self, delta: float):
+        # The setup screen has no game rules to simulate - everything happens once per frame, in `frame_update`.
+        pass
+
+    def frame_update(self, delta: float):
+        if self.input_name is None:
+            self.update_camera_list(delta)
+            self.sync_ui_to_camera_list()
+            self.sync_opened_camera()
 
         # If the user's hands have been in frame for long enough, transition from setup to
         # the main game:
@@ -144,16 +193,30 @@ class Setup(State):
             self.hand_visibility_duration_ms = 0
         
         if self.hand_visibility_duration_ms > self.START_WAIT_PERIOD_MS:
-            pygame.event.post(pygame.event.Event(START_PONG))
+            pygame.event.post(pygame.event.Event(START_PONG, handedness=self.chosen_handedness()))
 
         self.ui_manager.update(delta / 1000)
     
+    def chosen_handedness(self) -> int | None:
+        """
+        The handedness of the hand the player is starting the game with, which the game then tracks exclusively.
+        If several hands are in view, it's the one most confidently classified. `None` if no hand is in view.
+        """
+        hands = self.tracking.hands
+        if hands.hand_count == 0:
+            return None
+        return int(hands.handedness[np.argmax(hands.scores[:hands.hand_count])])
+
     def camera_scan_thread(self):
-        """Work done to scan for cameras in the background thread. Blocking and slow."""
-        working_ports = get_working_ports()
-        self.camera_ports_queue.put(working_ports) # Communicate the results back
+        """
+        Work done to scan for cameras in the background thread. This can block while newly plugged in cameras
+        are probed.
+        """
+        added, removed = self.cameras.scan()
+        # Always communicate back, so that the scan timer restarts - but only with a list if it changed.
+        self.camera_ports_queue.put(self.cameras.ports if len(added) > 0 or len(removed) > 0 else None)
 
-    def update_camera_list(self, delta: int):
+    def update_camera_list(self, delta: float):
         """
         Track the time since the available camera ports were last enumerated and dispatch a background
         task to update the list if needed.
@@ -176,8 +239,13 @@ class Setup(State):
     def sync_ui_to_camera_list(self):
         # Update camera_ports if the background thread has finished scanning
         if not self.camera_ports_queue.empty():
-            self.camera_ports = self.camera_ports_queue.get()
+            camera_ports = self.camera_ports_queue.get()
             self.ms_since_cameras_scanned = 0  # Reset the scanning timer here
+
+            # Rebuilding the dropdown is disruptive, so it's only done when the set of cameras changed.
+            if camera_ports is None:
+                return
+            self.camera_ports = camera_ports
             
             old_selection = self.get_selected_port()
 
@@ -214,13 +282,30 @@ class Setup(State):
     
     def set_camera(self, port: int | None):
         """
-        Creates a VideoCapture object and configures the TrackingContext to use it, if the port exists.
-        If the port is not provided, nothing happens.
+        Starts opening the camera at `port` in the background, and configures the TrackingContext to use it once
+        it's ready. If the port is not provided, the TrackingContext's camera is removed.
         """
+        self.cameras.active_port = port
+        self.camera_request += 1
         if port is not None:
-            self.tracking.camera = VideoCapture(port)
+            thread = threading.Thread(target=self.camera_open_thread, args=(port, self.camera_request))
+            thread.daemon = True
+            thread.start()
         else:
             self.tracking.camera = None
+
+    def camera_open_thread(self, port: int, request: int):
+        """Opens a camera in the background thread. Slow the first time a camera is used (see `CameraRegistry`)."""
+        self.opened_camera_queue.put((request, self.cameras.open(port)))
+
+    def sync_opened_camera(self):
+        while not self.opened_camera_queue.empty():
+            request, camera = self.opened_camera_queue.get()
+            # A different camera may have been chosen while this one was opening.
+            if request == self.camera_request:
+                self.tracking.camera = camera
+            else:
+                camera.release()
     
     def get_selected_port(self) -> int | None:
         """Returns the integer value of the camera port selected in the dropdown. If there is no selection, returns None."""
@@ -4,13 +4,33 @@ from pygame.event import Event
 
 class State(ABC):
     @abstractmethod
-    def draw(self, screen: Surface):
+    def draw(self, screen: Surface, alpha: float = 1.0):
+        """
+        Renders the state. The game simulates in fixed steps, so a frame usually falls between two updates -
+        `alpha` is how far (on [0, 1]) the frame is from the previous update to the latest one, and can be used
+        to interpolate moving objects.
+        """
         pass
 
     @abstractmethod
-    def update(self, delta: int):
+    def update(self, delta: float):
+        """Advances the state by one fixed simulation step of `delta` milliseconds."""
+        pass
+
+    def frame_update(self, delta: float):
+        """
+        Called once per rendered frame, before that frame's simulation steps, with the time (ms) since the previous
+        frame. This is for work that isn't part of the game rules and shouldn't run on every step, like the UI.
+        """
         pass
 
     @abstractmethod
     def handle_event(self, event: Event):
+        pass
+
+    def reset(self):
+        """
+        Returns the state to how it was when it was created. States are reused rather than rebuilt each time
+        they're entered, so that switching between them doesn't reload anything.
+        """
         pass
\ No newline at end of file
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from typing import Hashable, Tuple
+import pygame
+from pygame import Rect, Surface
+from pygame.freetype import Font
+
+class TextCache:
+    """
+    Remembers rendered text, so that HUD strings which rarely change aren't rasterized (and scaled) every frame.
+    Surfaces are kept in a bounded LRU cache keyed by (font, text, color, scale), and are shared - so don't draw
+    on them.
+
+    Counters (like the score) go through the same cache: each value is rendered once when it first appears, and
+    old values fall out of the cache as they stop being shown. Building them out of cached per-character
+    surfaces was tried, but pygame.freetype already caches glyphs internally, and compositing them in Python was
+    several times slower than rendering the new string.
+    """
+
+    capacity: int
+
+    # How many lookups were (and weren't) already cached.
+    hits: int
+    misses: int
+
+    def __init__(self, capacity: int = 128):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[Surface, Rect]] = OrderedDict()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def render(self, font: Font, text: str, color, scale: float = 1.0) -> Tuple[Surface, Rect]:
+        """
+        Like `font.render(text, color)`, but cached. A `scale` other than 1 smoothly scales the result (and its
+        rect) once, rather than every frame.
+        """
+        key = (font, text, pygame.Color(color).normalize(), scale)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        surface, rect = font.render(text, color)
+        if scale != 1.0:
+            surface = pygame.transform.smoothscale_by(surface, scale)
+            rect = Rect(round(rect.x * scale), round(rect.y * scale), *surface.get_size())
+
+        self._entries[key] = (surface, rect)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return surface, rect
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def describe(self) -> str:
+        return f"text cache: {self.hit_rate:.1%} hits, {len(self)}/{self.capacity} full"
@@ -1,109 +1,510 @@
-from mediapipe.tasks.python.vision import HandLandmarker, HandLandmarkerResult
 from cv2 import VideoCapture
-from os import path
-from typing import Callable
-import mediapipe as mp
-from mediapipe.tasks.python import BaseOptions
-from mediapipe.tasks.python.vision import HandLandmarker, HandLandmarkerResult, HandLandmarkerOptions, RunningMode
 from pygame import time
 import numpy as np
-from mediapipe import solutions
-from mediapipe.framework.formats import landmark_pb2
+from .buffers import BufferPool
+from .capture import CaptureThread
+from .detectors import HandDetector, IN_PROCESS, create_hand_detector
+from .landmarks import HandLandmarks, LandmarkBuffer, MAX_HANDS
+from .preview import SkeletonPainter
+from .roi import Crop, RegionOfInterest
+from .motion_gate import MotionGate
+from .instrumentation import RingHistogram
+from .recording import LandmarkRecorder, LandmarkReplay
+from collections import deque
+from typing import Callable
+import threading
+import cv2
 
 class TrackingContext:
     """
     Wraps a video input and hand detector with an easy to use API that automatically collects,
     analyzes, and caches images and hand landmarks. This helps avoid redundant hand detection passes
     in various places throughout the game.
+
+    With `threaded_capture` enabled, the camera is owned by a background `CaptureThread` that reads frames
+    and submits them for detection on its own, so `update` never waits on the webcam. `detector_backend`
+    chooses whether detection runs in this process or in a worker process (see `detectors.py`) - either
+    way, results are exposed identically, as a `HandLandmarks` snapshot (see `landmarks.py`). With `roi_mode`
+    enabled, detection only runs on a small crop around the last known hand position (see `roi.py`). With
+    `motion_gating` enabled, frames that barely differ from the last analyzed one aren't analyzed at all - the
+    previous result is kept instead (see `motion_gate.py`).
+
+    Loading the detector (and mediapipe itself) takes a couple of seconds, so it happens on a background
+    thread. Until `detector_ready`, frames are still captured but not analyzed.
+
+    Camera frames are converted to RGB once, as they're captured, and every frame and detection input comes
+    from `frame_pool` - so once it's warmed up, capture doesn't allocate any arrays.
+
+    During a game, `lock_hand` locks tracking onto the player's hand: other hands are dropped from the results,
+    and the detector only looks for a single hand, which is much cheaper. If the locked hand goes missing, the
+    detector goes back to looking for every hand until it's found again.
+
+    The camera can be anything that reads like a `VideoCapture` - including the recorded videos and image
+    sequences in `input_sources.py`. Results can also come from a `replay` of a landmark recording instead of a
+    detector (pass `detector_backend=None` to not load one at all), and `start_recording` records every result
+    while tracking runs (see `recording.py`). Everything is timestamped with `clock`, so that a replay driven by a
+    simulated clock plays out identically every time.
     """
 
-    camera: VideoCapture | None
-    hand_landmarker: HandLandmarker
+    # Frames whose detection results never arrive (i.e. because the detector was busy and skipped them) are
+    # normally cleaned up by the next result. This caps how many can pile up if results stop arriving entirely.
+    MAX_PENDING_FRAMES = 8
+
+    _camera: VideoCapture | None
+
+    # `None` until the detector has loaded (or if it failed to load - see `detector_error`).
+    detector: HandDetector | None
+    detector_error: str | None
+
+    # The newest camera frame, in RGB.
     frame: np.ndarray | None
-    detection_result: HandLandmarkerResult | None
+
+    # Changes whenever `frame` does, so that consumers can skip work on a frame they've already processed.
+    frame_sequence: int
+
+    # Detection results, double buffered between the detector's callback thread and the game loop.
+    landmark_buffer: LandmarkBuffer
     detection_result_last_seen_ms: int | None
+    threaded_capture: bool
+    capture_thread: CaptureThread | None
+    roi: RegionOfInterest | None
+    motion_gate: MotionGate | None
 
-    def __init__(self, root_dir: str, camera: VideoCapture | None = None):
-        self.camera = camera
-        self.hand_landmarker = TrackingContext.create_hand_detector(root_dir, self.hand_landmarker_callback)
+    frame_pool: BufferPool
+
+    # Frames that are still being analyzed, in submission order, as (timestamp_ms, crop, buffer) tuples. `crop` is
+    # the region of interest the detector was given (or `None`), and `buffer` is the detector's input, which is
+    # returned to `frame_pool` once the detector is done with it. Only frames the detector accepted are kept.
+    pending_frames: deque
+
+    # The newest frame dropped from `pending_frames` before its result arrived (by MAX_PENDING_FRAMES or a camera
+    # switch). A result for it, or an earlier frame, can't be mapped back to the frame it came from.
+    abandoned_timestamp_ms: int | None
+
+    # Frames analyzed in full are downscaled to at most this width (px) first. `None` leaves them full size.
+    search_width: int | None
+
+    # The minimum time between detection passes (ms). Frames that arrive sooner aren't analyzed.
+    detection_interval_ms: int
+    last_detection_timestamp_ms: int | None
+
+    # The time (ms) from each frame's capture to its detection result arriving.
+    result_latency: RingHistogram
+
+    # While a hand is locked, hands whose handedness is classified with less confidence than this are dropped.
+    LOCK_MIN_SCORE = 0.6
+
+    # The detector goes back to looking for every hand once the locked hand is missing from this many results in
+    # a row...
+    LOCK_LOST_RESULTS = 3
+
+    # ...and back to looking for one hand once the locked hand is the only one found in this many results in a
+    # row. Otherwise, single-hand detection could latch onto the other hand.
+    LOCK_FOUND_RESULTS = 5
+
+    # The handedness (an index into HANDEDNESS_NAMES) of the hand tracking is locked onto, or `None`.
+    locked_handedness: int | None
+
+    # Returns the current time (ms). Frames, results and `hand_seen_within` all use this clock.
+    clock: Callable[[], int]
+
+    # Plays recorded results (as if they came from the detector) each `update`, if set.
+    replay: LandmarkReplay | None
+
+    # Records every published result, if set (see `start_recording`).
+    recorder: LandmarkRecorder | None
+
+    # Whether the detector is only looking for the locked hand, rather than for every hand.
+    single_hand_mode: bool
+
+    def __init__(self, root_dir: str, camera: VideoCapture | None = None, threaded_capture: bool = False,
+                 detector_backend: str | None = IN_PROCESS, roi_mode: bool = False, motion_gating: bool = False,
+                 clock: Callable[[], int] = time.get_ticks):
+        self.clock = clock
+        self.replay = None
+        self.recorder = None
+        self.detector = None
+        self.detector_error = None
+        self._detector_loaded = threading.Event()
+        self._detector_lock = threading.Lock()
+        self._closed = False
+        if detector_backend is not None:
+            threading.Thread(
+                target=self.load_detector,
+                args=(root_dir, detector_backend),
+                name="hand-detector-loader",
+                daemon=True).start()
+        else:
+            self._detector_loaded.set()
+        self.roi = RegionOfInterest() if roi_mode else None
+        self.motion_gate = MotionGate() if motion_gating else None
+        self.frame_pool = BufferPool()
+        self.pending_frames = deque()
+        self.abandoned_timestamp_ms = None
+        self._pending_lock = threading.Lock()
+        self.search_width = None
+        self.detection_interval_ms = 0
+        self.last_detection_timestamp_ms = None
+        self.result_latency = RingHistogram()
+        self.locked_handedness = None
+        self.single_hand_mode = False
+        self._lock_streak = 0
+        self._last_result_timestamp_ms = None
+        self._result_lock = threading.Lock()
         self.frame = None
-        self.detection_result = None
+        self.frame_sequence = 0
+        self._captured_frames_seen = -1
+        self._capture_buffer = None
+        self.landmark_buffer = LandmarkBuffer()
         self.detection_result_last_seen_ms = None
+
+        # Reused by `get_annotated_frame`.
+        self._annotated_frame = None
+        self._skeleton_painter = SkeletonPainter()
+
+        self.threaded_capture = threaded_capture
+        self.capture_thread = None
+        self._camera = None
+        self.camera = camera
+
+    @property
+    def camera(self) -> VideoCapture | None:
+        return self._camera
+
+    @camera.setter
+    def camera(self, camera: VideoCapture | None) -> None:
+        """
+        Switches to a new video input. The previous camera is released (by its capture thread, if any, once
+        it has finished with it).
+        """
+        # In threaded mode, the frame belongs to the capture thread - otherwise, it's ours to give back.
+        if self.capture_thread is None:
+            self.frame_pool.release(self.frame)
+        release_camera = self._camera is not None and self._camera is not camera
+        if self.capture_thread is not None:
+            self.stop_capture_thread(release_camera)
+        elif release_camera:
+            self._camera.release()
+
+        self._camera = camera
+        self.frame = None
+        self.frame_sequence += 1
+        self._captured_frames_seen = -1
+        self.landmark_buffer.clear()
+        self.release_pending_frames()
+        if self.roi is not None:
+            self.roi.bounds = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+        if self.threaded_capture and camera is not None and camera.isOpened():
+            self.capture_thread = CaptureThread(camera, self.submit_frame, self.frame_pool, self.clock)
+            self.capture_thread.start()
+
+    @property
+    def hands(self) -> HandLandmarks:
+        """
+        The most recent detection result. This is a shared snapshot that gets reused, so only read it from the game
+        loop's thread, and read what you need from it before asking for `hands` again.
+        """
+        return self.landmark_buffer.latest
+
+    @property
+    def dropped_frames(self) -> int:
+        """The number of camera frames the capture thread read but the game loop never displayed."""
+        return self.capture_thread.dropped_frames if self.capture_thread is not None else 0
+
+    def now_ms(self) -> int:
+        return self.clock()
+
+    def start_recording(self, path: str) -> None:
+        """Starts recording every detection result to a landmark recording at `path` (replacing any recording)."""
+        recorder = LandmarkRecorder(path)
+        with self._result_lock:
+            previous, self.recorder = self.recorder, recorder
+        if previous is not None:
+            previous.close()
+
+    def stop_recording(self) -> None:
+        with self._result_lock:
+            recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+            print(f"Recorded {recorder.recorded} hand tracking results to {recorder.path}")
+
+    def stop_capture_thread(self, release_camera: bool = False) -> None:
+        """Stops the capture thread, if there is one. With `release_camera`, the thread releases its camera too."""
+        if self.capture_thread is not None:
+            self.capture_thread.stop(release_camera=release_camera)
+            self.capture_thread = None
+
+    def load_detector(self, root_dir: str, backend: str) -> None:
+        """Creates the hand detector. This runs on a background thread, started by the constructor."""
+        try:
+            detector = create_hand_detector(root_dir, backend, self.hand_landmarker_callback)
+        except Exception as error:
+            print(f"Couldn't load the hand detector: {error}")
+            self.detector_error = str(error)
+            self._detector_loaded.set()
+            return
+
+        with self._detector_lock:
+            if self._closed:
+                detector.close()
+            else:
+                with self._result_lock:
+                    detector.max_hands = 1 if self.single_hand_mode else MAX_HANDS
+                self.detector = detector
+        self._detector_loaded.set()
+
+    @property
+    def detector_ready(self) -> bool:
+        return self.detector is not None
+
+    @property
+    def detector_loading(self) -> bool:
+        return not self._detector_loaded.is_set()
+
+    def wait_for_detector(self, timeout_s: float | None = None) -> bool:
+        """Blocks until the detector has finished loading (or failed to), and returns whether it's ready."""
+        self._detector_loaded.wait(timeout_s)
+        return self.detector_ready
+
+    def close(self) -> None:
+        """
+        Stops background capture, releases the camera, and shuts down the hand detector. Call this once when
+        the game exits.
+        """
+        self.camera = None
+        with self._detector_lock:
+            self._closed = True
+            if self.detector is not None:
+                self.detector.close()
+        self.stop_recording()
     
-    def hand_landmarker_callback(self, result: HandLandmarkerResult, output_image: mp.Image, timestamp_ms: int) -> None:
+    def hand_landmarker_callback(self, hands: HandLandmarks, timestamp_ms: int) -> None:
         """
-        The callback that recieves hand landmarker results from mediapipe's `HandLandmarker.detect_async`. Caches the detection
-        result for later use.
+        The callback that recieves hand landmarks from the detector's `detect_async`. Publishes the detection
+        result for the game loop to use.
         """
-        self.detection_result = result
+        self.result_latency.record(self.clock() - timestamp_ms)
+
+        with self._result_lock:
+            # Results from before a switch between single and multi-hand detection can arrive late.
+            if self._last_result_timestamp_ms is not None and timestamp_ms <= self._last_result_timestamp_ms:
+                return
+            self._last_result_timestamp_ms = timestamp_ms
+
+            pending, crop = self.pop_pending_frame(timestamp_ms)
+            if not pending and self.abandoned_timestamp_ms is not None and timestamp_ms <= self.abandoned_timestamp_ms:
+                # Its frame was given up on, so there's no telling whether the landmarks are in crop or frame
+                # coordinates (or even which camera they're from). Publishing them would make the paddle jump.
+                return
+
+            # `hands` belongs to the detector and is only handed to us for this call, so it's safe to edit in place.
+            if self.locked_handedness is not None:
+                found_count = hands.hand_count
+                hands.keep_handedness(self.locked_handedness, self.LOCK_MIN_SCORE)
+                self.update_hand_lock(hands.hand_count > 0, found_count == hands.hand_count)
+
+            if self.roi is not None:
+                if crop is not None:
+                    self.roi.to_frame_coordinates(hands, crop)
+                self.roi.update(hands)
 
-        if len(result.handedness) > 0:
-            self.detection_result_last_seen_ms = timestamp_ms
+            self.landmark_buffer.publish(hands, timestamp_ms)
+            if self.recorder is not None:
+                self.recorder.record(hands, timestamp_ms)
+
+            if hands.hand_count > 0:
+                self.detection_result_last_seen_ms = timestamp_ms
+
+    def lock_hand(self, handedness: int | None) -> None:
+        """
+        Locks tracking onto the hand with the given `handedness` (an index into HANDEDNESS_NAMES), or unlocks it
+        if `None`.
+        """
+        with self._result_lock:
+            self.locked_handedness = handedness
+            self.set_single_hand_mode(handedness is not None)
+
+    def update_hand_lock(self, found: bool, alone: bool) -> None:
+        """
+        Switches between single and multi-hand detection after each result, depending on whether the locked hand
+        was `found` in it, and whether it was the only hand (`alone`). Must be called with `_result_lock` held.
+        """
+        if self.single_hand_mode:
+            self._lock_streak = 0 if found else self._lock_streak + 1
+            if self._lock_streak >= self.LOCK_LOST_RESULTS:
+                print("Lost the player's hand, searching for every hand")
+                self.set_single_hand_mode(False)
+        else:
+            self._lock_streak = self._lock_streak + 1 if found and alone else 0
+            if self._lock_streak >= self.LOCK_FOUND_RESULTS:
+                print("Found the player's hand, only tracking it")
+                self.set_single_hand_mode(True)
+
+    def set_single_hand_mode(self, enabled: bool) -> None:
+        """Must be called with `_result_lock` held."""
+        self.single_hand_mode = enabled
+        self._lock_streak = 0
+        detector = self.detector
+        if detector is not None:
+            detector.max_hands = 1 if enabled else MAX_HANDS
     
     def update(self, timestamp_ms: int) -> None:
         """
         Call this once each frame of the game in order to keep reading camera frames and detecting hands.
+        In threaded capture mode, this only picks up the newest frame and never blocks. Replayed results that are
+        due by `timestamp_ms` are published here too.
         """
+        if self.replay is not None:
+            self.replay.play(timestamp_ms, self.hand_landmarker_callback)
+
+        if self.capture_thread is not None:
+            # Read before acquiring, so that a frame published in between is picked up next time.
+            captured_frames = self.capture_thread.captured_frames
+            frame = self.capture_thread.acquire_latest()
+            if frame is not self.frame or captured_frames != self._captured_frames_seen:
+                self.frame_sequence += 1
+            self._captured_frames_seen = captured_frames
+            self.frame = frame
 
-        if self.camera is not None and self.camera.isOpened():
-            got_frame, frame = self.camera.read()
+            if self.frame is None:
+                self.landmark_buffer.clear()
+        elif self.camera is not None and self.camera.isOpened():
+            got_frame, capture_buffer = self.camera.read(self._capture_buffer)
+            self.frame_sequence += 1
+            self.frame_pool.release(self.frame)
 
             if got_frame:
-                self.frame = frame
-                self.hand_landmarker.detect_async(
-                    mp.Image(data=frame, image_format=mp.ImageFormat.SRGB),
-                    timestamp_ms)
+                self._capture_buffer = capture_buffer
+                self.frame = self.frame_pool.acquire(capture_buffer.shape)
+                cv2.cvtColor(capture_buffer, cv2.COLOR_BGR2RGB, dst=self.frame)
+                self.submit_frame(self.frame, timestamp_ms)
             else:
                 self.frame = None
-                self.detection_result = None
+                self.landmark_buffer.clear()
+
+    def submit_frame(self, frame: np.ndarray, timestamp_ms: int) -> None:
+        """
+        Starts an asynchronous hand detection pass on `frame`. The result arrives in `hand_landmarker_callback`.
+        If the motion gate decides the frame hasn't changed, the current result is kept instead. Frames are
+        ignored until the detector has loaded.
+        """
+        detector = self.detector
+        if detector is None:
+            return
+
+        if self.last_detection_timestamp_ms is not None and \
+                timestamp_ms - self.last_detection_timestamp_ms < self.detection_interval_ms:
+            return
+
+        if self.motion_gate is not None and not self.motion_gate.should_detect(frame, timestamp_ms):
+            # The scene is static, so any hands in the last result are still in view.
+            if self.landmark_buffer.newest_hand_count > 0:
+                self.detection_result_last_seen_ms = timestamp_ms
+            return
+
+        crop = None
+        image = None
+        if self.roi is not None and self.roi.bounds is not None:
+            size = self.roi.inference_size
+            image = self.frame_pool.acquire((size, size, frame.shape[2]))
+            crop = self.roi.crop(frame, image)
+
+            # The region may have been lost (by the callback thread) in the meantime.
+            if crop is None:
+                self.frame_pool.release(image)
+                image = None
+
+        # Landmarks are normalized to the image size, so downscaling doesn't change their coordinates.
+        if image is None and self.search_width is not None and frame.shape[1] > self.search_width:
+            height = round(frame.shape[0] * self.search_width / frame.shape[1])
+            image = self.frame_pool.acquire((height, self.search_width, frame.shape[2]))
+            cv2.resize(frame, (self.search_width, height), dst=image, interpolation=cv2.INTER_AREA)
+        elif image is None:
+            image = self.frame_pool.retain(frame)
+
+        # The frame is recorded before it's submitted, since its result can arrive before `detect_async` returns.
+        with self._pending_lock:
+            if len(self.pending_frames) >= self.MAX_PENDING_FRAMES:
+                self.abandon_pending_frame()
+            self.pending_frames.append((timestamp_ms, crop, image))
+
+        if not detector.detect_async(image, timestamp_ms):
+            # The detector was busy and dropped the frame, so no result will ever come for it. Nothing else can
+            # have been submitted since, so it's still the newest pending frame.
+            with self._pending_lock:
+                if len(self.pending_frames) > 0 and self.pending_frames[-1][0] == timestamp_ms:
+                    self.frame_pool.release(self.pending_frames.pop()[2])
+            return
+
+        self.last_detection_timestamp_ms = timestamp_ms
+
+    def set_detection_quality(self, roi_size: int, search_width: int | None, interval_ms: int) -> None:
+        """
+        Adjusts how much work each detection pass does: the size region of interest crops are resized to, the
+        width full frames are downscaled to, and the minimum time between passes.
+        """
+        if self.roi is not None:
+            self.roi.inference_size = roi_size
+        self.search_width = search_width
+        self.detection_interval_ms = interval_ms
+
+    def pop_pending_frame(self, timestamp_ms: int) -> tuple[bool, Crop | None]:
+        """
+        Finishes up the frame captured at `timestamp_ms`, returning whether it was pending and the crop it was
+        detected in (if any), and releasing its detection input. Detectors may skip frames when they're busy, so
+        any earlier frames (which will never get a result) are finished up too.
+        """
+        with self._pending_lock:
+            while len(self.pending_frames) > 0:
+                pending_timestamp_ms, crop, image = self.pending_frames[0]
+                if pending_timestamp_ms > timestamp_ms:
+                    break
+
+                self.pending_frames.popleft()
+                self.frame_pool.release(image)
+                if pending_timestamp_ms == timestamp_ms:
+                    return True, crop
+        return False, None
+
+    def abandon_pending_frame(self) -> None:
+        """Drops the oldest pending frame before its result arrives. Must be called with `_pending_lock` held."""
+        timestamp_ms, _, image = self.pending_frames.popleft()
+        self.frame_pool.release(image)
+        self.abandoned_timestamp_ms = timestamp_ms
+
+    def release_pending_frames(self) -> None:
+        with self._pending_lock:
+            while len(self.pending_frames) > 0:
+                self.abandon_pending_frame()
     
     def get_annotated_frame(self) -> np.ndarray | None:
         """
-        Uses internal mediapipe functions to return a skeletonized wireframe hand on top of the currently captured
-        image. If there is no frame available, returns `None`.
+        Returns a copy of the currently captured image with a skeletonized wireframe of each detected hand drawn on
+        top. If there is no frame available, returns `None`. The returned array is reused by the next call.
         """
-        if self.frame is None or self.detection_result is None:
+        hands = self.hands
+        if self.frame is None or hands.timestamp_ms is None:
             return None
-        
-        hand_landmarks_list = self.detection_result.hand_landmarks
-        annotated_image = np.copy(self.frame)
-
-        # Loop through the detected detection_result to visualize.
-        for idx in range(len(hand_landmarks_list)):
-            hand_landmarks = hand_landmarks_list[idx]
-
-            # Draw the hand landmarks.
-            hand_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-            hand_landmarks_proto.landmark.extend([
-            landmark_pb2.NormalizedLandmark(x=landmark.x, y=landmark.y, z=landmark.z) for landmark in hand_landmarks
-            ])
-            solutions.drawing_utils.draw_landmarks(
-            annotated_image,
-            hand_landmarks_proto,
-            solutions.hands.HAND_CONNECTIONS,
-            solutions.drawing_styles.get_default_hand_landmarks_style(),
-            solutions.drawing_styles.get_default_hand_connections_style())
-
-        return annotated_image
+
+        if self._annotated_frame is None or self._annotated_frame.shape != self.frame.shape:
+            self._annotated_frame = np.empty_like(self.frame)
+        annotated_frame = self._annotated_frame
+        np.copyto(annotated_frame, self.frame)
+
+        self._skeleton_painter.draw(annotated_frame, hands)
+        return annotated_frame
     
     def hand_seen_within(self, period_ms: int) -> bool:
         """
-        Whether or not a hand was seen within `period_ms` of calling this function. When detection_result move
+        Whether or not a hand was seen within `period_ms` of calling this function. When hands move
         quickly, there are occasional tracking hiccups. This method can be used to debounce a noisy
         hand presence signal.
         """
         if self.detection_result_last_seen_ms is None:
             return False
         
-        return (time.get_ticks() - self.detection_result_last_seen_ms) < period_ms
-    
-    @staticmethod
-    def create_hand_detector(root_dir: str, callback: Callable[[HandLandmarkerResult, mp.Image, int], None]) -> HandLandmarker:
-        hand_landmarker_path = path.join(root_dir, "models/hand_landmarker.task")
-        base_options = BaseOptions(model_asset_path=hand_landmarker_path, delegate=BaseOptions.Delegate.CPU)
-        options = HandLandmarkerOptions(base_options=base_options,
-                                            num_hands=2,
-                                            running_mode=RunningMode.LIVE_STREAM,
-                                            result_callback=callback)
-        detector = HandLandmarker.create_from_options(options)
-        return detector
\ No newline at end of file
+        return (self.clock() - self.detection_result_last_seen_ms) < period_ms
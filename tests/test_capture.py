@@ -0,0 +1,37 @@
+import threading
+import numpy as np
+from src.buffers import BufferPool
+from src.capture import CaptureThread
+
+class StuckCamera:
+    """A camera whose first read blocks until `unblock` is set, like a wedged driver."""
+
+    def __init__(self):
+        self.reading = threading.Event()
+        self.unblock = threading.Event()
+        self.released = threading.Event()
+
+    def read(self, buffer=None):
+        self.reading.set()
+        self.unblock.wait()
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released.set()
+
+def test_a_read_that_outlives_stop_isnt_published():
+    camera = StuckCamera()
+    frames = []
+    capture = CaptureThread(camera, lambda frame, timestamp_ms: frames.append(timestamp_ms), BufferPool(),
+                            clock=lambda: 1)
+    capture.start()
+    assert camera.reading.wait(1)
+
+    capture.stop(timeout_s=0.05, release_camera=True)
+    assert not camera.released.is_set()
+    camera.unblock.set()
+
+    assert camera.released.wait(1)
+    assert frames == []
+    assert capture.captured_frames == 0
+    assert capture.acquire_latest() is None
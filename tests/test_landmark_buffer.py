@@ -0,0 +1,69 @@
+import threading
+import time
+import numpy as np
+from src.landmarks import HandLandmarks, LandmarkBuffer
+
+PUBLISHES = 20000
+
+def make_result(hands: HandLandmarks, i: int) -> None:
+    """Fills `hands` so that every field is derived from `i`, and a mix of two results can be told apart."""
+    hands.hand_count = 1 + i % 2
+    hands.landmarks[:] = i % 1000
+    hands.handedness[:] = i % 2
+    hands.scores[:] = i % 1000
+
+def check_snapshot(hands: HandLandmarks) -> None:
+    i = hands.timestamp_ms
+    if i is None:
+        return
+    # Yield between reads, so that the writer gets every chance to overwrite the snapshot in the middle.
+    time.sleep(0)
+    assert hands.hand_count == 1 + i % 2
+    count = hands.hand_count
+    time.sleep(0)
+    assert np.all(hands.landmarks[:count] == i % 1000)
+    time.sleep(0)
+    assert np.all(hands.handedness[:count] == i % 2)
+    assert np.all(hands.scores[:count] == i % 1000)
+    assert hands.timestamp_ms == i
+
+def test_snapshots_stay_consistent_while_publishing():
+    buffer = LandmarkBuffer()
+    done = threading.Event()
+
+    def publish():
+        hands = HandLandmarks()
+        for i in range(PUBLISHES):
+            make_result(hands, i)
+            buffer.publish(hands, i)
+        done.set()
+
+    writer = threading.Thread(target=publish)
+    writer.start()
+    snapshots = 0
+    last_sequence = 0
+    while not done.is_set():
+        hands = buffer.latest
+        assert hands.sequence >= last_sequence
+        last_sequence = hands.sequence
+        check_snapshot(hands)
+        snapshots += 1
+    writer.join()
+
+    assert snapshots > 0
+    assert buffer.latest.timestamp_ms == PUBLISHES - 1
+    assert buffer.latest.sequence == PUBLISHES
+
+def test_clear_publishes_an_empty_result():
+    buffer = LandmarkBuffer()
+    hands = HandLandmarks()
+    make_result(hands, 3)
+    buffer.publish(hands, 3)
+    held = buffer.latest
+
+    buffer.clear()
+    # The held snapshot is untouched until the next `latest`.
+    check_snapshot(held)
+    assert buffer.latest.hand_count == 0
+    assert buffer.latest.timestamp_ms is None
+    assert buffer.newest_hand_count == 0
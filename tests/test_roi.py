@@ -0,0 +1,14 @@
+import numpy as np
+from src.roi import RegionOfInterest
+
+def test_crop_fills_its_buffer_after_inference_size_changes():
+    roi = RegionOfInterest(inference_size=256)
+    roi.bounds = (0.1, 0.1, 0.3, 0.3)
+    out = np.zeros((256, 256, 3), dtype=np.uint8)
+
+    # The game loop can lower the detection quality after the capture thread has allocated `out`.
+    roi.inference_size = 160
+    crop = roi.crop(np.full((480, 640, 3), 7, dtype=np.uint8), out)
+
+    assert crop is not None
+    assert np.all(out == 7)
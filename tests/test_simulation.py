@@ -0,0 +1,39 @@
+import numpy as np
+from src.simulation import PongSimulation, BatchedPongSimulation, GAME_OVER
+
+ARENA_SIZE = (1280, 720)
+STEP_MS = 1000 / 30
+MAX_STEPS = 20000
+
+def chase(ball_y: np.ndarray, position: np.ndarray, aim: np.ndarray) -> np.ndarray:
+    """A bot paddle that moves towards the ball at a limited speed, so that it misses once the ball is fast."""
+    travel = ARENA_SIZE[1] - PongSimulation.PADDLE_HEIGHT
+    max_step = 0.7 * STEP_MS / 1000
+    return position + np.clip((ball_y - aim) / travel - position, -max_step, max_step)
+
+def test_batched_games_play_out_like_single_games():
+    aims = np.linspace(0.2, 0.8, 8) * PongSimulation.PADDLE_HEIGHT
+
+    scores = []
+    for aim in aims:
+        simulation = PongSimulation(*ARENA_SIZE)
+        position = np.array(0.5)
+        for _ in range(MAX_STEPS):
+            if GAME_OVER in simulation.step(STEP_MS):
+                break
+            position = chase(np.array(simulation.ball.y), position, aim)
+            simulation.move_paddle(float(position))
+        scores.append(simulation.score)
+
+    batch = BatchedPongSimulation(len(aims), *ARENA_SIZE)
+    positions = np.full(len(aims), 0.5)
+    for _ in range(MAX_STEPS):
+        batch.step(STEP_MS)
+        if batch.over.all():
+            break
+        positions = chase(batch.balls.positions[:len(batch), 1], positions, aims)
+        batch.move_paddles(positions)
+
+    assert batch.over.all()
+    assert batch.scores.tolist() == scores
+    assert min(scores) > 0
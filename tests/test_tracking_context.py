@@ -0,0 +1,64 @@
+import numpy as np
+from src.landmarks import HandLandmarks
+from src.tracking_context import TrackingContext
+
+FRAME_SHAPE = (480, 640, 3)
+
+class BusyDetector:
+    """Stands in for a detector with a limited number of frames in flight, like `ProcessDetector`'s slots."""
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.max_hands = 2
+        self.accepted = []
+
+    def detect_async(self, frame: np.ndarray, timestamp_ms: int) -> bool:
+        if len(self.accepted) >= self.slots:
+            return False
+        self.accepted.append(timestamp_ms)
+        return True
+
+def tracking_hand_in_corner(detector: BusyDetector) -> TrackingContext:
+    """A tracking context whose region of interest is on a hand in the top left of the frame."""
+    tracking = TrackingContext(".", detector_backend=None, roi_mode=True)
+    tracking.detector = detector
+    tracking.roi.bounds = (0.1, 0.1, 0.2, 0.2)
+    return tracking
+
+def crop_result() -> HandLandmarks:
+    """A hand in the middle of a crop - so in the top left of the frame, once mapped back."""
+    hands = HandLandmarks()
+    hands.hand_count = 1
+    hands.landmarks[0] = 0.5
+    return hands
+
+def test_dropped_frames_dont_evict_accepted_ones():
+    detector = BusyDetector(slots=2)
+    tracking = tracking_hand_in_corner(detector)
+    frame = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+    for timestamp_ms in range(20):
+        tracking.submit_frame(frame, timestamp_ms)
+
+    assert detector.accepted == [0, 1]
+    assert [timestamp_ms for timestamp_ms, _, _ in tracking.pending_frames] == [0, 1]
+
+    tracking.hand_landmarker_callback(crop_result(), 0)
+    hands = tracking.landmark_buffer.latest
+    assert hands.hand_count == 1
+    assert np.all(hands.landmarks[0, :, :2] < 0.5)
+
+def test_results_for_abandoned_frames_are_discarded():
+    detector = BusyDetector(slots=100)
+    tracking = tracking_hand_in_corner(detector)
+    frame = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+    for timestamp_ms in range(TrackingContext.MAX_PENDING_FRAMES + 2):
+        tracking.submit_frame(frame, timestamp_ms)
+
+    # The first two frames were evicted, so their crops are gone.
+    tracking.hand_landmarker_callback(crop_result(), 1)
+    assert tracking.landmark_buffer.latest.timestamp_ms is None
+
+    tracking.hand_landmarker_callback(crop_result(), 2)
+    hands = tracking.landmark_buffer.latest
+    assert hands.timestamp_ms == 2
+    assert np.all(hands.landmarks[0, :, :2] < 0.5)